@@ -0,0 +1,60 @@
+"""Benchmark del arranque de Chrome: clásico vs fábrica (servicio compartido + plantilla).
+
+Uso:  python benchmarks/bench_arranque.py --n 5
+      python benchmarks/bench_arranque.py --n 10 --no-headless --chrome-binary /usr/bin/chromium
+
+Por modo abre y cierra --n navegadores con common_rcv.build_driver y mide
+hasta tener el driver listo y hasta cargar about:blank:
+  clasico   chromedriver nuevo + perfil vacío por navegador (comportamiento previo)
+  fabrica   chromedriver compartido + perfil clonado de la plantilla (el primero
+            paga crear servicio y plantilla si no existían)
+Requiere Chrome/Chromium y chromedriver instalados.
+"""
+from __future__ import annotations
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+AQUI = Path(__file__).resolve().parent
+sys.path.insert(0, str(AQUI.parents[0] / "src"))
+from conciliacion import instrumentacion  # noqa: E402
+from conciliacion.sii.extraccion.common_rcv import _cerrar_driver, build_driver  # noqa: E402
+
+def correr(modo: str, args) -> dict:
+    listos, primeras = [], []
+    with tempfile.TemporaryDirectory() as tmp:
+        for _ in range(args.n):
+            t0 = time.perf_counter()
+            driver, _, perfil = build_driver(
+                download_dir=Path(tmp), headless=not args.no_headless, chrome_binary=args.chrome_binary,
+                chromedriver_path=args.chromedriver, reutilizar=modo == "fabrica",
+            )
+            listos.append(time.perf_counter() - t0)
+            driver.get("about:blank")
+            primeras.append(time.perf_counter() - t0)
+            _cerrar_driver(driver, perfil)
+    p = instrumentacion._percentil
+    return {"modo": modo, "listo_p50": p(listos, 50), "listo_p95": p(listos, 95),
+            "primera_p50": p(primeras, 50), "primero_s": listos[0]}
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--n", type=int, default=5, help="navegadores por modo")
+    ap.add_argument("--modos", nargs="+", choices=["clasico", "fabrica"], default=["clasico", "fabrica"])
+    ap.add_argument("--no-headless", action="store_true")
+    ap.add_argument("--chrome-binary")
+    ap.add_argument("--chromedriver")
+    args = ap.parse_args(argv)
+
+    instrumentacion.configurar()
+    print(f"{'modo':<10}{'listo p50':>11}{'listo p95':>11}{'+blank p50':>12}{'1.º s':>8}")
+    for modo in args.modos:
+        r = correr(modo, args)
+        print(f"{modo:<10}{r['listo_p50']:>11.2f}{r['listo_p95']:>11.2f}{r['primera_p50']:>12.2f}{r['primero_s']:>8.2f}")
+    print(instrumentacion.resumen())
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
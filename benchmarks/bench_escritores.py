@@ -0,0 +1,74 @@
+"""Compara los backends de conciliacion.escritores con datos RCV sintéticos.
+
+Uso:  python benchmarks/bench_escritores.py --filas 200000 [--lote 20000]
+Imprime segundos, filas/s, tamaño del archivo y pico de memoria (RSS) por backend.
+"""
+from __future__ import annotations
+import argparse
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+from conciliacion.escritores import BACKENDS, SUFIJOS, crear_escritor  # noqa: E402
+
+def rcv_sintetico(filas: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    neto = rng.integers(1_000, 5_000_000, filas)
+    return pd.DataFrame({
+        "Nro": np.arange(1, filas + 1),
+        "Tipo Doc": rng.choice([33, 34, 61, 56], filas),
+        "RUT Proveedor": [f"{r}-{d}" for r, d in zip(rng.integers(1_000_000, 99_999_999, filas), rng.integers(0, 10, filas), strict=True)],
+        "Razon Social": rng.choice(["COMERCIAL LOS ANDES SPA", "DISTRIBUIDORA SUR LTDA", "SERVICIOS NORTE S.A."], filas),
+        "Folio": rng.integers(1, 10_000_000, filas),
+        "Fecha Docto": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 365, filas), unit="D"),
+        "Monto Exento": np.where(rng.random(filas) < 0.1, neto, 0),
+        "Monto Neto": neto,
+        "Monto IVA Recuperable": (neto * 0.19).round(),
+        "Monto Total": (neto * 1.19).round(),
+        "Archivo.Origen": "RCV_COMPRA_REGISTRO_76156793-4_202401.csv",
+    })
+
+def _rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def medir(backend: str, df: pd.DataFrame, lote: int, carpeta: Path) -> dict:
+    path = carpeta / f"bench_{backend}{SUFIJOS[backend]}"
+    t0 = time.perf_counter()
+    esc = crear_escritor(path, list(df.columns), backend)
+    for i in range(0, len(df), lote):
+        esc.escribir(df.iloc[i:i + lote])
+    esc.cerrar()
+    seg = time.perf_counter() - t0
+    return {"backend": backend, "segundos": seg, "filas_s": len(df) / seg,
+            "mb": path.stat().st_size / 1e6, "rss_mb": _rss_mb()}
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--filas", type=int, default=200_000)
+    ap.add_argument("--lote", type=int, default=20_000, help="filas por escribir() (≈ un CSV mensual)")
+    ap.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    args = ap.parse_args(argv)
+
+    df = rcv_sintetico(args.filas)
+    print(f"{args.filas:,} filas x {len(df.columns)} columnas, lotes de {args.lote:,}")
+    print(f"{'backend':<12}{'seg':>9}{'filas/s':>12}{'MB':>9}{'RSS MB':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for b in args.backends:
+            try:
+                r = medir(b, df, args.lote, Path(tmp))
+            except RuntimeError as e:  # dependencia opcional ausente
+                print(f"{b:<12}  omitido: {e}")
+                continue
+            print(f"{r['backend']:<12}{r['segundos']:>9.2f}{r['filas_s']:>12,.0f}{r['mb']:>9.1f}{r['rss_mb']:>9.0f}")
+    # ru_maxrss es el pico del proceso completo: para aislar la memoria de
+    # cada backend, correr con --backends <uno>
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+"""Benchmark de extracción end-to-end contra el SII simulado (sin red).
+
+Uso:  python benchmarks/bench_extraccion.py --ruts 4 --desde 2024-01 --hasta 2024-06 --workers 1 2 4
+      python benchmarks/bench_extraccion.py --latencia-ms 400 --fallo-descarga 0.05 --json bench.json
+
+Levanta benchmarks/sii_simulado.py en otro proceso, apunta BEKILLY_SII_URL a
+él y corre extract_for_tipo headless (un Chrome por RUT) con N workers en
+paralelo. Por cada N informa latencia por período (consulta + pestaña +
+descargas, p50/p95), períodos/s, MB/s y los contadores del servidor.
+Requiere Chrome/Chromium y chromedriver instalados.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+AQUI = Path(__file__).resolve().parent
+sys.path.insert(0, str(AQUI.parents[0] / "src"))
+sys.path.insert(0, str(AQUI))
+from sii_simulado import argumentos_escenario  # noqa: E402
+from conciliacion import instrumentacion  # noqa: E402
+
+ETAPAS_PERIODO = ("consulta_periodo", "pestaña", "descarga", "descarga_http")
+
+def _rut(n: int) -> str:
+    cuerpo = 76_000_000 + n
+    s, f = 0, 2
+    for d in reversed(str(cuerpo)):
+        s += int(d) * f
+        f = 2 if f == 7 else f + 1
+    dv = {10: "K", 11: "0"}.get(11 - s % 11, str(11 - s % 11))
+    return f"{cuerpo}-{dv}"
+
+def _puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _stats(url_base: str) -> dict:
+    raiz = url_base.split("/consdcvinternetui/")[0]
+    with urllib.request.urlopen(raiz + "/__stats", timeout=5) as r:
+        return json.loads(r.read())
+
+def _levantar_servidor(args) -> tuple[subprocess.Popen, str]:
+    puerto = _puerto_libre()
+    cmd = [sys.executable, str(AQUI / "sii_simulado.py"), "--puerto", str(puerto)]
+    for k in ("latencia_ms", "jitter_ms", "fallo_consulta", "fallo_descarga", "expira_sesion", "filas", "semilla"):
+        cmd += ["--" + k.replace("_", "-"), str(getattr(args, k))]
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{puerto}/consdcvinternetui/"
+    for _ in range(100):
+        try:
+            _stats(url)
+            return proc, url
+        except OSError:
+            time.sleep(0.05)
+    proc.kill()
+    raise RuntimeError("el SII simulado no levantó")
+
+def _percentil(valores: list[float], p: float) -> float:
+    return instrumentacion._percentil(valores, p) if valores else float("nan")
+
+def correr(workers: int, ruts: list[str], args, url: str) -> dict:
+    # importa common_rcv recién aquí: SII_URL se lee de BEKILLY_SII_URL al importar
+    from conciliacion.sii.extraccion.common_rcv import _periodos, extract_for_tipo
+    from conciliacion.sii.extraccion.manifest import PoliticaIncremental
+
+    anho_ini, mes_ini = map(int, args.desde.split("-"))
+    anho_fin, mes_fin = map(int, args.hasta.split("-"))
+    base = Path(tempfile.mkdtemp(prefix=f"bench_extr_w{workers}_"))
+    reg = instrumentacion.configurar()
+    antes = _stats(url)
+
+    def uno(rut: str) -> None:
+        extract_for_tipo(
+            rut=rut, clave="clave", anho_ini=anho_ini, mes_ini=mes_ini, anho_fin=anho_fin, mes_fin=mes_fin,
+            tipo_up=args.tipo, carpeta_base=base, headless=not args.no_headless,
+            chrome_binary=args.chrome_binary, chromedriver_path=args.chromedriver,
+            politica=PoliticaIncremental(forzar=True), modo_http=args.http, pestanas=args.pestanas,
+        )
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        list(ex.map(uno, ruts))
+    seg = time.perf_counter() - t0
+    despues = _stats(url)
+
+    por_periodo: dict[tuple, float] = defaultdict(float)
+    logins = []
+    for ev in reg.eventos:
+        if ev["etapa"] in ETAPAS_PERIODO and ev.get("periodo"):
+            por_periodo[(ev.get("rut"), ev["periodo"])] += ev["seg"]
+        elif ev["etapa"] == "login":
+            logins.append(ev["seg"])
+    archivos = list(base.rglob("RCV_*.csv"))
+    # (carpeta SII_<rut>, AAAAMM) con detalle descargado
+    completos = {(p.parent.parent.name, p.stem.rsplit("_", 1)[-1]) for p in archivos if "REGISTRO" in p.name}
+    mb = sum(p.stat().st_size for p in archivos) / 1e6
+    lat = list(por_periodo.values())
+    return {
+        "workers": workers,
+        "seg": round(seg, 2),
+        "periodos_ok": len(completos),
+        "periodos_total": len(ruts) * len(list(_periodos(anho_ini, mes_ini, anho_fin, mes_fin))),
+        "periodos_s": round(len(completos) / seg, 3),
+        "mb_s": round(mb / seg, 3),
+        "periodo_p50_s": round(_percentil(lat, 50), 3),
+        "periodo_p95_s": round(_percentil(lat, 95), 3),
+        "login_p50_s": round(_percentil(logins, 50), 3),
+        "servidor": {k: despues.get(k, 0) - antes.get(k, 0) for k in despues},
+    }
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--ruts", type=int, default=4)
+    ap.add_argument("--desde", default="2024-01", metavar="AAAA-MM")
+    ap.add_argument("--hasta", default="2024-06", metavar="AAAA-MM")
+    ap.add_argument("--tipo", choices=["COMPRA", "VENTA"], default="COMPRA")
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    ap.add_argument("--http", action="store_true", help="Probar el camino HTTP (facadeService)")
+    ap.add_argument("--pestanas", type=int, default=1, help="Pestañas por navegador (multipestana)")
+    ap.add_argument("--no-headless", action="store_true")
+    ap.add_argument("--chrome-binary")
+    ap.add_argument("--chromedriver")
+    ap.add_argument("--url", help="Usar un SII simulado ya levantado en vez de iniciar uno")
+    ap.add_argument("--json", help="Guardar los resultados en este archivo")
+    argumentos_escenario(ap)
+    args = ap.parse_args(argv)
+
+    proc = None
+    url = args.url
+    if not url:
+        proc, url = _levantar_servidor(args)
+    os.environ["BEKILLY_SII_URL"] = url  # antes de importar common_rcv
+    ruts = [_rut(i) for i in range(args.ruts)]
+    resultados = []
+    try:
+        print(f"SII simulado: {url} | {args.ruts} RUT x {args.desde}..{args.hasta} {args.tipo} | "
+              f"latencia {args.latencia_ms}±{args.jitter_ms} ms")
+        print(f"{'workers':>8}{'seg':>9}{'ok/total':>11}{'per/s':>8}{'MB/s':>8}{'p50 s':>8}{'p95 s':>8}{'login s':>9}")
+        for w in args.workers:
+            r = correr(w, ruts, args, url)
+            resultados.append(r)
+            print(f"{w:>8}{r['seg']:>9.1f}{r['periodos_ok']:>6}/{r['periodos_total']:<4}{r['periodos_s']:>8.2f}"
+                  f"{r['mb_s']:>8.2f}{r['periodo_p50_s']:>8.2f}{r['periodo_p95_s']:>8.2f}{r['login_p50_s']:>9.2f}")
+            print(f"{'':>8}servidor: {r['servidor']}")
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait(timeout=5)
+    if args.json:
+        Path(args.json).write_text(json.dumps(resultados, indent=2), encoding="utf-8")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
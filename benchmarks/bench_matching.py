@@ -0,0 +1,54 @@
+"""Benchmark de matching.conciliar: un proceso vs particionado en un pool.
+
+Uso:  python benchmarks/bench_matching.py --filas 100000 1000000 10000000 --workers 4
+Cada lado tiene `filas` movimientos; el libro es el banco desordenado con
+fechas corridas 0..2 días y montos con centavos de diferencia.
+"""
+from __future__ import annotations
+import argparse
+import os
+import resource
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+from conciliacion.matching import conciliar  # noqa: E402
+
+def lados_sinteticos(filas: int, seed: int = 0) -> tuple[pd.DataFrame, pd.DataFrame]:
+    rng = np.random.default_rng(seed)
+    banco = pd.DataFrame({
+        "fecha": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 365, filas), unit="D"),
+        "monto": rng.integers(1_000, 10_000_000, filas).astype("float64"),
+        "rut": rng.integers(1, 5_000, filas).astype(str),
+    })
+    libro = banco.sample(frac=1, random_state=seed + 1).reset_index(drop=True)
+    libro["fecha"] = libro["fecha"] + pd.to_timedelta(rng.integers(0, 3, filas), unit="D")
+    libro["monto"] = libro["monto"] + rng.integers(0, 2, filas) * 0.3
+    return banco, libro
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--filas", type=int, nargs="+", default=[100_000, 1_000_000])
+    ap.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1))
+    ap.add_argument("--tol", type=float, default=0.5)
+    ap.add_argument("--dias", type=int, default=3)
+    args = ap.parse_args(argv)
+
+    print(f"{'filas':>12}{'modo':>16}{'seg':>9}{'calces':>12}{'RSS MB':>9}")
+    for n in args.filas:
+        banco, libro = lados_sinteticos(n)
+        for nombre, workers in (("1 proceso", None), (f"{args.workers} procesos", args.workers)):
+            t0 = time.perf_counter()
+            out = conciliar(banco, libro, args.tol, dias=args.dias, workers=workers,
+                            col_contraparte="rut")
+            seg = time.perf_counter() - t0
+            rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+            print(f"{n:>12,}{nombre:>16}{seg:>9.2f}{int(out['match'].sum()):>12,}{rss:>9.0f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+"""Microbenchmark del parser de números chilenos contra la implementación anterior.
+
+Uso:  python benchmarks/bench_numeros.py --filas 1000000
+"""
+from __future__ import annotations
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+from conciliacion import numeros  # noqa: E402
+
+def columna_sintetica(filas: int, seed: int = 0) -> pd.Series:
+    """Montos como los exporta el SII: miles con '.', algunos negativos, decimales y vacíos."""
+    rng = np.random.default_rng(seed)
+    v = rng.integers(0, 50_000_000, filas)
+    txt = pd.Series([f"{x:,}".replace(",", ".") for x in v], dtype=object)
+    neg = rng.random(filas) < 0.02
+    txt[neg] = "-" + txt[neg]
+    dec = rng.random(filas) < 0.02
+    txt[dec] = txt[dec] + ",5"
+    txt[rng.random(filas) < 0.05] = ""
+    return txt
+
+def anterior(s: pd.Series) -> pd.Series:
+    """calculo._to_number antes del parser compartido (dos str.replace con regex)."""
+    s2 = s.astype(str).str.replace(r"\.", "", regex=True).str.replace(",", ".", regex=False)
+    return pd.to_numeric(s2, errors="coerce")
+
+def _tiempo(fn, s: pd.Series, repeticiones: int) -> float:
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        fn(s)
+        mejor = min(mejor, time.perf_counter() - t0)
+    return mejor
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--filas", type=int, default=1_000_000)
+    ap.add_argument("--repeticiones", type=int, default=3)
+    args = ap.parse_args(argv)
+
+    s = columna_sintetica(args.filas)
+    casos = {"anterior (regex x2)": anterior, "pandas str": lambda x: numeros._parsear_pandas(x)}
+    if numeros.pa is not None:
+        casos["arrow compute"] = lambda x: numeros._parsear_arrow(x)
+
+    base = None
+    print(f"{args.filas:,} valores, mejor de {args.repeticiones}")
+    for nombre, fn in casos.items():
+        seg = _tiempo(fn, s, args.repeticiones)
+        base = base or seg
+        print(f"{nombre:<22}{seg:>8.3f} s {base / seg:>7.1f}x")
+
+    nuevo, fallas = numeros.parsear_numeros(s)
+    viejo = anterior(s)
+    iguales = np.allclose(nuevo.fillna(0), viejo.fillna(0))
+    print(f"resultados iguales al anterior: {iguales} | fallas: {fallas}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
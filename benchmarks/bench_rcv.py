@@ -0,0 +1,179 @@
+"""Suite de benchmarks del camino de datos RCV con CSV sintéticos.
+
+Uso:  python benchmarks/bench_rcv.py --filas 20000 --desde 2024-01 --hasta 2024-12
+      python benchmarks/bench_rcv.py --dir /tmp/rcv --ruts 2 --repeticiones 5
+
+Genera (o reutiliza, con --dir) un árbol SII_<rut>/RCV_Compra con
+benchmarks/generador_rcv.py y mide, tomando el mejor de --repeticiones:
+  consolidacion   consolidar_libros_por_rut -> CSV (--backend)
+  calculo         calcular_efecto_neto sobre el consolidado
+  normalizacion   normalizar_dataframe de una cartola armada con el libro
+  conciliacion    conciliar cartola vs libro (montos/fechas perturbados)
+
+Cada corrida se agrega a --resultados (JSON lines) con el commit de git y
+los parámetros; al final se compara contra la última corrida con los mismos
+parámetros en otro commit.
+"""
+from __future__ import annotations
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+AQUI = Path(__file__).resolve().parent
+RAIZ = AQUI.parent
+sys.path.insert(0, str(RAIZ / "src"))
+sys.path.insert(0, str(AQUI))
+from generador_rcv import VARIANTES, generar, periodos  # noqa: E402
+from conciliacion.matching import conciliar  # noqa: E402
+from conciliacion.normalizacion import normalizar_dataframe  # noqa: E402
+from conciliacion.sii.calculo import calcular_efecto_neto  # noqa: E402
+from conciliacion.sii.consolidacion import (  # noqa: E402
+    consolidar_libros_por_rut, iterar_consolidado, limpiar_cache_formatos,
+)
+
+def _git(*args: str) -> str:
+    try:
+        return subprocess.run(["git", *args], cwd=RAIZ, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+def _mejor(fn, repeticiones: int) -> tuple[float, object]:
+    mejor, res = float("inf"), None
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        res = fn()
+        mejor = min(mejor, time.perf_counter() - t0)
+    return mejor, res
+
+def cartola_desde(libro: pd.DataFrame, seed: int = 0) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """(banco, libro) crudos con los nombres de columna que reconoce DEFAULT_MAPPING."""
+    rng = np.random.default_rng(seed)
+    base = pd.DataFrame({
+        "Fecha": libro["Fecha Docto"].astype(str),
+        "Monto": libro["Monto Total"].astype("float64"),
+        "Glosa": libro["Razon Social"].astype(str),
+        "Documento": libro["Folio"].astype("Int64").astype(str),
+    })
+    banco = base.sample(frac=1, random_state=seed).reset_index(drop=True)
+    fechas = pd.to_datetime(banco["Fecha"], format="%d/%m/%Y") + pd.to_timedelta(rng.integers(0, 3, len(banco)), unit="D")
+    banco["Fecha"] = fechas.dt.strftime("%d/%m/%Y")
+    banco["Monto"] = banco["Monto"] + rng.integers(0, 2, len(banco)) * 0.3
+    return banco, base
+
+def correr(args, base_dir: Path, rut: str, salida_dir: Path) -> dict[str, dict]:
+    r: dict[str, dict] = {}
+
+    def _consolidar():
+        limpiar_cache_formatos()
+        consolidar_libros_por_rut(str(base_dir), rut, "compra", args.encabezados,
+                                  str(salida_dir / f"consolidado.{args.backend}"),
+                                  workers=args.workers, backend=args.backend)
+    seg, _ = _mejor(_consolidar, args.repeticiones)
+    limpiar_cache_formatos()
+    libro = pd.concat(list(iterar_consolidado(str(base_dir), rut, "compra", args.encabezados, workers=args.workers)),
+                      ignore_index=True)
+    libro = libro[libro["Nro"].notna()].reset_index(drop=True)  # sin las filas de los RCV_RESUMEN_*
+    r["consolidacion"] = {"seg": seg, "filas": len(libro)}
+
+    seg, _ = _mejor(lambda: calcular_efecto_neto(libro), args.repeticiones)
+    r["calculo"] = {"seg": seg, "filas": len(libro)}
+
+    banco_crudo, libro_crudo = cartola_desde(libro)
+    seg, banco = _mejor(lambda: normalizar_dataframe(banco_crudo), args.repeticiones)
+    r["normalizacion"] = {"seg": seg, "filas": len(banco_crudo)}
+
+    libro_norm = normalizar_dataframe(libro_crudo)
+    seg, res = _mejor(lambda: conciliar(banco, libro_norm, tol_abs=0.5, dias=3), args.repeticiones)
+    r["conciliacion"] = {"seg": seg, "filas": len(banco), "calces": int(res["match"].sum())}
+    for v in r.values():
+        v["seg"] = round(v["seg"], 4)
+        v["filas_s"] = round(v["filas"] / v["seg"]) if v["seg"] else None
+    return r
+
+def _comparar(actual: dict, archivo: Path) -> None:
+    previas = []
+    if archivo.exists():
+        for linea in archivo.read_text(encoding="utf-8").splitlines():
+            try:
+                previas.append(json.loads(linea))
+            except json.JSONDecodeError:
+                continue
+    ref = next((p for p in reversed(previas)
+                if p.get("params") == actual["params"] and p.get("commit") != actual["commit"]), None)
+    if ref is None:
+        print("(sin corrida previa comparable en otro commit)")
+        return
+    print(f"vs {ref['commit']} ({ref['fecha']}):")
+    for etapa, v in actual["resultados"].items():
+        antes = ref["resultados"].get(etapa, {}).get("seg")
+        if antes:
+            print(f"  {etapa:<15}{antes:>9.3f}s -> {v['seg']:>8.3f}s  ({(v['seg'] / antes - 1) * 100:+.1f}%)")
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--dir", help="Árbol SII_<rut> a usar/crear (por defecto uno temporal)")
+    ap.add_argument("--ruts", type=int, default=1)
+    ap.add_argument("--desde", default="2024-01", metavar="AAAA-MM")
+    ap.add_argument("--hasta", default="2024-12", metavar="AAAA-MM")
+    ap.add_argument("--filas", type=int, default=20_000, help="filas de detalle por período")
+    ap.add_argument("--variantes", nargs="+", choices=VARIANTES, default=list(VARIANTES))
+    ap.add_argument("--workers", type=int, default=None, help="procesos de parseo de CSV")
+    ap.add_argument("--backend", choices=["csv", "xlsx", "parquet"], default="csv")
+    ap.add_argument("--repeticiones", type=int, default=3)
+    ap.add_argument("--encabezados", default=str(RAIZ / "config" / "Encabezados.xlsx"))
+    ap.add_argument("--resultados", default=str(AQUI / "resultados" / "bench_rcv.jsonl"))
+    args = ap.parse_args(argv)
+
+    params = {k: getattr(args, k) for k in ("ruts", "desde", "hasta", "filas", "variantes", "workers", "backend")}
+    with tempfile.TemporaryDirectory() as tmp:
+        base_dir = Path(args.dir or tmp) / "datos"
+        ruts = [f"{76_000_000 + i}-{i % 10}" for i in range(args.ruts)]
+        if not all((base_dir / f"SII_{r}").exists() for r in ruts):
+            t0 = time.perf_counter()
+            creados = generar(base_dir, ruts, periodos(args.desde, args.hasta), tipos=("COMPRA",),
+                              filas=args.filas, variantes=tuple(args.variantes))
+            print(f"[gen] {len(creados)} CSV, {sum(p.stat().st_size for p in creados) / 1e6:,.1f} MB "
+                  f"en {time.perf_counter() - t0:.1f}s")
+        resultados: dict[str, dict] = {}
+        for rut in ruts:
+            for etapa, v in correr(args, base_dir, rut, Path(tmp)).items():
+                acum = resultados.setdefault(etapa, {"seg": 0.0, "filas": 0})
+                acum["seg"] = round(acum["seg"] + v["seg"], 4)
+                acum["filas"] += v["filas"]
+                if "calces" in v:
+                    acum["calces"] = acum.get("calces", 0) + v["calces"]
+        for v in resultados.values():
+            v["filas_s"] = round(v["filas"] / v["seg"]) if v["seg"] else None
+
+    registro = {
+        "commit": _git("rev-parse", "--short", "HEAD") or "?",
+        "sucio": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "params": params,
+        "resultados": resultados,
+    }
+    print(f"{'etapa':<15}{'seg':>9}{'filas':>11}{'filas/s':>12}")
+    for etapa, v in resultados.items():
+        extra = f"  calces={v['calces']:,}" if "calces" in v else ""
+        print(f"{etapa:<15}{v['seg']:>9.3f}{v['filas']:>11,}{v['filas_s'] or 0:>12,}{extra}")
+    archivo = Path(args.resultados)
+    _comparar(registro, archivo)
+    archivo.parent.mkdir(parents=True, exist_ok=True)
+    with open(archivo, "a", encoding="utf-8") as f:
+        f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+    print(f"[ok] resultados agregados a {archivo} (commit {registro['commit']}{' +cambios' if registro['sucio'] else ''})")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
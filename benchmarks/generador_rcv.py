@@ -0,0 +1,160 @@
+"""Generador de CSV RCV sintéticos (resumen y detalle) con las rarezas del SII.
+
+Uso:  python benchmarks/generador_rcv.py --dir /tmp/rcv --ruts 2 --desde 2023-01 --hasta 2024-12 --filas 5000
+
+Escribe <dir>/SII_<rut>/RCV_<Tipo>/ con los mismos nombres que la descarga.
+Cada período toma una variante en rotación (--variantes):
+  limpio                latin-1, ';'
+  utf8                  utf-8-sig (con BOM)
+  encabezado_duplicado  el encabezado repetido como primera fila de datos
+  desplazado            un ';' de más al inicio de las filas (desde la 2.ª),
+                        lo que corrige consolidacion._corregir_desplazamiento
+"""
+from __future__ import annotations
+import argparse
+import sys
+import zlib
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+from conciliacion.sii.extraccion.http_rcv import nombre_archivo  # noqa: E402
+
+ENCABEZADOS = {
+    "COMPRA": ["Nro", "Tipo Doc", "Tipo Compra", "RUT Proveedor", "Razon Social", "Folio", "Fecha Docto",
+               "Fecha Recepcion", "Fecha Acuse", "Monto Exento", "Monto Neto", "Monto IVA Recuperable",
+               "Monto Iva No Recuperable", "Codigo IVA No Rec.", "Monto Total"],
+    "VENTA": ["Nro", "Tipo Doc", "Tipo Venta", "Rut cliente", "Razon Social", "Folio", "Fecha Docto",
+              "Fecha Recepcion", "Fecha Acuse Recibo", "Fecha Reclamo", "Monto Exento", "Monto Neto",
+              "Monto IVA", "Monto total"],
+}
+RESUMEN = ["Tipo Documento", "Total Documentos", "Monto Exento", "Monto Neto", "Monto IVA", "Monto Total"]
+TIPOS_DOC = np.array([33, 33, 33, 34, 61, 56])
+RAZONES = np.array(["COMERCIAL LOS ANDES SPA", "DISTRIBUIDORA SUR LTDA", "SERVICIOS NORTE S.A.",
+                    "INVERSIONES PEÑALOLÉN LTDA", "FERRETERÍA ÑUÑOA SPA"])
+VARIANTES = ("limpio", "utf8", "encabezado_duplicado", "desplazado")
+
+def _rng(*partes) -> np.random.Generator:
+    return np.random.default_rng(zlib.crc32(":".join(map(str, partes)).encode()))
+
+def detalle(rut: str, tipo_up: str, periodo: str, filas: int, semilla: int = 0) -> pd.DataFrame:
+    """Detalle RCV de un período ('AAAAMM') como DataFrame con las columnas del SII."""
+    rng = _rng(semilla, rut, tipo_up, periodo)
+    anho, mes = periodo[:4], periodo[4:]
+    tipo_doc = rng.choice(TIPOS_DOC, filas)
+    neto = np.where(tipo_doc == 34, 0, rng.integers(1_000, 5_000_000, filas))
+    exento = np.where(tipo_doc == 34, rng.integers(1_000, 500_000, filas), 0)
+    iva = np.round(neto * 0.19).astype("int64")
+    rut_cp = rng.integers(60_000_000, 99_999_999, filas).astype(str)
+    dv = rng.choice(list("0123456789K"), filas)
+    fecha = pd.Series(rng.integers(1, 29, filas)).map("{:02d}".format) + f"/{mes}/{anho}"
+    cols = ENCABEZADOS[tipo_up]
+    datos = {
+        "Nro": np.arange(1, filas + 1),
+        "Tipo Doc": tipo_doc,
+        cols[2]: 1,
+        cols[3]: np.char.add(np.char.add(rut_cp, "-"), dv),
+        "Razon Social": rng.choice(RAZONES, filas),
+        "Folio": rng.integers(1, 10_000_000, filas),
+        "Fecha Docto": fecha,
+        "Fecha Recepcion": fecha + " 10:00:00",
+        cols[8]: "",
+    }
+    if tipo_up == "COMPRA":
+        datos.update({"Monto Exento": exento, "Monto Neto": neto, "Monto IVA Recuperable": iva,
+                      "Monto Iva No Recuperable": 0, "Codigo IVA No Rec.": "", "Monto Total": exento + neto + iva})
+    else:
+        datos.update({"Fecha Reclamo": "", "Monto Exento": exento, "Monto Neto": neto, "Monto IVA": iva,
+                      "Monto total": exento + neto + iva})
+    return pd.DataFrame(datos, columns=cols)
+
+def resumen(det: pd.DataFrame) -> pd.DataFrame:
+    """Resumen por tipo de documento, como el archivo RCV_RESUMEN_*."""
+    iva = "Monto IVA Recuperable" if "Monto IVA Recuperable" in det.columns else "Monto IVA"
+    total = det.columns[-1]
+    g = det.groupby("Tipo Doc", sort=True)
+    return pd.DataFrame({
+        "Tipo Documento": g.size().index,
+        "Total Documentos": g.size().to_numpy(),
+        "Monto Exento": g["Monto Exento"].sum().to_numpy(),
+        "Monto Neto": g["Monto Neto"].sum().to_numpy(),
+        "Monto IVA": g[iva].sum().to_numpy(),
+        "Monto Total": g[total].sum().to_numpy(),
+    })
+
+def a_csv(df: pd.DataFrame, variante: str = "limpio") -> bytes:
+    """Serializa con ';' aplicando la variante (ver docstring del módulo)."""
+    encabezado = ";".join(df.columns)
+    cuerpo = df.to_csv(sep=";", index=False, header=False, lineterminator="\n").splitlines()
+    if variante == "encabezado_duplicado":
+        lineas = [encabezado, encabezado] + cuerpo
+    elif variante == "desplazado":
+        lineas = [encabezado + ";"] + cuerpo[:1] + [";" + linea for linea in cuerpo[1:]]
+        lineas[1] += ";"
+    else:
+        lineas = [encabezado] + cuerpo
+    texto = "\n".join(lineas) + "\n"
+    if variante == "utf8":
+        return texto.encode("utf-8-sig")
+    return texto.encode("latin-1", errors="replace")
+
+def csv_rcv(rut: str, tipo_up: str, clase: str, periodo: str, *, filas: int, semilla: int = 0,
+            variante: str = "limpio") -> bytes:
+    """Bytes del CSV 'resumen' o 'detalle' de un período, como lo entrega el SII."""
+    det = detalle(rut, tipo_up, periodo, filas, semilla)
+    return a_csv(det if clase == "detalle" else resumen(det), variante)
+
+def periodos(desde: str, hasta: str) -> list[str]:
+    """'2023-11', '2024-02' -> ['202311', '202312', '202401', '202402']"""
+    return [p.strftime("%Y%m") for p in pd.period_range(desde, hasta, freq="M")]
+
+def generar(
+    base_dir: str | Path,
+    ruts: list[str],
+    lista_periodos: list[str],
+    *,
+    tipos: tuple[str, ...] = ("COMPRA", "VENTA"),
+    filas: int = 1_000,
+    variantes: tuple[str, ...] = VARIANTES,
+    semilla: int = 0,
+) -> list[Path]:
+    """Escribe resumen y detalle de cada rut/tipo/período; devuelve los archivos creados."""
+    base = Path(base_dir)
+    creados: list[Path] = []
+    i = 0
+    for rut in ruts:
+        for tipo_up in tipos:
+            carpeta = base / f"SII_{rut}" / f"RCV_{tipo_up.capitalize()}"
+            carpeta.mkdir(parents=True, exist_ok=True)
+            for periodo in lista_periodos:
+                det = detalle(rut, tipo_up, periodo, filas, semilla)
+                for clase, df in (("resumen", resumen(det)), ("detalle", det)):
+                    path = carpeta / nombre_archivo(rut, tipo_up, clase, int(periodo[:4]), int(periodo[4:]))
+                    path.write_bytes(a_csv(df, variantes[i % len(variantes)]))
+                    creados.append(path)
+                i += 1
+    return creados
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--dir", required=True)
+    ap.add_argument("--ruts", type=int, default=1)
+    ap.add_argument("--desde", default="2024-01", metavar="AAAA-MM")
+    ap.add_argument("--hasta", default="2024-12", metavar="AAAA-MM")
+    ap.add_argument("--tipos", nargs="+", choices=["COMPRA", "VENTA"], default=["COMPRA", "VENTA"])
+    ap.add_argument("--filas", type=int, default=1_000, help="filas de detalle por período")
+    ap.add_argument("--variantes", nargs="+", choices=VARIANTES, default=list(VARIANTES))
+    ap.add_argument("--semilla", type=int, default=0)
+    args = ap.parse_args(argv)
+
+    ruts = [f"{76_000_000 + i}-{i % 10}" for i in range(args.ruts)]
+    creados = generar(args.dir, ruts, periodos(args.desde, args.hasta), tipos=tuple(args.tipos),
+                      filas=args.filas, variantes=tuple(args.variantes), semilla=args.semilla)
+    mb = sum(p.stat().st_size for p in creados) / 1e6
+    print(f"{len(creados)} archivos ({mb:,.1f} MB) en {args.dir} | RUT: {', '.join(ruts)}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
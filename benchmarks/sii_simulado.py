@@ -0,0 +1,396 @@
+"""Sitio RCV del SII simulado (offline) para medir y probar la extracción.
+
+Uso:  python benchmarks/sii_simulado.py --puerto 8765 --latencia-ms 300 --fallo-descarga 0.05
+      BEKILLY_SII_URL=http://127.0.0.1:8765/consdcvinternetui/ bekilly-sii --config ...
+
+Reproduce lo que usa common_rcv: login AUT2000 (#rutcntr, #clave,
+#bt_ingresar), selector de período (#periodoMes, select[ng-model=periodoAnho]),
+botón Consultar, pestañas COMPRA/VENTA (a[ui-sref]) y los botones
+"Descargar Resumenes"/"Descargar Detalles", con la misma estructura de divs
+que debug/*.html para que los XPaths absolutos apunten a lo mismo. También
+responde los servicios facadeService del modo HTTP.
+
+Inyección de fallas (probabilidades por pedido): consulta con error (modal
+"Aceptar" y sin pestañas), descarga con HTTP 500 y sesión expirada (vuelve
+al login). GET /__stats devuelve los contadores del servidor.
+"""
+from __future__ import annotations
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass, asdict
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from conciliacion.sii.extraccion.http_rcv import nombre_archivo  # noqa: E402
+from generador_rcv import csv_rcv  # noqa: E402
+
+BASE = "/consdcvinternetui/"
+LOGIN = "/cgi_AUT2000/IngresoRutClave.html"
+LOGIN_POST = "/cgi_AUT2000/CAutInicio.cgi"
+SERVICIO = BASE + "services/data/facadeService/"
+
+@dataclass
+class Escenario:
+    latencia_ms: float = 150.0      # por consulta, descarga, login y servicio
+    jitter_ms: float = 50.0         # +- uniforme sobre la latencia
+    fallo_consulta: float = 0.0     # prob. de que Consultar muestre error
+    fallo_descarga: float = 0.0     # prob. de HTTP 500 en una descarga
+    expira_sesion: float = 0.0      # prob. de que una consulta caiga al login
+    filas: int = 200                # filas del detalle por período
+    semilla: int = 0
+
+# =========================
+# Páginas
+# =========================
+_LOGIN_HTML = """<!DOCTYPE html>
+<html lang="es"><head><meta charset="utf-8" /><title>Autenticación</title></head>
+<body><div class="container"><form method="post" action="{accion}">
+<input type="text" id="rutcntr" name="rutcntr" placeholder="RUT" />
+<input type="password" id="clave" name="clave" />
+<button type="submit" id="bt_ingresar" class="btn btn-block">Ingresar</button>
+</form></div></body></html>
+"""
+
+# Misma jerarquía de divs que debug/*.html (ver XPaths absolutos en common_rcv)
+_APP_HTML = """<!DOCTYPE html>
+<html ng-app="sampleMin" lang="es"><head><meta charset="utf-8" /><title>Registro de Compras y Ventas</title>
+<style>.modal{{display:none}}.modal.show{{display:block}}</style></head>
+<body class="">
+<nav id="my-menu" class="mm-menu"><div class="mm-navbar"><a href="#" id="closeMenu">Cerrar menú</a></div></nav>
+<div id="my-wrapper" class="mm-page mm-slideout">
+ <div class="web-sii cabecera hidden-xs"><div class="header"><span id="lastConexion">{rut}</span></div></div>
+ <div class="web-sii cuerpo">
+  <div class="container">
+   <div class="ng-scope">
+    <div class="col-md-12 ng-scope">
+     <div class="ng-scope">
+      <div class="ng-scope">
+       <div class="row"><div class="col-xs-12"><h2>REGISTRO DE COMPRAS Y VENTAS</h2></div></div>
+       <div class="row"><div class="col-xs-12"><p>Seleccione el período a consultar.</p></div></div>
+       <div class="panel panel-primary">
+        <div class="panel-body">
+         <form name="formContribuyente" class="form-inline" id="formContribuyente">
+          <div class="form-group"><label class="filter-col">RUT</label>
+           <select class="form-control" ng-model="rut" name="rut"><option value="{rut}">{rut}</option></select></div>
+          <div class="form-group"><label class="filter-col">Período</label>
+           <select class="form-control" id="periodoMes" ng-model="periodoMes">{meses}</select>
+           <select class="form-control" ng-model="periodoAnho">{anhos}</select></div>
+          <div class="form-group"><button type="submit" class="btn btn-default btn-xs-block btn-block">Consultar</button></div>
+         </form>
+        </div>
+       </div>
+      </div>
+     </div>
+     <div ng-show="(datos)" class="" id="pestanas" style="display:none">
+      <ul class="nav nav-tabs">
+       <li><a href="#compra/" ui-sref="compra" id="tabCompra"><strong>COMPRA</strong></a></li>
+       <li><a href="#venta/" ui-sref="venta"><strong>VENTA</strong></a></li>
+       <li><a href="#consasync/" ui-sref="consasync"><strong>CONSULTAS ASÍNCRONAS</strong></a></li>
+      </ul>
+     </div>
+    </div>
+   </div>
+   <div class="ng-scope">
+    <div class="col-md-12 ng-scope">
+     <div class="ng-scope">
+      <div class="ng-scope">
+       <div class="ng-scope" id="contenido" style="display:none">
+        <div class="row"><ul class="nav nav-pills"><li class="active"><a href="#registro/"><strong>Registro</strong></a></li></ul></div>
+        <div class="row"><h3 id="titulo">-</h3></div>
+        <div class="row"><table class="table"><tbody id="resumen"><tr><td>-</td></tr></tbody></table></div>
+        <div class="row"><div class="col-md-6 col-xs-12">
+         <div class="col-md-6 col-xs-12"><button type="button" class="btn btn-primary btn-block pull-right" id="btnResumen">Descargar Resumenes</button></div>
+         <div class="col-md-6 col-xs-12"><button type="button" class="btn btn-primary btn-block pull-right" id="btnDetalle">Descargar Detalles</button></div>
+        </div></div>
+       </div>
+      </div>
+     </div>
+    </div>
+   </div>
+  </div>
+ </div>
+</div>
+<div class="block-ui-message-container" id="cargando" style="display:none">Cargando...</div>
+<div class="modal" id="modalError" role="dialog"><div class="modal-body"><p id="msgError">-</p>
+<button type="button" class="btn btn-default" id="btnAceptar">Aceptar</button></div></div>
+<script src="app.js"></script>
+</body></html>
+"""
+
+_APP_JS = """(function () {
+  function $(id) { return document.getElementById(id); }
+  var periodo = null;
+  var resumen = {};
+
+  function tipoActivo() { return location.hash.indexOf("#venta/") === 0 ? "VENTA" : "COMPRA"; }
+
+  function pintar() {
+    var tipo = tipoActivo();
+    var lis = document.querySelectorAll(".nav-tabs > li");
+    lis[0].className = tipo === "COMPRA" ? "active" : "";
+    lis[1].className = tipo === "VENTA" ? "active" : "";
+    if (!periodo) { return; }
+    $("titulo").textContent = tipo + " " + periodo;
+    $("resumen").innerHTML = (resumen[tipo] || []).map(function (f) {
+      return "<tr><td>" + f.join("</td><td>") + "</td></tr>";
+    }).join("");
+  }
+
+  function descargar(clase) {
+    var a = document.createElement("a");
+    a.href = "api/descarga?tipo=" + tipoActivo() + "&clase=" + clase + "&periodo=" + periodo;
+    document.body.appendChild(a);
+    a.click();
+    a.remove();
+  }
+
+  $("formContribuyente").addEventListener("submit", function (ev) {
+    ev.preventDefault();
+    var p = document.querySelector("select[ng-model='periodoAnho']").value + $("periodoMes").value;
+    $("pestanas").style.display = "none";
+    $("contenido").style.display = "none";
+    $("cargando").style.display = "block";
+    fetch("api/consulta?periodo=" + p, {credentials: "same-origin"}).then(function (r) {
+      if (r.status === 401) { location.href = '""" + LOGIN + """'; return null; }
+      return r.json();
+    }).then(function (body) {
+      $("cargando").style.display = "none";
+      if (!body) { return; }
+      if (!body.ok) {
+        $("msgError").textContent = body.msg;
+        $("modalError").className = "modal show";
+        return;
+      }
+      periodo = p;
+      resumen = body.resumen;
+      $("pestanas").style.display = "block";
+      $("contenido").style.display = "block";
+      if (location.hash !== "#compra/") { location.hash = "#compra/"; } else { pintar(); }
+    });
+  });
+
+  $("btnAceptar").addEventListener("click", function () { $("modalError").className = "modal"; });
+  $("btnResumen").addEventListener("click", function () { descargar("resumen"); });
+  $("btnDetalle").addEventListener("click", function () { descargar("detalle"); });
+  window.addEventListener("hashchange", pintar);
+})();
+"""
+
+def pagina_app(rut: str, anho_max: int | None = None) -> str:
+    anho_max = anho_max or time.localtime().tm_year
+    meses = "".join(f'<option value="{m:02d}">{m:02d}</option>' for m in range(1, 13))
+    anhos = "".join(f'<option value="{a}">{a}</option>' for a in range(anho_max, 2016, -1))
+    return _APP_HTML.format(rut=rut, meses=meses, anhos=anhos)
+
+# =========================
+# Servidor
+# =========================
+class _Handler(BaseHTTPRequestHandler):
+    server: SIISimulado
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    # --- helpers
+    def _sesion(self) -> str | None:
+        c = SimpleCookie(self.headers.get("Cookie") or "")
+        token = c["TOKEN"].value if "TOKEN" in c else None
+        return self.server.sesiones.get(token)
+
+    def _responder(self, codigo: int, cuerpo: bytes = b"", tipo: str = "text/html; charset=utf-8",
+                   headers: dict | None = None) -> None:
+        self.send_response(codigo)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(cuerpo)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def _redirigir(self, destino: str, headers: dict | None = None) -> None:
+        self._responder(302, headers={"Location": destino, **(headers or {})})
+
+    def _json(self, codigo: int, data) -> None:
+        self._responder(codigo, json.dumps(data).encode(), "application/json")
+
+    # --- rutas
+    def do_GET(self):
+        url = urlsplit(self.path)
+        q = {k: v[0] for k, v in parse_qs(url.query).items()}
+        srv = self.server
+        if url.path == "/__stats":
+            return self._json(200, dict(srv.contadores))
+        if url.path == LOGIN:
+            srv.contar("login_form")
+            return self._responder(200, _LOGIN_HTML.format(accion=LOGIN_POST).encode())
+        if url.path == BASE + "app.js":
+            return self._responder(200, _APP_JS.encode(), "application/javascript")
+        if not url.path.startswith(BASE):
+            return self._responder(404)
+        rut = self._sesion()
+        if rut is None:
+            if url.path.startswith(BASE + "api/"):
+                return self._json(401, {"ok": False})
+            return self._redirigir(f"{LOGIN}?{BASE}")
+        if url.path == BASE:
+            return self._responder(200, pagina_app(rut).encode())
+        if url.path == BASE + "api/consulta":
+            return self._consulta(rut, q.get("periodo", ""))
+        if url.path == BASE + "api/descarga":
+            return self._descarga(rut, q.get("tipo", "COMPRA").upper(), q.get("clase", "detalle"), q.get("periodo", ""))
+        return self._responder(404)
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        largo = int(self.headers.get("Content-Length") or 0)
+        cuerpo = self.rfile.read(largo) if largo else b""
+        srv = self.server
+        if url.path == LOGIN_POST:
+            srv.esperar()
+            form = {k: v[0] for k, v in parse_qs(cuerpo.decode("latin-1")).items()}
+            rut = form.get("rutcntr", "").strip()
+            if not rut or not form.get("clave"):
+                srv.contar("login_rechazado")
+                return self._redirigir(LOGIN)
+            token = uuid.uuid4().hex
+            srv.sesiones[token] = rut
+            srv.contar("login")
+            return self._redirigir(BASE, {"Set-Cookie": f"TOKEN={token}; Path=/"})
+        if url.path.startswith(SERVICIO):
+            return self._servicio(url.path[len(SERVICIO):], cuerpo)
+        return self._responder(404)
+
+    def _consulta(self, rut: str, periodo: str) -> None:
+        srv = self.server
+        srv.esperar()
+        srv.contar("consulta")
+        if srv.sorteo(srv.escenario.expira_sesion):
+            srv.contar("sesion_expirada")
+            srv.cerrar_sesiones(rut)
+            return self._json(401, {"ok": False})
+        if srv.sorteo(srv.escenario.fallo_consulta):
+            srv.contar("consulta_fallida")
+            return self._json(200, {"ok": False, "msg": "Servicio no disponible, intente nuevamente."})
+        resumen = {}
+        for tipo in ("COMPRA", "VENTA"):
+            texto = csv_rcv(rut, tipo, "resumen", periodo, filas=srv.escenario.filas, semilla=srv.escenario.semilla)
+            resumen[tipo] = [linea.split(";") for linea in texto.decode("latin-1").splitlines()[1:]]
+        return self._json(200, {"ok": True, "resumen": resumen})
+
+    def _descarga(self, rut: str, tipo_up: str, clase: str, periodo: str) -> None:
+        srv = self.server
+        srv.esperar()
+        if srv.sorteo(srv.escenario.fallo_descarga):
+            srv.contar("descarga_fallida")
+            return self._responder(500)
+        datos = csv_rcv(rut, tipo_up, clase, periodo, filas=srv.escenario.filas, semilla=srv.escenario.semilla)
+        srv.contar(f"descarga_{clase}")
+        srv.contar("bytes", len(datos))
+        nombre = nombre_archivo(rut, tipo_up, clase, int(periodo[:4]), int(periodo[4:]))
+        return self._responder(200, datos, "text/csv; charset=ISO-8859-1",
+                               {"Content-Disposition": f'attachment; filename="{nombre}"'})
+
+    def _servicio(self, metodo: str, cuerpo: bytes) -> None:
+        srv = self.server
+        if self._sesion() is None:
+            return self._responder(401)
+        srv.esperar()
+        if srv.sorteo(srv.escenario.fallo_descarga):
+            srv.contar("servicio_fallido")
+            return self._responder(500)
+        data = json.loads(cuerpo or b"{}").get("data") or {}
+        rut = f"{data.get('rutEmisor', '')}-{data.get('dvEmisor', '')}"
+        clase = "detalle" if "Detalle" in metodo else "resumen"
+        texto = csv_rcv(rut, data.get("operacion", "COMPRA"), clase, data.get("ptributario", ""),
+                        filas=srv.escenario.filas, semilla=srv.escenario.semilla).decode("latin-1")
+        srv.contar(f"servicio_{clase}")
+        return self._json(200, {"data": texto.splitlines(), "respEstado": {"codRespuesta": 0}})
+
+class SIISimulado(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, escenario: Escenario, puerto: int = 0, host: str = "127.0.0.1"):
+        super().__init__((host, puerto), _Handler)
+        self.escenario = escenario
+        self.sesiones: dict[str, str] = {}
+        self.contadores: Counter = Counter()
+        self._rng = random.Random(escenario.semilla)
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, puerto = self.server_address[:2]
+        return f"http://{host}:{puerto}{BASE}"
+
+    def contar(self, clave: str, n: int = 1) -> None:
+        with self._lock:
+            self.contadores[clave] += n
+
+    def sorteo(self, p: float) -> bool:
+        if p <= 0:
+            return False
+        with self._lock:
+            return self._rng.random() < p
+
+    def esperar(self) -> None:
+        e = self.escenario
+        with self._lock:
+            ms = e.latencia_ms + self._rng.uniform(-e.jitter_ms, e.jitter_ms)
+        if ms > 0:
+            time.sleep(ms / 1000)
+
+    def cerrar_sesiones(self, rut: str) -> None:
+        with self._lock:
+            for token in [t for t, r in self.sesiones.items() if r == rut]:
+                del self.sesiones[token]
+
+def iniciar(escenario: Escenario | None = None, puerto: int = 0) -> SIISimulado:
+    """Levanta el servidor en un hilo de fondo; usar srv.url y srv.shutdown()."""
+    srv = SIISimulado(escenario or Escenario(), puerto)
+    threading.Thread(target=srv.serve_forever, name="sii-simulado", daemon=True).start()
+    return srv
+
+def argumentos_escenario(ap: argparse.ArgumentParser) -> None:
+    d = Escenario()
+    ap.add_argument("--latencia-ms", type=float, default=d.latencia_ms)
+    ap.add_argument("--jitter-ms", type=float, default=d.jitter_ms)
+    ap.add_argument("--fallo-consulta", type=float, default=d.fallo_consulta)
+    ap.add_argument("--fallo-descarga", type=float, default=d.fallo_descarga)
+    ap.add_argument("--expira-sesion", type=float, default=d.expira_sesion)
+    ap.add_argument("--filas", type=int, default=d.filas)
+    ap.add_argument("--semilla", type=int, default=d.semilla)
+
+def escenario_desde(args: argparse.Namespace) -> Escenario:
+    return Escenario(**{k: getattr(args, k) for k in asdict(Escenario())})
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--puerto", type=int, default=8765)
+    ap.add_argument("--host", default="127.0.0.1")
+    argumentos_escenario(ap)
+    args = ap.parse_args(argv)
+    srv = SIISimulado(escenario_desde(args), args.puerto, args.host)
+    print(f"SII simulado en {srv.url}  ({asdict(srv.escenario)})", flush=True)
+    print(f"  export BEKILLY_SII_URL={srv.url}", flush=True)
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        srv.server_close()
+        print(json.dumps(dict(srv.contadores)))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
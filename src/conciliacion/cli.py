@@ -3,12 +3,17 @@ from __future__ import annotations
 import argparse
 import os
 import sys
+from functools import partial
 from pathlib import Path
 
-import pandas as pd
 import yaml
 
-from conciliacion.sii import extraer_rcv_tipo, consolidar_libros_por_rut, calcular_efecto_neto
+from conciliacion import instrumentacion
+from conciliacion.sii import extraer_rcv_tipo
+from conciliacion.sii import almacen
+from conciliacion.sii import bitacora as bitacora_mod
+from conciliacion.escritores import con_sufijo
+from conciliacion.sii.pipeline import EscritorEnSegundoPlano, consolidar_y_calcular
 
 
 def _resolve_path(value: str | None, fallback_env: str | None = None) -> Path | None:
@@ -42,6 +47,11 @@ def build_parser() -> argparse.ArgumentParser:
         default=None,
         help="Ruta a chromedriver. Si no se indica, se asume en PATH.",
     )
+    ap.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continuar una corrida interrumpida: omite extracciones, consolidaciones y cálculos ya terminados.",
+    )
     return ap
 
 
@@ -75,6 +85,37 @@ def main(argv=None) -> int:
 
     ejecutar_extraccion = bool(cfg.get("ejecutar_extraccion", True))
 
+    # Almacén intermedio: Parquet (por defecto si hay pyarrow) y XLSX como exportación opcional
+    alm = cfg.get("almacen", {}) or {}
+    usar_parquet = alm.get("formato", "parquet" if almacen.disponible() else "xlsx") == "parquet"
+    exportar_xlsx = bool(alm.get("exportar_xlsx", True)) or not usar_parquet
+    parquet_dir = _resolve_path(alm.get("parquet_dir")) or base_dir / "parquet"
+    # Formato de los archivos exportados: xlsx (openpyxl | xlsxwriter), csv o parquet
+    sal = cfg.get("salida", {}) or {}
+    formato_salida = str(sal.get("formato", "xlsx")).lower()
+    backend = sal.get("backend_xlsx") if formato_salida == "xlsx" else formato_salida
+    # Métricas por etapa (JSON lines) si el YAML indica archivo
+    metricas = _resolve_path(cfg.get("metricas"))
+    instrumentacion.configurar(metricas)
+    escritor = EscritorEnSegundoPlano()
+
+    # Bitácora de trabajos (rut × tipo × período × etapa) para --resume
+    bitacora = bitacora_mod.Bitacora(_resolve_path(cfg.get("bitacora")) or base_dir / bitacora_mod.NOMBRE)
+    ruts = [str(c["rut"]).strip() for c in clientes]
+    if args.resume:
+        bitacora.recuperar()
+    else:
+        bitacora.reiniciar(ruts)
+    meses = bitacora_mod.meses(period["anho_inicio"], period["mes_inicio"], period["anho_fin"], period["mes_fin"])
+    plan = [(rut, t, bitacora_mod.TODOS, e) for rut in ruts for t in ("VENTA", "COMPRA") for e in ("consolidacion", "calculo")]
+    if ejecutar_extraccion:
+        plan += [(rut, t, p, "extraccion") for rut in ruts for t in ("VENTA", "COMPRA") for p in meses]
+    bitacora.planificar(plan)
+
+    def _confirmar(rut: str, tipo_up: str, ok: bool, error: str | None = None) -> None:
+        for etapa in ("consolidacion", "calculo"):
+            bitacora.terminar(rut, tipo_up, bitacora_mod.TODOS, etapa, ok=ok, error=error)
+
     for c in clientes:
         rut = str(c["rut"]).strip()
         print(f"\n=== Cliente: {rut} ===")
@@ -83,38 +124,57 @@ def main(argv=None) -> int:
             # Extracción
             if ejecutar_extraccion:
                 for tipo in ("venta", "compra"):
+                    rec = bitacora.reclamar("extraccion", tipos=[tipo.upper()], ruts=[rut])
+                    if rec is None:
+                        print(f"[Extracción] {tipo}: terminada según la bitácora; se omite")
+                        continue
                     print(f"[Extracción] {tipo} (headless={headless})...")
-                    extraer_rcv_tipo(
-                        rut=rut,
-                        clave=c["clave"],
-                        anho_ini=period["anho_inicio"],
-                        mes_ini=period["mes_inicio"],
-                        anho_fin=period["anho_fin"],
-                        mes_fin=period["mes_fin"],
-                        tipo=tipo,
-                        chromedriver_path=str(chromedriver) if chromedriver else None,
-                        carpeta_base=str(base_dir),
-                        headless=headless,              # <- NUEVO: se espera que el driver use --headless=new
-                        chrome_binary=chrome_binary,    # <- opcional: ruta a chrome
-                    )
-
-            # Consolidación
+                    try:
+                        extraer_rcv_tipo(
+                            rut=rut,
+                            clave=c["clave"],
+                            anho_ini=period["anho_inicio"],
+                            mes_ini=period["mes_inicio"],
+                            anho_fin=period["anho_fin"],
+                            mes_fin=period["mes_fin"],
+                            tipo=tipo,
+                            chromedriver_path=str(chromedriver) if chromedriver else None,
+                            carpeta_base=str(base_dir),
+                            headless=headless,              # <- NUEVO: se espera que el driver use --headless=new
+                            chrome_binary=chrome_binary,    # <- opcional: ruta a chrome
+                            bitacora=bitacora,
+                        )
+                    except Exception as e:
+                        bitacora.liberar(rec, ok=False, error=str(e))
+                        raise
+                    bitacora.liberar(rec, ok=True)
+                    # hubo descargas nuevas: el consolidado anterior ya no sirve
+                    bitacora.reabrir(rut, tipo.upper(), ("consolidacion", "calculo"))
+
+            # Consolidación -> cálculo en memoria; la escritura corre en segundo plano
             for tipo in ("venta", "compra"):
+                if bitacora.reclamar("consolidacion", tipos=[tipo.upper()], ruts=[rut]) is None:
+                    print(f"[Consolidación + Cálculo] {tipo}: terminado según la bitácora; se omite")
+                    continue
                 out_name = f"Consolidado_{'Venta' if tipo=='venta' else 'Compra'} - {rut}.xlsx"
-                salida = base_dir / f"SII_{rut}" / out_name
-                print(f"[Consolidación] {tipo} -> {salida.name}")
-                consolidar_libros_por_rut(str(base_dir), rut, tipo, str(encabezados), str(salida))
-
-                # Cálculo
-                if salida.exists():
-                    print(f"[Cálculo] {tipo}...")
-                    df = pd.read_excel(salida)
-                    df_calc = calcular_efecto_neto(df)
-                    salida_calc = salida.with_name(salida.stem.replace("Consolidado", "Calculado") + salida.suffix)
-                    df_calc.to_excel(salida_calc, index=False)
-                    print(f"[OK] {salida_calc.name}")
-                else:
-                    print(f"[Aviso] No existe {salida.name}; se omite cálculo de {tipo}")
+                salida = con_sufijo(base_dir / f"SII_{rut}" / out_name, backend)
+                salida_calc = salida.with_name(salida.stem.replace("Consolidado", "Calculado") + salida.suffix)
+                print(f"[Consolidación + Cálculo] {tipo} -> {salida.name if exportar_xlsx else parquet_dir}")
+                try:
+                    filas = consolidar_y_calcular(
+                        str(base_dir), rut, tipo, str(encabezados), escritor,
+                        salida_xlsx=salida if exportar_xlsx else None,
+                        salida_calc_xlsx=salida_calc if exportar_xlsx else None,
+                        parquet_dir=parquet_dir if usar_parquet else None,
+                        backend=backend,
+                    )
+                except Exception as e:
+                    _confirmar(rut, tipo.upper(), False, str(e))
+                    raise
+                if not filas:
+                    print(f"[Aviso] Sin consolidado de {tipo} para {rut}; se omite cálculo")
+                # se da por terminado recién con los archivos ya escritos
+                escritor.al_vaciar(partial(_confirmar, rut, tipo.upper(), error="falló la escritura"))
 
         except KeyboardInterrupt:
             print("Interrumpido por el usuario.")
@@ -124,6 +184,15 @@ def main(argv=None) -> int:
             # continúa con el siguiente cliente
             continue
 
+    print("\n[Escritura] esperando archivos pendientes...")
+    errores = escritor.cerrar()
+    print(instrumentacion.resumen())
+    print(bitacora.resumen())
+    bitacora.cerrar()
+    instrumentacion.registro().cerrar()
+    if errores:
+        print(f"[Error] {len(errores)} escrituras fallaron")
+        return 1
     return 0
 
 
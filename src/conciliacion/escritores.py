@@ -0,0 +1,211 @@
+from __future__ import annotations
+import csv
+from pathlib import Path
+import pandas as pd
+
+# Backends de escritura por lotes (escribir(df) varias veces, luego cerrar()):
+#   openpyxl   -> XLSX write-only (siempre disponible)
+#   xlsxwriter -> XLSX constant_memory (opcional, más rápido)
+#   csv        -> CSV en modo append
+#   parquet    -> un archivo Parquet vía pyarrow.ParquetWriter (opcional)
+# Los backends XLSX parten en hojas nuevas al llegar al límite de Excel.
+
+MAX_FILAS_EXCEL = 1_048_576  # incluye la fila de encabezado
+BACKENDS = ("openpyxl", "xlsxwriter", "csv", "parquet")
+SUFIJOS = {"openpyxl": ".xlsx", "xlsxwriter": ".xlsx", "csv": ".csv", "parquet": ".parquet"}
+
+def _filas_python(df: pd.DataFrame):
+    """Filas como tuplas con None en lugar de NaN/NA (lo que esperan los writers XLSX)."""
+    df = df.astype(object).where(df.notna(), None)
+    return df.itertuples(index=False, name=None)
+
+class _EscritorXlsxBase:
+    """Reparte filas en hojas Sheet1, Sheet2, ... de a lo más max_filas (con encabezado)."""
+
+    def __init__(self, path: Path, columnas: list[str], max_filas: int = MAX_FILAS_EXCEL):
+        self.path = Path(path)
+        self.columnas = list(columnas)
+        self.max_filas = max_filas
+        self.filas = 0
+        self.hojas = 0
+        self._en_hoja = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def _nueva_hoja(self) -> None:
+        self.hojas += 1
+        self._crear_hoja(f"Sheet{self.hojas}")
+        self._en_hoja = 0
+        self._agregar(self.columnas)
+        self._en_hoja = 1
+
+    def escribir(self, df: pd.DataFrame) -> None:
+        df = df.reindex(columns=self.columnas)
+        for fila in _filas_python(df):
+            if self.hojas == 0 or self._en_hoja >= self.max_filas:
+                self._nueva_hoja()
+            self._agregar(fila)
+            self._en_hoja += 1
+        self.filas += len(df)
+
+    def cerrar(self) -> None:
+        if self.hojas == 0:
+            self._nueva_hoja()
+        self._guardar()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.cerrar()
+
+class EscritorOpenpyxl(_EscritorXlsxBase):
+    """XLSX con el workbook write-only de openpyxl: no guarda objetos celda en memoria."""
+
+    def __init__(self, path: Path, columnas: list[str], max_filas: int = MAX_FILAS_EXCEL):
+        from openpyxl import Workbook
+        super().__init__(path, columnas, max_filas)
+        self._wb = Workbook(write_only=True)
+        self._ws = None
+
+    def _crear_hoja(self, nombre: str) -> None:
+        self._ws = self._wb.create_sheet(nombre)
+
+    def _agregar(self, fila) -> None:
+        self._ws.append(fila)
+
+    def _guardar(self) -> None:
+        self._wb.save(self.path)
+
+class EscritorXlsxwriter(_EscritorXlsxBase):
+    """XLSX con xlsxwriter en modo constant_memory (cada fila se vuelca al disco)."""
+
+    def __init__(self, path: Path, columnas: list[str], max_filas: int = MAX_FILAS_EXCEL):
+        try:
+            import xlsxwriter
+        except ImportError as e:
+            raise RuntimeError("El backend 'xlsxwriter' requiere el paquete xlsxwriter.") from e
+        super().__init__(path, columnas, max_filas)
+        self._wb = xlsxwriter.Workbook(str(self.path), {"constant_memory": True, "nan_inf_to_errors": True})
+        self._ws = None
+
+    def _crear_hoja(self, nombre: str) -> None:
+        self._ws = self._wb.add_worksheet(nombre)
+
+    def _agregar(self, fila) -> None:
+        self._ws.write_row(self._en_hoja, 0, fila)
+
+    def _guardar(self) -> None:
+        self._wb.close()
+
+class EscritorCsv:
+    def __init__(self, path: Path, columnas: list[str], **_):
+        self.path = Path(path)
+        self.columnas = list(columnas)
+        self.filas = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._f = open(self.path, "w", encoding="utf-8", newline="")
+        csv.writer(self._f).writerow(self.columnas)
+
+    def escribir(self, df: pd.DataFrame) -> None:
+        df.reindex(columns=self.columnas).to_csv(self._f, header=False, index=False)
+        self.filas += len(df)
+
+    def cerrar(self) -> None:
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.cerrar()
+
+class EscritorParquetArchivo:
+    """Un archivo Parquet escrito por row groups; el esquema lo fija el primer lote
+    (numéricos -> double, resto -> string). Para tipos que cambian entre lotes
+    usar el dataset particionado de conciliacion.sii.almacen."""
+
+    def __init__(self, path: Path, columnas: list[str], **_):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise RuntimeError("El backend 'parquet' requiere pyarrow.") from e
+        self._pa, self._pq = pa, pq
+        self.path = Path(path)
+        self.columnas = list(columnas)
+        self.filas = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._schema = None
+        self._writer = None
+
+    def _tabla(self, df: pd.DataFrame):
+        pa = self._pa
+        if self._schema is None:
+            campos = []
+            for c in self.columnas:
+                s = df[c]
+                numerico = pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s)
+                campos.append((str(c), pa.float64() if numerico else pa.string()))
+            self._schema = pa.schema(campos)
+        datos = {}
+        for campo in self._schema:
+            s = df[campo.name]
+            if campo.type == pa.float64():
+                datos[campo.name] = pd.to_numeric(s, errors="coerce").astype("float64")
+            else:
+                datos[campo.name] = s.astype("string")
+        return pa.Table.from_pandas(pd.DataFrame(datos), schema=self._schema, preserve_index=False)
+
+    def escribir(self, df: pd.DataFrame) -> None:
+        tabla = self._tabla(df.reindex(columns=self.columnas))
+        if self._writer is None:
+            self._writer = self._pq.ParquetWriter(self.path, self._schema, compression="zstd")
+        self._writer.write_table(tabla)
+        self.filas += len(df)
+
+    def cerrar(self) -> None:
+        if self._writer is None:
+            self._writer = self._pq.ParquetWriter(self.path, self._pa.schema([(str(c), self._pa.string()) for c in self.columnas]))
+        self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.cerrar()
+
+_CLASES = {
+    "openpyxl": EscritorOpenpyxl,
+    "xlsxwriter": EscritorXlsxwriter,
+    "csv": EscritorCsv,
+    "parquet": EscritorParquetArchivo,
+}
+
+def backend_por_defecto(path: str | Path) -> str:
+    suf = Path(path).suffix.lower()
+    if suf == ".csv":
+        return "csv"
+    if suf == ".parquet":
+        return "parquet"
+    if suf == ".xlsx":
+        return "openpyxl"
+    raise ValueError(f"Extensión no soportada: {suf}. Usa .xlsx, .csv o .parquet")
+
+def crear_escritor(path: str | Path, columnas: list[str], backend: str | None = None, **kwargs):
+    """Escritor por lotes para `path`; el backend se deduce de la extensión si no se indica."""
+    backend = (backend or backend_por_defecto(path)).lower()
+    if backend not in _CLASES:
+        raise ValueError(f"Backend desconocido: {backend}. Opciones: {', '.join(BACKENDS)}")
+    return _CLASES[backend](Path(path), columnas, **kwargs)
+
+def con_sufijo(path: str | Path, backend: str | None) -> Path:
+    """Ajusta la extensión de `path` al formato del backend (p.ej. csv -> .csv)."""
+    p = Path(path)
+    return p.with_suffix(SUFIJOS[backend]) if backend else p
+
+def escribir_dataframe(df: pd.DataFrame, path: str | Path, backend: str | None = None) -> Path:
+    """Escribe un DataFrame completo con el backend elegido."""
+    esc = crear_escritor(path, [str(c) for c in df.columns], backend)
+    with esc:
+        esc.escribir(df)
+    return esc.path
@@ -1,14 +1,112 @@
-
 from __future__ import annotations
 from pathlib import Path
+from typing import Iterator
 import pandas as pd
 
-def cargar(path: str | Path) -> pd.DataFrame:
+from .normalizacion import resolver_alias
+
+# Extensiones soportadas; los CSV pueden venir comprimidos (.csv.gz, .csv.zip,
+# .csv.bz2, .csv.xz: pandas infiere la compresión por el sufijo).
+_COMPRIMIDOS = {".gz", ".zip", ".bz2", ".xz"}
+# Columnas estándar que se leen como texto (no hace falta inferir su tipo)
+_TEXTO = ("glosa", "referencia")
+
+def _formato(p: Path) -> str:
+    sufijos = [s.lower() for s in p.suffixes]
+    if sufijos and sufijos[-1] in _COMPRIMIDOS:
+        sufijos = sufijos[:-1] or [".csv"]  # movimientos.gz -> se asume CSV
+    ext = sufijos[-1] if sufijos else ""
+    if ext == ".csv":
+        return "csv"
+    if ext == ".parquet":
+        return "parquet"
+    if ext == ".xlsx":
+        return "xlsx"
+    if ext == ".xls":
+        return "xls"
+    raise ValueError(f"Formato no soportado: {''.join(p.suffixes)}")
+
+def _encabezado(p: Path, formato: str) -> list[str]:
+    if formato == "csv":
+        return [str(c) for c in pd.read_csv(p, nrows=0).columns]
+    if formato == "parquet":
+        import pyarrow.parquet as pq
+        return list(pq.ParquetFile(p).schema_arrow.names)
+    if formato == "xlsx":
+        fila = next(_filas_xlsx(p), ())
+        return [str(c) for c in fila]
+    return [str(c) for c in pd.read_excel(p, nrows=0).columns]
+
+def _pushdown(p: Path, formato: str, mapping) -> tuple[list[str], dict[str, str]]:
+    """usecols/dtype para leer solo las columnas que usará normalizar_dataframe."""
+    alias = resolver_alias(_encabezado(p, formato), mapping)
+    usecols = [c for c in alias.values() if c is not None]
+    dtype = {alias[std]: "string" for std in _TEXTO if alias.get(std)}
+    return list(dict.fromkeys(usecols)), dtype
+
+def _filas_xlsx(p: Path):
+    """Filas (tuplas de valores) de la primera hoja, sin crear objetos celda."""
+    from openpyxl import load_workbook
+    wb = load_workbook(p, read_only=True, data_only=True)
+    try:
+        yield from wb.worksheets[0].iter_rows(values_only=True)
+    finally:
+        wb.close()
+
+def _iter_xlsx(p: Path, chunksize: int, usecols, dtype) -> Iterator[pd.DataFrame]:
+    filas = _filas_xlsx(p)
+    columnas = [str(c) for c in next(filas, ())]
+    idx = [columnas.index(c) for c in usecols] if usecols else list(range(len(columnas)))
+    nombres = [columnas[i] for i in idx]
+    lote: list = []
+    vacio = True
+    for fila in filas:
+        lote.append([fila[i] if i < len(fila) else None for i in idx])
+        if len(lote) >= chunksize:
+            yield pd.DataFrame(lote, columns=nombres).astype(dtype or {})
+            lote, vacio = [], False
+    if lote or vacio:  # solo encabezado: un lote vacío con sus columnas
+        yield pd.DataFrame(lote, columns=nombres).astype(dtype or {})
+
+def _iter_parquet(p: Path, chunksize: int, usecols, dtype) -> Iterator[pd.DataFrame]:
+    import pyarrow.parquet as pq
+    for batch in pq.ParquetFile(p).iter_batches(batch_size=chunksize, columns=usecols):
+        yield batch.to_pandas().astype(dtype or {})
+
+def cargar(
+    path: str | Path,
+    *,
+    chunksize: int | None = None,
+    mapping: dict[str, list[str]] | None = None,
+    usecols: list[str] | None = None,
+    dtype: dict[str, str] | None = None,
+) -> pd.DataFrame | Iterator[pd.DataFrame]:
+    """Carga CSV (también .gz/.zip/.bz2/.xz), Parquet, XLSX o XLS.
+
+    Con `chunksize` devuelve un iterador de DataFrames de a lo más esa
+    cantidad de filas (para normalizar por partes). Con `mapping` (p.ej.
+    normalizacion.DEFAULT_MAPPING) solo se leen las columnas que tienen
+    alias en el mapeo, y glosa/referencia se leen como texto. Los XLSX se
+    leen en modo read-only de openpyxl, fila a fila.
+    """
     p = Path(path)
     if not p.exists():
         raise FileNotFoundError(f"No existe archivo: {p}")
-    if p.suffix.lower() == ".csv":
-        return pd.read_csv(p)
-    if p.suffix.lower() in {".xls", ".xlsx"}:
-        return pd.read_excel(p)
-    raise ValueError(f"Formato no soportado: {p.suffix}")
+    formato = _formato(p)
+    if mapping is not None and usecols is None:
+        usecols, dtype_mapeo = _pushdown(p, formato, mapping)
+        dtype = {**dtype_mapeo, **(dtype or {})}
+
+    if formato == "csv":
+        return pd.read_csv(p, usecols=usecols, dtype=dtype, chunksize=chunksize)
+    if formato == "xls":
+        df = pd.read_excel(p, usecols=usecols, dtype=dtype)
+        return iter([df]) if chunksize else df
+
+    if formato == "parquet":
+        if chunksize:
+            return _iter_parquet(p, chunksize, usecols, dtype)
+        import pyarrow.parquet as pq
+        return pq.read_table(p, columns=usecols).to_pandas().astype(dtype or {})
+    lotes = _iter_xlsx(p, chunksize or 100_000, usecols, dtype)
+    return lotes if chunksize else pd.concat(lotes, ignore_index=True)
@@ -0,0 +1,158 @@
+from __future__ import annotations
+import contextvars
+import json
+import math
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator
+
+try:  # no existe en Windows
+    import resource
+except ImportError:  # pragma: no cover - depende del sistema
+    resource = None
+
+# Métricas por etapa del pipeline como líneas JSON:
+#   {"ts": ..., "etapa": "descarga", "rut": ..., "tipo": ..., "periodo": "2024-01",
+#    "seg": 1.23, "cpu_s": 0.01, "rss_pico_mb": 212.4, "filas": null, "bytes": 4096, "ok": true}
+# Etapas: arranque_driver, login, consulta_periodo, pestaña, descarga,
+# descarga_http, csv_parse, consolidacion, calculo, escritura y
+# comandos_webdriver (período completo de la UI, con "comandos": round trips
+# al chromedriver; no suma en "Períodos más lentos"). cpu_s es CPU
+# del hilo que midió (no incluye Chrome ni los procesos del pool, salvo
+# csv_parse que se mide en el worker); rss_pico_mb es el máximo del proceso
+# hasta ese momento.
+
+_etiquetas: contextvars.ContextVar[dict] = contextvars.ContextVar("etiquetas_metricas", default={})
+
+def _rss_pico_mb() -> float | None:
+    if resource is None:
+        return None
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)  # Linux: KiB
+
+class Registro:
+    """Acumula eventos en memoria y, si tiene archivo, los agrega como JSON lines."""
+
+    def __init__(self, archivo: str | Path | None = None):
+        self._lock = threading.Lock()
+        self.eventos: list[dict] = []
+        self.archivo = Path(archivo) if archivo else None
+        self._f = None
+        if self.archivo:
+            self.archivo.parent.mkdir(parents=True, exist_ok=True)
+            self._f = open(self.archivo, "a", encoding="utf-8")
+
+    def emitir(self, evento: dict) -> None:
+        with self._lock:
+            self.eventos.append(evento)
+            if self._f:
+                self._f.write(json.dumps(evento, ensure_ascii=False, default=str) + "\n")
+                self._f.flush()
+
+    def cerrar(self) -> None:
+        with self._lock:
+            if self._f:
+                self._f.close()
+                self._f = None
+
+_REGISTRO = Registro()
+
+def configurar(archivo: str | Path | None = None) -> Registro:
+    """Reinicia el registro global; con `archivo`, escribe cada evento ahí (JSONL)."""
+    global _REGISTRO
+    _REGISTRO.cerrar()
+    _REGISTRO = Registro(archivo)
+    return _REGISTRO
+
+def registro() -> Registro:
+    return _REGISTRO
+
+@contextmanager
+def contexto(**etiquetas: Any) -> Iterator[None]:
+    """Etiquetas (rut, tipo, periodo...) que heredan los spans de este hilo."""
+    token = _etiquetas.set({**_etiquetas.get(), **etiquetas})
+    try:
+        yield
+    finally:
+        _etiquetas.reset(token)
+
+def registrar(etapa: str, seg: float, *, cpu_s: float | None = None, ok: bool = True,
+              error: str | None = None, filas: int | None = None, bytes: int | None = None,
+              **etiquetas: Any) -> None:
+    """Emite un evento ya medido (p.ej. una descarga cronometrada por el seguidor)."""
+    _REGISTRO.emitir({
+        "ts": round(time.time(), 3),
+        "etapa": etapa,
+        **_etiquetas.get(),
+        **etiquetas,
+        "seg": round(seg, 4),
+        "cpu_s": None if cpu_s is None else round(cpu_s, 4),
+        "rss_pico_mb": _rss_pico_mb(),
+        "filas": filas,
+        "bytes": bytes,
+        "ok": ok,
+        **({"error": error} if error else {}),
+    })
+
+class Span:
+    """Medición en curso; el código medido puede fijar filas/bytes."""
+
+    def __init__(self):
+        self.filas: int | None = None
+        self.bytes: int | None = None
+
+@contextmanager
+def medir(etapa: str, **etiquetas: Any) -> Iterator[Span]:
+    """Mide wall time y CPU del hilo de un bloque y lo emite al salir (también si falla)."""
+    sp = Span()
+    t0, c0 = time.perf_counter(), time.thread_time()
+    error = None
+    try:
+        yield sp
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        registrar(etapa, time.perf_counter() - t0, cpu_s=time.thread_time() - c0,
+                  ok=error is None, error=error, filas=sp.filas, bytes=sp.bytes, **etiquetas)
+
+# --- Resumen -----------------------------------------------------------------
+
+def _percentil(valores: list[float], p: float) -> float:
+    orden = sorted(valores)
+    return orden[max(0, math.ceil(p / 100 * len(orden)) - 1)]
+
+def resumen(eventos: list[dict] | None = None, *, top: int = 5) -> str:
+    """Tabla por etapa (n, total, p50, p95, máx) y los períodos más lentos."""
+    eventos = _REGISTRO.eventos if eventos is None else eventos
+    if not eventos:
+        return "[MÉTRICAS] sin eventos"
+    por_etapa: dict[str, list[float]] = defaultdict(list)
+    por_periodo: dict[tuple, float] = defaultdict(float)
+    comandos: list[int] = []
+    fallos = 0
+    for ev in eventos:
+        por_etapa[ev["etapa"]].append(ev["seg"])
+        fallos += not ev.get("ok", True)
+        if ev.get("comandos") is not None:
+            comandos.append(ev["comandos"])  # envuelve a las demás etapas del período
+        elif ev.get("periodo"):
+            por_periodo[(ev.get("rut") or "", ev.get("tipo") or "", ev["periodo"])] += ev["seg"]
+    lineas = [f"[MÉTRICAS] {len(eventos)} eventos | {fallos} con error",
+              f"  {'etapa':<18}{'n':>6}{'total s':>10}{'p50 s':>9}{'p95 s':>9}{'máx s':>9}"]
+    for etapa, segs in sorted(por_etapa.items(), key=lambda kv: -sum(kv[1])):
+        lineas.append(f"  {etapa:<18}{len(segs):>6}{sum(segs):>10.1f}{_percentil(segs, 50):>9.2f}"
+                      f"{_percentil(segs, 95):>9.2f}{max(segs):>9.2f}")
+    if por_periodo:
+        lineas.append("  Períodos más lentos (suma de etapas):")
+        for (rut, tipo, periodo), seg in sorted(por_periodo.items(), key=lambda kv: -kv[1])[:top]:
+            lineas.append(f"    {rut} {tipo} {periodo}: {seg:.1f}s")
+    if comandos:
+        lineas.append(f"  Comandos WebDriver por período: p50 {_percentil(comandos, 50)} | "
+                      f"máx {max(comandos)} | total {sum(comandos)}")
+    pico = max((ev["rss_pico_mb"] or 0) for ev in eventos)
+    if pico:
+        lineas.append(f"  RSS pico del proceso: {pico:,.0f} MB")
+    return "\n".join(lineas)
@@ -1,12 +1,505 @@
-
 from __future__ import annotations
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from difflib import SequenceMatcher
+import numpy as np
 import pandas as pd
 
-def conciliar(df_banco: pd.DataFrame, df_libro: pd.DataFrame, tol_abs: float = 0.0) -> pd.DataFrame:
-    b = df_banco.copy()
-    l = df_libro.copy()
-    b["key"] = b["fecha"].dt.date.astype("string") + "|" + b["monto"].round(2).astype("string")
-    l["key"] = l["fecha"].dt.date.astype("string") + "|" + l["monto"].round(2).astype("string")
-    merged = b.merge(l, on="key", how="outer", suffixes=("_banco", "_libro"), indicator=True)
-    merged["match"] = merged["_merge"].eq("both")
-    return merged.drop(columns=["_merge", "key"])
+# Motor de conciliación banco <-> libro, uno a uno.
+#
+# Las llaves son numéricas: día (int, días desde 1970) y monto en centavos
+# (int). Primero se emparejan las llaves exactas (duplicadas se emparejan por
+# orden de aparición, sin producto cartesiano); luego, sobre lo que sobra, se
+# buscan candidatos dentro de `tol_abs` y `dias` con búsqueda binaria sobre el
+# libro ordenado y se asigna de forma voraz por cercanía (monto, días, texto).
+
+def _claves(df: pd.DataFrame) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(día, centavos, válido) como arrays int64/bool."""
+    fecha = pd.to_datetime(df["fecha"], errors="coerce")
+    monto = pd.to_numeric(df["monto"], errors="coerce")
+    valido = (fecha.notna() & monto.notna()).to_numpy()
+    dia = fecha.to_numpy(dtype="datetime64[ns]").astype("datetime64[D]").astype(np.int64)
+    cent = np.rint(monto.fillna(0).to_numpy(dtype="float64") * 100).astype(np.int64)
+    return np.where(valido, dia, 0), np.where(valido, cent, 0), valido
+
+def _texto(df: pd.DataFrame, col: str) -> np.ndarray:
+    if col not in df.columns:
+        return np.full(len(df), "", dtype=object)
+    return df[col].astype("string").fillna("").str.strip().str.lower().to_numpy(dtype=object)
+
+def _similitud(banco: pd.DataFrame, libro: pd.DataFrame, pb: np.ndarray, pl: np.ndarray) -> np.ndarray:
+    """1.0 si la referencia coincide; si no, parecido de la glosa (0..1)."""
+    rb, rl = _texto(banco, "referencia"), _texto(libro, "referencia")
+    gb, gl = _texto(banco, "glosa"), _texto(libro, "glosa")
+    sim = np.empty(len(pb))
+    for k, (i, j) in enumerate(zip(pb, pl, strict=True)):
+        if rb[i] and rb[i] == rl[j]:
+            sim[k] = 1.0
+        elif gb[i] and gl[j]:
+            sim[k] = SequenceMatcher(None, gb[i], gl[j]).quick_ratio() * 0.99
+        else:
+            sim[k] = 0.0
+    return sim
+
+def _pares_exactos(db, cb, ib, dl, cl, il, solo_unicos: bool) -> tuple[np.ndarray, np.ndarray]:
+    """Empareja llaves (día, centavos) iguales; la k-ésima ocurrencia con la k-ésima."""
+    fb = pd.DataFrame({"d": db, "c": cb, "ib": ib})
+    fl = pd.DataFrame({"d": dl, "c": cl, "il": il})
+    if solo_unicos:
+        # con desempate por texto, las llaves repetidas se resuelven en la pasada por candidatos
+        fb = fb[~fb.duplicated(["d", "c"], keep=False)]
+        fl = fl[~fl.duplicated(["d", "c"], keep=False)]
+    fb["n"] = fb.groupby(["d", "c"], sort=False).cumcount()
+    fl["n"] = fl.groupby(["d", "c"], sort=False).cumcount()
+    m = fb.merge(fl, on=["d", "c", "n"], how="inner", sort=False)
+    return m["ib"].to_numpy(np.int64), m["il"].to_numpy(np.int64)
+
+def _candidatos(db, cb, ib, dl, cl, il, tol: int, dias: int, max_candidatos: int):
+    """Pares (banco, libro) con |Δcentavos| <= tol y |Δdías| <= dias, a lo más
+    max_candidatos por fila de banco (los más cercanos en el orden del libro)."""
+    vacio = np.empty(0, np.int64)
+    if not len(ib) or not len(il):
+        return vacio, vacio, vacio, vacio
+    dmin = min(db.min(), dl.min()) - dias
+    ancho = max(db.max(), dl.max()) + dias - dmin + 1
+    # llave compuesta centavos*ancho + día: el libro queda ordenado por monto y luego fecha
+    tope = max(np.abs(cb).max(), np.abs(cl).max()) + tol + 1
+    if tope * ancho >= 2**62:
+        raise OverflowError("montos demasiado grandes para la llave compuesta")
+    kl = cl * ancho + (dl - dmin)
+    orden = np.argsort(kl, kind="stable")
+    kl, dl, cl, il = kl[orden], dl[orden], cl[orden], il[orden]
+
+    rel = db - dmin
+    lo = np.searchsorted(kl, (cb - tol) * ancho + rel - dias, "left")
+    hi = np.searchsorted(kl, (cb + tol) * ancho + rel + dias, "right")
+    grandes = hi - lo > max_candidatos
+    if grandes.any():
+        centro = np.searchsorted(kl, cb * ancho + rel, "left")
+        lo2 = np.clip(centro - max_candidatos // 2, lo, hi)
+        hi2 = np.minimum(hi, lo2 + max_candidatos)
+        lo2 = np.maximum(lo, hi2 - max_candidatos)
+        lo, hi = np.where(grandes, lo2, lo), np.where(grandes, hi2, hi)
+
+    n = hi - lo
+    total = int(n.sum())
+    if not total:
+        return vacio, vacio, vacio, vacio
+    fila = np.repeat(np.arange(len(ib)), n)
+    pos = np.arange(total) - np.repeat(np.cumsum(n) - n, n) + np.repeat(lo, n)
+    ok = (np.abs(cl[pos] - cb[fila]) <= tol) & (np.abs(dl[pos] - db[fila]) <= dias)
+    fila, pos = fila[ok], pos[ok]
+    return ib[fila], il[pos], np.abs(cl[pos] - cb[fila]), np.abs(dl[pos] - db[fila])
+
+def _asignar(pb, pl, orden) -> tuple[np.ndarray, np.ndarray]:
+    """Asignación voraz uno a uno: acepta los pares que son el mejor candidato
+    tanto de su fila de banco como de su fila de libro, descarta los que
+    tocan filas ya usadas y repite. Equivale a recorrer los pares en `orden`."""
+    pb, pl = pb[orden], pl[orden]
+    usado_b = np.zeros(pb.max() + 1, bool)
+    usado_l = np.zeros(pl.max() + 1, bool)
+    sb, sl = [], []
+    while len(pb):
+        _, ib = np.unique(pb, return_index=True)
+        _, il = np.unique(pl, return_index=True)
+        mejor_b = np.zeros(len(pb), bool)
+        mejor_l = np.zeros(len(pb), bool)
+        mejor_b[ib] = True
+        mejor_l[il] = True
+        acepta = mejor_b & mejor_l
+        ab, al = pb[acepta], pl[acepta]
+        sb.append(ab)
+        sl.append(al)
+        usado_b[ab] = True
+        usado_l[al] = True
+        libre = ~usado_b[pb] & ~usado_l[pl]
+        pb, pl = pb[libre], pl[libre]
+    if not sb:
+        return np.empty(0, np.int64), np.empty(0, np.int64)
+    return np.concatenate(sb), np.concatenate(sl)
+
+def emparejar(
+    banco: pd.DataFrame,
+    libro: pd.DataFrame,
+    tol_abs: float = 0.0,
+    *,
+    dias: int = 0,
+    fuzzy: bool = False,
+    max_candidatos: int = 50,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Posiciones (banco, libro) emparejadas uno a uno; ver conciliar()."""
+    db, cb, vb = _claves(banco)
+    dl, cl, vl = _claves(libro)
+    ib, il = np.flatnonzero(vb), np.flatnonzero(vl)
+    tol = int(round(tol_abs * 100))
+
+    eb, el = _pares_exactos(db[ib], cb[ib], ib, dl[il], cl[il], il, solo_unicos=fuzzy)
+    usados_b = np.zeros(len(banco), bool)
+    usados_l = np.zeros(len(libro), bool)
+    usados_b[eb] = True
+    usados_l[el] = True
+    if tol == 0 and dias == 0 and not fuzzy:
+        return eb, el
+
+    rb, rl = ib[~usados_b[ib]], il[~usados_l[il]]
+    pb, pl, dmonto, ddias = _candidatos(db[rb], cb[rb], rb, dl[rl], cl[rl], rl, tol, int(dias), max_candidatos)
+    if not len(pb):
+        return eb, el
+    sim = _similitud(banco, libro, pb, pl) if fuzzy else np.zeros(len(pb))
+    orden = np.lexsort((pl, pb, -sim, ddias, dmonto))
+    ab, al = _asignar(pb, pl, orden)
+    return np.concatenate([eb, ab]), np.concatenate([el, al])
+
+# --- Segunda pasada: grupos (varios a uno) ----------------------------------
+#
+# Sobre lo que quedó sin pareja busca combinaciones de 2..max_grupo filas de
+# un lado cuya suma calce con una fila del otro (un depósito que paga varias
+# facturas, o una factura pagada en cuotas). La búsqueda se acota por bloque
+# (contraparte), ventana de días, candidatos por objetivo y tiempo por bloque.
+
+class _SinTiempo(Exception):
+    pass
+
+def _buscar_suma(valores: list[int], objetivo: int, tol: int, max_grupo: int, limite: float) -> list[int] | None:
+    """Índices de 2..max_grupo `valores` (positivos, orden descendente) que suman
+    `objetivo` ± tol. Lanza _SinTiempo si se pasa de `limite` (time.monotonic)."""
+    suf = np.concatenate([np.cumsum(valores[::-1])[::-1], [0]]).tolist()
+    n = len(valores)
+    nodos = 0
+
+    def rec(inicio: int, restante: int, elegidos: list[int]) -> list[int] | None:
+        nonlocal nodos
+        if len(elegidos) >= 2 and abs(restante) <= tol:
+            return elegidos
+        if len(elegidos) == max_grupo:
+            return None
+        for i in range(inicio, n):
+            if suf[i] < restante - tol:
+                break  # ni sumando todo lo que queda se alcanza
+            v = valores[i]
+            if v > restante + tol:
+                continue
+            nodos += 1
+            if nodos % 256 == 0 and time.monotonic() > limite:
+                raise _SinTiempo
+            r = rec(i + 1, restante - v, elegidos + [i])
+            if r:
+                return r
+        return None
+
+    return rec(0, objetivo, [])
+
+def _grupos_dirigidos(obj, cand, *, tol, dias, max_grupo, max_candidatos, presupuesto_s, limites):
+    """Cada fila de `obj` busca un grupo en `cand` dentro de su bloque.
+
+    obj/cand: dict con arrays "pos", "dia", "cent", "bloque". `limites`
+    (bloque -> time.monotonic) se comparte entre ambos sentidos: el
+    presupuesto es por bloque, no por pasada. Devuelve una lista de
+    (pos_obj, [pos_cand, ...]).
+    """
+    encontrados = []
+    usado = np.zeros(len(cand["pos"]), bool)
+    por_bloque: dict = {}
+    for k, blq in enumerate(cand["bloque"]):
+        por_bloque.setdefault(blq, []).append(k)
+    objetivos: dict = {}
+    for k, blq in enumerate(obj["bloque"]):
+        if blq in por_bloque:
+            objetivos.setdefault(blq, []).append(k)
+
+    for blq, ks in objetivos.items():
+        # candidatos del bloque por fecha: la ventana de días es un corte por searchsorted
+        idx = np.array(por_bloque[blq])
+        idx = idx[np.argsort(cand["dia"][idx], kind="stable")]
+        dias_blq = cand["dia"][idx]
+        limite = limites.setdefault(blq, time.monotonic() + presupuesto_s)
+        for k in sorted(ks, key=lambda k: (obj["dia"][k], obj["pos"][k])):
+            if time.monotonic() > limite:
+                break  # bloque agotado: sus filas siguen sin pareja
+            objetivo = int(obj["cent"][k])
+            if objetivo == 0:
+                continue
+            d = obj["dia"][k]
+            ventana = idx[np.searchsorted(dias_blq, d - dias, "left"):np.searchsorted(dias_blq, d + dias, "right")]
+            signo = 1 if objetivo > 0 else -1
+            c = cand["cent"][ventana] * signo
+            ddias = np.abs(cand["dia"][ventana] - d)
+            ok = ~usado[ventana] & (c > 0) & (c <= abs(objetivo) + tol)
+            sel = ventana[ok]
+            if len(sel) < 2:
+                continue
+            if len(sel) > max_candidatos:
+                sel = sel[np.argsort(ddias[ok], kind="stable")[:max_candidatos]]
+            sel = sel[np.argsort(-(cand["cent"][sel] * signo), kind="stable")]
+            try:
+                r = _buscar_suma((cand["cent"][sel] * signo).tolist(), abs(objetivo), tol, max_grupo, limite)
+            except _SinTiempo:
+                break  # bloque agotado: sus filas siguen sin pareja
+            if r:
+                miembros = sel[r]
+                usado[miembros] = True
+                encontrados.append((int(obj["pos"][k]), cand["pos"][miembros].tolist()))
+    return encontrados
+
+def _bloques(df: pd.DataFrame, col: str | None) -> np.ndarray:
+    if not col or col not in df.columns:
+        return np.zeros(len(df), dtype=object)
+    # normaliza solo los valores distintos (pocos RUT, muchas filas)
+    codigos, unicos = pd.factorize(df[col], use_na_sentinel=False)
+    unicos = pd.Series(unicos, dtype="string").fillna("").str.strip().str.upper().to_numpy(dtype=object)
+    return unicos[codigos]
+
+def emparejar_grupos(
+    banco: pd.DataFrame,
+    libro: pd.DataFrame,
+    libres_b: np.ndarray,
+    libres_l: np.ndarray,
+    tol_abs: float = 0.0,
+    *,
+    dias: int = 0,
+    col_contraparte: str | tuple[str, str] | None = None,
+    max_grupo: int = 4,
+    max_candidatos: int = 25,
+    presupuesto_s: float = 0.5,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Grupos varios-a-uno entre las filas libres, en ambos sentidos.
+
+    Primero un movimiento de banco contra varias filas del libro, luego una
+    fila del libro contra varios movimientos. Devuelve (pos_banco, pos_libro,
+    grupo) con una fila por par; los pares de un mismo grupo comparten id.
+    """
+    cb_col, cl_col = col_contraparte if isinstance(col_contraparte, tuple) else (col_contraparte,) * 2
+    db, cb, vb = _claves(banco)
+    dl, cl, vl = _claves(libro)
+    libres_b = libres_b[vb[libres_b]]
+    libres_l = libres_l[vl[libres_l]]
+    blq_b, blq_l = _bloques(banco, cb_col), _bloques(libro, cl_col)
+    tol = int(round(tol_abs * 100))
+    opciones = dict(tol=tol, dias=int(dias), max_grupo=max_grupo,
+                    max_candidatos=max_candidatos, presupuesto_s=presupuesto_s, limites={})
+
+    def _lado(pos, d, c, blq):
+        return {"pos": pos, "dia": d[pos], "cent": c[pos], "bloque": blq[pos]}
+
+    pb, pl, grupo = [], [], []
+    # banco -> varias del libro
+    uno_a_varios = _grupos_dirigidos(_lado(libres_b, db, cb, blq_b), _lado(libres_l, dl, cl, blq_l), **opciones)
+    tomados_l = {j for _, js in uno_a_varios for j in js}
+    tomados_b = {i for i, _ in uno_a_varios}
+    for g, (i, js) in enumerate(uno_a_varios):
+        pb += [i] * len(js)
+        pl += js
+        grupo += [g] * len(js)
+    # libro -> varios del banco (cuotas), con lo que sigue libre
+    resto_b = np.array([i for i in libres_b if i not in tomados_b], dtype=np.int64)
+    resto_l = np.array([j for j in libres_l if j not in tomados_l], dtype=np.int64)
+    varios_a_uno = _grupos_dirigidos(_lado(resto_l, dl, cl, blq_l), _lado(resto_b, db, cb, blq_b), **opciones)
+    for g, (j, is_) in enumerate(varios_a_uno, start=len(uno_a_varios)):
+        pb += is_
+        pl += [j] * len(is_)
+        grupo += [g] * len(is_)
+    return np.array(pb, np.int64), np.array(pl, np.int64), np.array(grupo, np.int64)
+
+# --- Conciliación particionada ----------------------------------------------
+#
+# Ambos lados se parten por una llave de bloqueo (mes, contraparte, tramo de
+# monto) y cada partición se empareja en un pool de procesos; los workers solo
+# reciben las columnas necesarias de su partición y devuelven posiciones. Lo
+# que cruza bordes de partición (ventana de días, tolerancia, otra
+# contraparte) se recoge con una pasada global sobre lo que sobró.
+
+PARTICION = ("mes", "contraparte", "monto")
+_FILAS_POR_TAREA = 200_000
+
+def _llaves_particion(df: pd.DataFrame, por, col_contraparte: str | None) -> pd.DataFrame:
+    fecha = pd.to_datetime(df["fecha"], errors="coerce")
+    llaves = {}
+    if "mes" in por:
+        llaves["mes"] = (fecha.dt.year * 12 + fecha.dt.month).fillna(-1).astype(np.int64).to_numpy()
+    if "contraparte" in por and col_contraparte:
+        llaves["contraparte"] = _bloques(df, col_contraparte)
+    if "monto" in por:
+        # tramo por orden de magnitud: 0 (<10), 1 (<100), ...; con signo
+        m = pd.to_numeric(df["monto"], errors="coerce").fillna(0).to_numpy(dtype="float64")
+        llaves["monto"] = (np.sign(m) * np.floor(np.log10(np.abs(m) + 1))).astype(np.int64)
+    return pd.DataFrame(llaves, index=df.index)
+
+def _libres(n: int, usados: np.ndarray) -> np.ndarray:
+    libre = np.ones(n, bool)
+    libre[usados] = False
+    return np.flatnonzero(libre)
+
+def _columnas_trabajo(df: pd.DataFrame, fuzzy: bool) -> list[str]:
+    return [c for c in ("fecha", "monto") + (("glosa", "referencia") if fuzzy else ()) if c in df.columns]
+
+def _emparejar_tarea(banco: pd.DataFrame, libro: pd.DataFrame, tol_abs: float, opciones: dict):
+    """Corre en el pool: empareja la tarea y traduce a posiciones globales (el índice)."""
+    pb, pl = emparejar(banco.reset_index(drop=True), libro.reset_index(drop=True), tol_abs, **opciones)
+    return banco.index.to_numpy()[pb], libro.index.to_numpy()[pl]
+
+def _tareas(banco, libro, por, col_b, col_l, cols_b, cols_l):
+    """Ordena ambos lados por llave de partición y los corta en tareas de
+    ~_FILAS_POR_TAREA filas sin partir ninguna partición. Una tarea puede
+    juntar varias particiones chicas (vecinas en el orden de la llave)."""
+    kb = _llaves_particion(banco, por, col_b)
+    kl = _llaves_particion(libro, por, col_l)
+    if kb.shape[1] == 0:
+        yield banco[cols_b], libro[cols_l]
+        return
+    codigos = pd.concat([kb, kl], ignore_index=True).groupby(list(kb.columns), sort=True).ngroup().to_numpy()
+    cod_b, cod_l = codigos[: len(banco)], codigos[len(banco):]
+    n = int(codigos.max()) + 1
+    fin_b = np.cumsum(np.bincount(cod_b, minlength=n))
+    fin_l = np.cumsum(np.bincount(cod_l, minlength=n))
+    total = fin_b + fin_l
+    cortes = np.searchsorted(total, np.arange(_FILAS_POR_TAREA, total[-1], _FILAS_POR_TAREA))
+    cortes = np.unique(np.append(np.minimum(cortes, n - 1), n - 1))
+    orden_b = np.argsort(cod_b, kind="stable")
+    orden_l = np.argsort(cod_l, kind="stable")
+    ini_b = ini_l = 0
+    for c in cortes:
+        filas_b = np.sort(orden_b[ini_b:fin_b[c]])
+        filas_l = np.sort(orden_l[ini_l:fin_l[c]])
+        ini_b, ini_l = fin_b[c], fin_l[c]
+        if len(filas_b) and len(filas_l):
+            yield banco.iloc[filas_b][cols_b], libro.iloc[filas_l][cols_l]
+
+def emparejar_particionado(
+    banco: pd.DataFrame,
+    libro: pd.DataFrame,
+    tol_abs: float = 0.0,
+    *,
+    workers: int,
+    por=PARTICION,
+    col_contraparte: str | tuple[str, str] | None = None,
+    **opciones,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Como emparejar(), pero por particiones en `workers` procesos.
+
+    A lo más 2*workers tareas en vuelo, así la memoria extra la acota el
+    tamaño de las particiones y no el total. El orden del resultado sigue el
+    orden de las llaves, no el de término de los procesos.
+    """
+    if not len(banco) or not len(libro):
+        return np.empty(0, np.int64), np.empty(0, np.int64)  # nada que partir (ni pool que levantar)
+    col_b, col_l = col_contraparte if isinstance(col_contraparte, tuple) else (col_contraparte,) * 2
+    fuzzy = bool(opciones.get("fuzzy"))
+    tareas = _tareas(banco, libro, por, col_b, col_l,
+                     _columnas_trabajo(banco, fuzzy), _columnas_trabajo(libro, fuzzy))
+    sb, sl = [], []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        en_vuelo = deque()
+        for tb, tl in tareas:
+            en_vuelo.append(pool.submit(_emparejar_tarea, tb, tl, tol_abs, opciones))
+            if len(en_vuelo) >= 2 * workers:
+                pb, pl = en_vuelo.popleft().result()
+                sb.append(pb)
+                sl.append(pl)
+        while en_vuelo:
+            pb, pl = en_vuelo.popleft().result()
+            sb.append(pb)
+            sl.append(pl)
+    pb = np.concatenate(sb) if sb else np.empty(0, np.int64)
+    pl = np.concatenate(sl) if sl else np.empty(0, np.int64)
+
+    # pasada global sobre lo que quedó libre (calces que cruzan particiones)
+    resto_b = _libres(len(banco), pb)
+    resto_l = _libres(len(libro), pl)
+    if len(resto_b) and len(resto_l):
+        rb, rl = emparejar(banco.iloc[resto_b].reset_index(drop=True),
+                           libro.iloc[resto_l].reset_index(drop=True), tol_abs, **opciones)
+        pb = np.concatenate([pb, resto_b[rb]])
+        pl = np.concatenate([pl, resto_l[rl]])
+    return pb, pl
+
+def armar_resultado(
+    banco: pd.DataFrame,
+    libro: pd.DataFrame,
+    pb: np.ndarray,
+    pl: np.ndarray,
+    grupo: np.ndarray | None = None,
+) -> pd.DataFrame:
+    """Pares emparejados (en orden de banco), luego banco y libro sin pareja.
+
+    Columnas comunes llevan sufijo _banco/_libro, como un merge de pandas.
+    "grupo" numera cada calce desde 1; en un grupo varios-a-uno la fila del
+    lado "uno" se repite en cada par del grupo.
+    """
+    if grupo is None:
+        grupo = np.arange(len(pb))
+    comunes = set(banco.columns) & set(libro.columns)
+    banco = banco.rename(columns={c: f"{c}_banco" for c in comunes})
+    libro = libro.rename(columns={c: f"{c}_libro" for c in comunes})
+    orden = np.lexsort((pl, pb))
+    pb, pl, grupo = pb[orden], pl[orden], grupo[orden]
+    pares = pd.concat(
+        [banco.iloc[pb].reset_index(drop=True), libro.iloc[pl].reset_index(drop=True)], axis=1
+    )
+    # ids por orden de primera aparición: el resultado no depende de la pasada que lo encontró
+    _, primera, inversa = np.unique(grupo, return_index=True, return_inverse=True)
+    pares["grupo"] = np.argsort(np.argsort(primera))[inversa] + 1
+    solo_b = banco.iloc[_libres(len(banco), pb)].reset_index(drop=True)
+    solo_l = libro.iloc[_libres(len(libro), pl)].reset_index(drop=True)
+    partes = [p for p in (pares, solo_b, solo_l) if len(p)] or [pares]
+    out = pd.concat(partes, ignore_index=True)
+    out = out.reindex(columns=list(banco.columns) + list(libro.columns) + ["match", "grupo"])
+    out["match"] = np.arange(len(out)) < len(pb)
+    out["grupo"] = out["grupo"].astype("Int64")
+    return out
+
+def conciliar(
+    df_banco: pd.DataFrame,
+    df_libro: pd.DataFrame,
+    tol_abs: float = 0.0,
+    *,
+    dias: int = 0,
+    fuzzy: bool = False,
+    max_candidatos: int = 50,
+    grupos: bool = False,
+    dias_grupo: int | None = None,
+    col_contraparte: str | tuple[str, str] | None = None,
+    max_grupo: int = 4,
+    presupuesto_s: float = 0.5,
+    workers: int | None = None,
+    particion=PARTICION,
+) -> pd.DataFrame:
+    """Concilia movimientos de banco contra el libro.
+
+    Dos filas calzan si sus montos difieren en a lo más `tol_abs` y sus
+    fechas en a lo más `dias`. Entre varios candidatos gana el de menor
+    diferencia de monto, luego de días y, con `fuzzy=True`, el de referencia
+    igual o glosa más parecida. Con `grupos=True` una segunda pasada sobre
+    lo que sobra busca pagos divididos: hasta `max_grupo` filas de un lado
+    que suman una del otro, dentro de `dias_grupo` (por defecto `dias`), del
+    mismo `col_contraparte` si se indica (nombre, o par banco/libro) y con
+    `presupuesto_s` segundos de búsqueda por bloque.
+
+    Con `workers` > 1 la pasada uno a uno corre particionada (ver
+    emparejar_particionado); `particion` elige la llave entre "mes",
+    "contraparte" (requiere `col_contraparte`) y "monto".
+
+    Devuelve banco y libro lado a lado (sufijos _banco/_libro) con la columna
+    booleana "match" y el id "grupo"; las filas sin pareja quedan con el otro
+    lado vacío.
+    """
+    banco = df_banco.reset_index(drop=True)
+    libro = df_libro.reset_index(drop=True)
+    opciones = dict(dias=dias, fuzzy=fuzzy, max_candidatos=max_candidatos)
+    if workers and workers > 1:
+        pb, pl = emparejar_particionado(banco, libro, tol_abs, workers=workers, por=particion,
+                                        col_contraparte=col_contraparte, **opciones)
+    else:
+        pb, pl = emparejar(banco, libro, tol_abs, **opciones)
+    grupo = np.arange(len(pb))
+    if grupos:
+        libres_b = _libres(len(banco), pb)
+        libres_l = _libres(len(libro), pl)
+        gb, gl, gg = emparejar_grupos(
+            banco, libro, libres_b, libres_l, tol_abs,
+            dias=dias if dias_grupo is None else dias_grupo,
+            col_contraparte=col_contraparte, max_grupo=max_grupo, presupuesto_s=presupuesto_s,
+        )
+        pb, pl = np.concatenate([pb, gb]), np.concatenate([pl, gl])
+        grupo = np.concatenate([grupo, gg + len(grupo)])
+    return armar_resultado(banco, libro, pb, pl, grupo)
@@ -1,4 +1,3 @@
-
 from __future__ import annotations
 import pandas as pd
 
@@ -9,21 +8,92 @@ DEFAULT_MAPPING = {
     "referencia": ["referencia", "Ref", "doc", "Documento"],
 }
 
-def _first_existing(df: pd.DataFrame, candidates: list[str]) -> str | None:
-    lower = {c.lower(): c for c in df.columns}
-    for alias in candidates:
-        if alias.lower() in lower:
-            return lower[alias.lower()]
+# Formatos de fecha habituales en cartolas y libros; el primero que parsea
+# toda la muestra queda fijo para la fuente
+FORMATOS_FECHA = (
+    "%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y", "%Y/%m/%d", "%d.%m.%Y", "%Y%m%d",
+    "%Y-%m-%d %H:%M:%S", "%d-%m-%Y %H:%M:%S", "%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M",
+)
+_MUESTRA_FECHAS = 200
+
+try:  # texto respaldado por Arrow: menos memoria que object
+    import pyarrow  # noqa: F401
+    DTYPE_TEXTO = "string[pyarrow]"
+except ImportError:  # pragma: no cover - depende del entorno
+    DTYPE_TEXTO = "string"
+
+def resolver_alias(columnas, mapping: dict[str, list[str]] | None = None) -> dict[str, str | None]:
+    """Columna de origen para cada columna estándar (None si no hay alias)."""
+    mapping = mapping or DEFAULT_MAPPING
+    lower = {str(c).lower(): c for c in columnas}
+    return {
+        std: next((lower[a.lower()] for a in aliases if a.lower() in lower), None)
+        for std, aliases in mapping.items()
+    }
+
+def detectar_formato_fecha(s: pd.Series) -> str | None:
+    """Primer formato de FORMATOS_FECHA que parsea una muestra completa de `s`."""
+    muestra = s.dropna().astype(str).str.strip()
+    muestra = muestra[muestra != ""].head(_MUESTRA_FECHAS)
+    if muestra.empty:
+        return None
+    for fmt in FORMATOS_FECHA:
+        if pd.to_datetime(muestra, format=fmt, errors="coerce").notna().all():
+            return fmt
     return None
 
+class Normalizador:
+    """normalizar_dataframe compilado para una fuente, reutilizable por lote.
+
+    Resuelve los alias una vez por firma de columnas, detecta el formato de
+    fecha en el primer lote con fechas y lo reutiliza, y arma la salida de
+    una sola vez. glosa/referencia usan `dtype_texto` (string respaldado por
+    Arrow si hay pyarrow); para fuentes con glosas muy repetidas conviene
+    pasar dtype_texto="category", no se decide solo.
+    """
+
+    def __init__(
+        self,
+        mapping: dict[str, list[str]] | None = None,
+        *,
+        formato_fecha: str | None = None,
+        dtype_texto: str = DTYPE_TEXTO,
+    ):
+        self.mapping = mapping or DEFAULT_MAPPING
+        self.formato_fecha = formato_fecha
+        self.dtype_texto = dtype_texto
+        self._fecha_detectada = formato_fecha is not None
+        self._alias: dict[tuple, dict[str, str | None]] = {}
+
+    def alias(self, columnas) -> dict[str, str | None]:
+        firma = tuple(columnas)
+        if firma not in self._alias:
+            self._alias[firma] = resolver_alias(firma, self.mapping)
+        return self._alias[firma]
+
+    def _fecha(self, s: pd.Series) -> pd.Series:
+        if pd.api.types.is_datetime64_any_dtype(s):
+            return s
+        if not self._fecha_detectada and s.notna().any():
+            self.formato_fecha = detectar_formato_fecha(s)
+            self._fecha_detectada = True
+        if self.formato_fecha:
+            return pd.to_datetime(s, format=self.formato_fecha, errors="coerce")
+        return pd.to_datetime(s, errors="coerce")
+
+    def __call__(self, df: pd.DataFrame) -> pd.DataFrame:
+        alias = self.alias(df.columns)
+        vacia = pd.Series(pd.NA, index=df.index, dtype=object)
+        col = {std: (df[c] if c is not None else vacia) for std, c in alias.items()}
+        datos = dict(col)
+        if "fecha" in col:
+            datos["fecha"] = self._fecha(col["fecha"])
+        if "monto" in col:
+            datos["monto"] = pd.to_numeric(col["monto"], errors="coerce")
+        for std in ("glosa", "referencia"):
+            if std in col:
+                datos[std] = col[std].astype(self.dtype_texto)
+        return pd.DataFrame(datos, index=df.index)
+
 def normalizar_dataframe(df: pd.DataFrame, mapping: dict[str, list[str]] | None = None) -> pd.DataFrame:
-    mapping = mapping or DEFAULT_MAPPING
-    out = pd.DataFrame()
-    for std_col, aliases in mapping.items():
-        col = _first_existing(df, aliases)
-        out[std_col] = df[col] if col else pd.NA
-    out["fecha"] = pd.to_datetime(out["fecha"], errors="coerce")
-    out["monto"] = pd.to_numeric(out["monto"], errors="coerce")
-    out["glosa"] = out["glosa"].astype("string")
-    out["referencia"] = out["referencia"].astype("string")
-    return out
+    return Normalizador(mapping)(df)
@@ -0,0 +1,89 @@
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+
+try:  # dependencia opcional: kernels de texto vectorizados sobre buffers Arrow
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # pragma: no cover - depende del entorno
+    pa = None
+    pc = None
+
+# Números en formato chileno: miles con '.', decimales con ',', signo opcional
+# y negativos entre paréntesis. Ejemplos válidos: "1.234.567", "-1.234,5",
+# "+12", "(3.500)", "0,19". Inválidos: "12.5" (grupo de miles incompleto),
+# "76156793-4", "01/02/2024".
+_RE_NUMERO = r"^[+-]?(\d{1,3}(\.\d{3})+|\d+)(,\d+)?$"
+_RE_PARENTESIS = r"^\((.*)\)$"
+
+def _parsear_arrow(s: pd.Series) -> tuple[np.ndarray, np.ndarray, int]:
+    try:
+        arr = pa.array(s, type=pa.string(), from_pandas=True)
+    except (pa.ArrowTypeError, pa.ArrowInvalid):
+        # valores no-str sueltos (p.ej. int desde Excel) -> texto
+        arr = pa.array(s.astype("string"), type=pa.string(), from_pandas=True)
+    txt = pc.utf8_trim_whitespace(arr)
+    blanco = pc.fill_null(pc.equal(txt, ""), True)
+    negativo = pc.fill_null(pc.match_substring_regex(txt, _RE_PARENTESIS), False)
+    txt = pc.replace_substring_regex(txt, _RE_PARENTESIS, r"\1")
+    valido = pc.fill_null(pc.match_substring_regex(txt, _RE_NUMERO), False)
+    txt = pc.replace_substring(pc.replace_substring(txt, ".", ""), ",", ".")
+    valores = pc.cast(pc.if_else(valido, txt, pa.scalar(None, pa.string())), pa.float64())
+    valores = pc.if_else(negativo, pc.negate(valores), valores)
+    fallas = pc.and_(pc.invert(blanco), pc.invert(valido))
+    vacios = pc.sum(blanco).as_py() or 0
+    return valores.to_numpy(zero_copy_only=False), fallas.to_numpy(zero_copy_only=False), vacios
+
+def _parsear_pandas(s: pd.Series) -> tuple[np.ndarray, np.ndarray, int]:
+    txt = s.astype(object).where(s.notna(), "").astype(str).str.strip()
+    blanco = (txt == "").to_numpy()
+    negativo = np.zeros(len(txt), dtype=bool)
+    parentesis = txt.str.startswith("(")
+    if parentesis.any():
+        negativo = txt.str.fullmatch(_RE_PARENTESIS).to_numpy(bool)
+        txt = txt.str.replace(_RE_PARENTESIS, r"\1", regex=True)
+    valido = txt.str.fullmatch(_RE_NUMERO).to_numpy(bool)
+    txt = txt.str.replace(".", "", regex=False).str.replace(",", ".", regex=False)
+    valores = pd.to_numeric(txt.where(valido), errors="coerce").astype("float64").to_numpy()
+    valores = np.where(negativo, -valores, valores)
+    return valores, ~blanco & ~valido, int(blanco.sum())
+
+def _parsear(s: pd.Series) -> tuple[np.ndarray, np.ndarray, int]:
+    """(valores float64, máscara de fallas, cantidad de vacíos)."""
+    return (_parsear_arrow if pa is not None else _parsear_pandas)(s)
+
+def parsear_numeros(s: pd.Series) -> tuple[pd.Series, int]:
+    """Convierte una serie de texto a float64 en una sola pasada.
+
+    Devuelve (serie, fallas): blancos y nulos quedan como NaN sin contar como
+    falla; los valores no vacíos que no son números válidos también quedan
+    NaN y se cuentan en `fallas`. Series ya numéricas pasan directo.
+    """
+    if pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s):
+        return s.astype("float64"), 0
+    if len(s) == 0:
+        return pd.Series(np.empty(0), index=s.index, name=s.name), 0
+    valores, fallas, _ = _parsear(s)
+    return pd.Series(valores, index=s.index, name=s.name), int(fallas.sum())
+
+def convertir_columnas(
+    df: pd.DataFrame, columnas, *, tolerancia: float = 0.01
+) -> dict[str, int]:
+    """Convierte en el lugar las columnas de texto que son numéricas.
+
+    Una columna se convierte si a lo más `tolerancia` de sus valores no vacíos
+    falla (esos quedan NaN); si falla más, se deja intacta como texto (RUT,
+    razón social, fechas). Devuelve las fallas por columna convertida.
+    """
+    fallas: dict[str, int] = {}
+    for col in columnas:
+        if col not in df.columns or not (df[col].dtype == object or isinstance(df[col].dtype, pd.StringDtype)):
+            continue
+        valores, mascara, vacios = _parsear(df[col])
+        n = int(mascara.sum())
+        no_vacios = len(valores) - vacios
+        if no_vacios and n <= tolerancia * no_vacios:
+            df[col] = pd.Series(valores, index=df.index)
+            if n:
+                fallas[col] = n
+    return fallas
@@ -1,14 +1,14 @@
-
 from __future__ import annotations
 from pathlib import Path
 import pandas as pd
 
-def generar_reporte(conciliado: pd.DataFrame, salida: str | Path) -> None:
-    p = Path(salida)
-    p.parent.mkdir(parents=True, exist_ok=True)
-    if p.suffix.lower() == ".xlsx":
-        conciliado.to_excel(p, index=False)
-    elif p.suffix.lower() == ".csv":
-        conciliado.to_csv(p, index=False)
-    else:
-        raise ValueError("Extensión no soportada. Usa .xlsx o .csv")
+from .escritores import escribir_dataframe
+
+def generar_reporte(conciliado: pd.DataFrame, salida: str | Path, backend: str | None = None) -> None:
+    """Escribe el reporte en .xlsx, .csv o .parquet.
+
+    Los XLSX se escriben en streaming (openpyxl write-only o xlsxwriter con
+    `backend="xlsxwriter"`) y se parten en varias hojas si superan el
+    límite de filas de Excel.
+    """
+    escribir_dataframe(conciliado, salida, backend)
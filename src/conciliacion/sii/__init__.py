@@ -1,6 +1,14 @@
+from pathlib import Path
 
 from . import extraccion
 from .consolidacion import consolidar_libros_por_rut
 from .calculo import calcular_efecto_neto
 
+
+def extraer_rcv_tipo(*, tipo: str, carpeta_base, **kwargs) -> None:
+    """Extrae un libro RCV ('venta' | 'compra'); importa Selenium solo al usarse."""
+    from .extraccion.common_rcv import extract_for_tipo
+    extract_for_tipo(tipo_up=tipo.upper(), carpeta_base=Path(carpeta_base), **kwargs)
+
+
 __all__ = ["extraer_rcv_tipo","consolidar_libros_por_rut","calcular_efecto_neto"]
@@ -0,0 +1,108 @@
+from __future__ import annotations
+import json
+import re
+import shutil
+from pathlib import Path
+import pandas as pd
+
+try:  # dependencia opcional: almacén columnar
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - depende del entorno
+    pa = None
+    pq = None
+
+# Dataset Parquet particionado (estilo hive):
+#   <raiz>/rut=<rut>/tipo=<tipo>/anho=<AAAA>/mes=<MM>/<archivo origen>.parquet
+# Un archivo por CSV de origen; el tipo de cada columna (double | string) se
+# guarda en <raiz>/rut=<rut>/tipo=<tipo>/_esquema.json.
+
+ESQUEMA = "_esquema.json"
+_RE_PERIODO = re.compile(r"(\d{4})(\d{2})(?!.*\d)")
+
+def disponible() -> bool:
+    return pa is not None
+
+def _requiere_pyarrow() -> None:
+    if pa is None:
+        raise RuntimeError("El almacén Parquet requiere 'pyarrow' (pip install pyarrow).")
+
+def periodo_de_archivo(nombre: str) -> tuple[int, int]:
+    """RCV_COMPRA_REGISTRO_76156793-4_202401.csv -> (2024, 1); (0, 0) si no trae período."""
+    m = _RE_PERIODO.search(Path(nombre).stem)
+    if not m or not 1 <= int(m.group(2)) <= 12:
+        return 0, 0
+    return int(m.group(1)), int(m.group(2))
+
+def carpeta_dataset(raiz: str | Path, rut: str, tipo: str) -> Path:
+    return Path(raiz) / f"rut={rut}" / f"tipo={tipo.lower()}"
+
+def _tipo_columna(s: pd.Series) -> str:
+    return "double" if pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s) else "string"
+
+class EscritorParquet:
+    """Escribe un DataFrame por CSV de origen en su partición anho/mes.
+
+    Si una columna llega numérica en un archivo y como texto en otro, el
+    esquema la promueve a string; leer_parquet() castea los archivos previos.
+    """
+
+    def __init__(self, raiz: str | Path, rut: str, tipo: str, columnas: list[str]):
+        _requiere_pyarrow()
+        self.dir = carpeta_dataset(raiz, rut, tipo)
+        # reconstrucción completa, igual que el XLSX consolidado
+        shutil.rmtree(self.dir, ignore_errors=True)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.columnas = columnas
+        self.esquema: dict[str, str] = {}
+        self.filas = 0
+
+    def escribir(self, df: pd.DataFrame) -> None:
+        if df.empty:
+            return
+        origen = str(df["Archivo.Origen"].iloc[0]) if "Archivo.Origen" in df.columns else "sin_origen"
+        anho, mes = periodo_de_archivo(origen)
+        df = df.reindex(columns=self.columnas)
+        datos = {}
+        for col in self.columnas:
+            s = df[col]
+            if s.notna().any():
+                actual = _tipo_columna(s)
+                if self.esquema.get(col, actual) != actual:
+                    self.esquema[col] = "string"
+                else:
+                    self.esquema.setdefault(col, actual)
+            tipo = self.esquema.get(col, "string")
+            datos[col] = pd.to_numeric(s, errors="coerce").astype("float64") if tipo == "double" else s.astype("string")
+        tabla = pa.Table.from_pandas(pd.DataFrame(datos), preserve_index=False)
+        destino = self.dir / f"anho={anho:04d}" / f"mes={mes:02d}"
+        destino.mkdir(parents=True, exist_ok=True)
+        pq.write_table(tabla, destino / f"{Path(origen).stem}.parquet", compression="zstd")
+        self.filas += len(df)
+
+    def cerrar(self) -> None:
+        esquema = {c: self.esquema.get(c, "string") for c in self.columnas}
+        (self.dir / ESQUEMA).write_text(json.dumps(esquema, ensure_ascii=False, indent=2), encoding="utf-8")
+
+def escribir_parquet(df: pd.DataFrame, raiz: str | Path, rut: str, tipo: str) -> Path:
+    """Escribe un DataFrame completo (p.ej. el calculado) agrupando por Archivo.Origen."""
+    esc = EscritorParquet(raiz, rut, tipo, [str(c) for c in df.columns])
+    if "Archivo.Origen" in df.columns:
+        for _, parte in df.groupby("Archivo.Origen", sort=False):
+            esc.escribir(parte)
+    else:
+        esc.escribir(df)
+    esc.cerrar()
+    return esc.dir
+
+def leer_parquet(raiz: str | Path, rut: str, tipo: str) -> pd.DataFrame:
+    """Lee el dataset de rut/tipo con el esquema final, en orden de archivo de origen."""
+    _requiere_pyarrow()
+    d = carpeta_dataset(raiz, rut, tipo)
+    archivos = sorted(d.glob("anho=*/mes=*/*.parquet"), key=lambda p: p.name)
+    if not archivos:
+        raise FileNotFoundError(f"Sin datos Parquet en {d}")
+    esquema_cols = json.loads((d / ESQUEMA).read_text(encoding="utf-8"))
+    esquema = pa.schema([(c, pa.float64() if t == "double" else pa.string()) for c, t in esquema_cols.items()])
+    tablas = [pq.read_table(p).select(esquema.names).cast(esquema) for p in archivos]
+    return pa.concat_tables(tablas).to_pandas(split_blocks=True, self_destruct=True)
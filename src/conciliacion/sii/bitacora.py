@@ -0,0 +1,282 @@
+from __future__ import annotations
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, Iterator
+
+# Bitácora de trabajos en SQLite, junto a los datos (<carpeta_base>/.bitacora_rcv.sqlite):
+# una fila por rut × tipo × período × etapa con su estado e intentos. Permite
+# reanudar una corrida interrumpida (--resume) sin repetir lo terminado y que
+# varios workers (hilos o procesos) se repartan el trabajo: cada reclamo es una
+# transacción BEGIN IMMEDIATE, así dos workers nunca toman la misma fila.
+#
+#   pendiente -> en_curso -> ok | fallido
+#
+# Un "en_curso" cuyo dueño (host:pid:corrida) ya no existe, o que no da señales en
+# `lease_s`, vuelve a estar disponible. Un "fallido" se reintenta en la
+# siguiente corrida (de otro dueño) hasta `max_intentos`.
+
+NOMBRE = ".bitacora_rcv.sqlite"
+ETAPAS = ("extraccion", "consolidacion", "calculo")
+TODOS = "*"  # período de las etapas que trabajan sobre el rut/tipo completo
+PENDIENTE, EN_CURSO, OK, FALLIDO = "pendiente", "en_curso", "ok", "fallido"
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS trabajos (
+    rut         TEXT NOT NULL,
+    tipo        TEXT NOT NULL,
+    periodo     TEXT NOT NULL,
+    etapa       TEXT NOT NULL,
+    estado      TEXT NOT NULL DEFAULT 'pendiente',
+    intentos    INTEGER NOT NULL DEFAULT 0,
+    dueno       TEXT,
+    actualizado REAL,
+    error       TEXT,
+    PRIMARY KEY (rut, tipo, periodo, etapa)
+);
+CREATE INDEX IF NOT EXISTS trabajos_etapa_estado ON trabajos (etapa, estado);
+"""
+
+def meses(anho_ini: int, mes_ini: int, anho_fin: int, mes_fin: int) -> list[str]:
+    """Claves 'AAAA-MM' del rango, como manifest.clave_periodo."""
+    desde, hasta = int(anho_ini) * 12 + int(mes_ini) - 1, int(anho_fin) * 12 + int(mes_fin) - 1
+    return [f"{i // 12}-{i % 12 + 1:02d}" for i in range(desde, hasta + 1)]
+
+def _dueno_vivo(dueno: str | None) -> bool:
+    """False solo si el dueño es un proceso de este host que ya terminó."""
+    if not dueno:
+        return False
+    host, _, resto = dueno.partition(":")
+    pid = resto.split(":")[0]
+    if host != socket.gethostname() or not pid.isdigit() or os.name == "nt":
+        return True  # otro host (o Windows): decide el lease
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OverflowError):
+        pass
+    return True
+
+@dataclass
+class Reclamo:
+    """Filas tomadas por un worker: un RUT y, por tipo, los períodos a procesar."""
+    etapa: str
+    rut: str
+    periodos: dict[str, list[str]] = field(default_factory=dict)
+
+    @property
+    def tipos(self) -> list[str]:
+        return list(self.periodos)
+
+class Bitacora:
+    """Acceso a la bitácora; una conexión SQLite por hilo, segura entre procesos."""
+
+    def __init__(
+        self,
+        path: str | Path,
+        *,
+        max_intentos: int = 3,
+        lease_s: float = 900.0,
+        timeout_s: float = 30.0,
+        dueno: str | None = None,
+    ):
+        self.path = Path(path)
+        self.max_intentos = int(max_intentos)
+        self.lease_s = float(lease_s)
+        self.timeout_s = float(timeout_s)
+        # host:pid:corrida; otra instancia (p.ej. la corrida siguiente) es otro dueño
+        self.dueno = dueno or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._local = threading.local()
+        self._conexiones: list[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._con().executescript(_ESQUEMA)
+
+    def _con(self) -> sqlite3.Connection:
+        con = getattr(self._local, "con", None)
+        if con is None:
+            # isolation_level=None: las transacciones se abren a mano (BEGIN IMMEDIATE)
+            con = sqlite3.connect(str(self.path), timeout=self.timeout_s,
+                                  isolation_level=None, check_same_thread=False)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            self._local.con = con
+            with self._lock:
+                self._conexiones.append(con)
+        return con
+
+    @contextmanager
+    def _transaccion(self) -> Iterator[sqlite3.Connection]:
+        con = self._con()
+        con.execute("BEGIN IMMEDIATE")  # toma el lock de escritura antes de leer
+        try:
+            yield con
+        except BaseException:
+            con.execute("ROLLBACK")
+            raise
+        con.execute("COMMIT")
+
+    def cerrar(self) -> None:
+        with self._lock:
+            for con in self._conexiones:
+                con.close()
+            self._conexiones.clear()
+        self._local = threading.local()
+
+    # --- planificación -------------------------------------------------------
+
+    def planificar(self, filas: Iterable[tuple[str, str, str, str]]) -> int:
+        """Agrega (rut, tipo, periodo, etapa) como pendientes; las ya existentes se respetan."""
+        with self._transaccion() as con:
+            antes = con.total_changes
+            con.executemany(
+                "INSERT OR IGNORE INTO trabajos (rut, tipo, periodo, etapa, actualizado) VALUES (?, ?, ?, ?, ?)",
+                [(*f, time.time()) for f in filas],
+            )
+            return con.total_changes - antes
+
+    def reiniciar(self, ruts: Iterable[str] | None = None) -> None:
+        """Olvida el avance (de `ruts`, o de todo): la corrida empieza de cero."""
+        with self._transaccion() as con:
+            if ruts is None:
+                con.execute("DELETE FROM trabajos")
+            else:
+                con.executemany("DELETE FROM trabajos WHERE rut = ?", [(r,) for r in ruts])
+
+    def reabrir(self, rut: str, tipo: str, etapas: Iterable[str], periodo: str = TODOS) -> None:
+        """Vuelve a 'pendiente' (con intentos en cero) etapas ya cerradas, p.ej. el
+        consolidado de un tipo cuando se bajaron períodos nuevos."""
+        with self._transaccion() as con:
+            con.executemany(
+                "UPDATE trabajos SET estado = ?, intentos = 0, dueno = NULL, error = NULL"
+                " WHERE rut = ? AND tipo = ? AND periodo = ? AND etapa = ? AND estado <> ?",
+                [(PENDIENTE, rut, tipo, periodo, e, EN_CURSO) for e in etapas],
+            )
+
+    def recuperar(self) -> int:
+        """Devuelve a 'pendiente' lo que quedó en curso de procesos muertos o sin lease."""
+        limite = time.time() - self.lease_s
+        with self._transaccion() as con:
+            filas = con.execute(
+                "SELECT rowid, dueno, actualizado FROM trabajos WHERE estado = ?", (EN_CURSO,)
+            ).fetchall()
+            huerfanas = [(rid,) for rid, dueno, t in filas if (t or 0) < limite or not _dueno_vivo(dueno)]
+            con.executemany(f"UPDATE trabajos SET estado = '{PENDIENTE}', dueno = NULL WHERE rowid = ?", huerfanas)
+        return len(huerfanas)
+
+    # --- reparto -------------------------------------------------------------
+
+    def reclamar(
+        self,
+        etapa: str,
+        *,
+        tipos: Iterable[str],
+        ruts: Iterable[str] | None = None,
+        juntos: bool = True,
+    ) -> Reclamo | None:
+        """Toma atómicamente la siguiente unidad de trabajo disponible de `etapa`.
+
+        La unidad es un RUT con todos sus `tipos` pendientes (juntos=True, una
+        sesión de navegador) o un solo par RUT/tipo. Disponible = pendiente,
+        fallido de otra corrida con intentos restantes, o en curso sin lease.
+        Devuelve None si no queda nada.
+        """
+        tipos = list(tipos)
+        ruts = None if ruts is None else list(ruts)
+        ahora = time.time()
+        sql = (
+            f"SELECT rut, tipo, periodo FROM trabajos WHERE etapa = ? AND tipo IN ({','.join('?' * len(tipos))})"
+            " AND (estado = ? OR (estado = ? AND intentos < ? AND IFNULL(dueno, '') <> ?)"
+            " OR (estado = ? AND actualizado < ?))"
+        )
+        params: list = [etapa, *tipos, PENDIENTE, FALLIDO, self.max_intentos, self.dueno, EN_CURSO, ahora - self.lease_s]
+        if ruts is not None:
+            sql += f" AND rut IN ({','.join('?' * len(ruts))})"
+            params += ruts
+        sql += " ORDER BY rowid"
+        with self._transaccion() as con:
+            filas = con.execute(sql, params).fetchall()
+            if not filas:
+                return None
+            rut, tipo = filas[0][0], filas[0][1]
+            rec = Reclamo(etapa=etapa, rut=rut)
+            for r, t, periodo in filas:
+                if r == rut and (juntos or t == tipo):
+                    rec.periodos.setdefault(t, []).append(periodo)
+            con.executemany(
+                "UPDATE trabajos SET estado = ?, intentos = intentos + 1, dueno = ?, actualizado = ?, error = NULL"
+                " WHERE rut = ? AND tipo = ? AND periodo = ? AND etapa = ?",
+                [(EN_CURSO, self.dueno, ahora, rut, t, p, etapa) for t, ps in rec.periodos.items() for p in ps],
+            )
+        return rec
+
+    def asignado(self, rut: str, tipo: str, periodo: str, etapa: str = "extraccion") -> bool:
+        """True si la fila está en curso para este dueño (o no está planificada)."""
+        fila = self._con().execute(
+            "SELECT estado, dueno FROM trabajos WHERE rut = ? AND tipo = ? AND periodo = ? AND etapa = ?",
+            (rut, tipo, periodo, etapa),
+        ).fetchone()
+        return fila is None or (fila[0] == EN_CURSO and fila[1] == self.dueno)
+
+    def terminar(self, rut: str, tipo: str, periodo: str, etapa: str, *, ok: bool, error: str | None = None) -> None:
+        """Cierra una fila y renueva el lease del resto de lo que este dueño tiene en curso."""
+        ahora = time.time()
+        with self._transaccion() as con:
+            con.execute(
+                "UPDATE trabajos SET estado = ?, error = ?, dueno = ?, actualizado = ?"
+                " WHERE rut = ? AND tipo = ? AND periodo = ? AND etapa = ?",
+                (OK if ok else FALLIDO, None if ok else error, self.dueno, ahora, rut, tipo, periodo, etapa),
+            )
+            con.execute("UPDATE trabajos SET actualizado = ? WHERE estado = ? AND dueno = ?",
+                        (ahora, EN_CURSO, self.dueno))
+
+    def liberar(self, rec: Reclamo, *, ok: bool, error: str | None = None) -> int:
+        """Cierra lo del reclamo que siga en curso (p.ej. períodos que el manifiesto
+        ya tenía intactos, o todos si el trabajo falló antes de llegar a ellos)."""
+        with self._transaccion() as con:
+            antes = con.total_changes
+            con.executemany(
+                "UPDATE trabajos SET estado = ?, error = ?, actualizado = ?"
+                " WHERE rut = ? AND tipo = ? AND periodo = ? AND etapa = ? AND estado = ? AND dueno = ?",
+                [(OK if ok else FALLIDO, None if ok else error, time.time(),
+                  rec.rut, t, p, rec.etapa, EN_CURSO, self.dueno)
+                 for t, ps in rec.periodos.items() for p in ps],
+            )
+            return con.total_changes - antes
+
+    # --- consultas -----------------------------------------------------------
+
+    def estado(self, rut: str, tipo: str, periodo: str, etapa: str) -> str | None:
+        fila = self._con().execute(
+            "SELECT estado FROM trabajos WHERE rut = ? AND tipo = ? AND periodo = ? AND etapa = ?",
+            (rut, tipo, periodo, etapa),
+        ).fetchone()
+        return fila[0] if fila else None
+
+    def conteo(self) -> dict[tuple[str, str], int]:
+        """(etapa, estado) -> filas."""
+        return {(e, s): n for e, s, n in self._con().execute(
+            "SELECT etapa, estado, COUNT(*) FROM trabajos GROUP BY etapa, estado")}
+
+    def resumen(self) -> str:
+        conteo = self.conteo()
+        lineas = [f"[BITÁCORA] {self.path}"]
+        for etapa in ETAPAS:
+            partes = [f"{s} {conteo[(etapa, s)]}" for s in (OK, FALLIDO, EN_CURSO, PENDIENTE) if conteo.get((etapa, s))]
+            if partes:
+                lineas.append(f"  {etapa:<14}" + " | ".join(partes))
+        fallidos = self._con().execute(
+            "SELECT rut, tipo, periodo, etapa, intentos, error FROM trabajos WHERE estado = ? ORDER BY rowid LIMIT 10",
+            (FALLIDO,),
+        ).fetchall()
+        for rut, tipo, periodo, etapa, intentos, error in fallidos:
+            agotado = " (sin reintentos)" if intentos >= self.max_intentos else ""
+            lineas.append(f"  [FALLO] {rut} {tipo} {periodo} {etapa} x{intentos}{agotado} | {error or '?'}")
+        return "\n".join(lineas)
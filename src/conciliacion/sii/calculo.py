@@ -2,17 +2,13 @@ from __future__ import annotations
 import pandas as pd
 from typing import Iterable
 
+from ..numeros import parsear_numeros
+
 
 def _to_number(s: pd.Series) -> pd.Series:
     """Convierte serie a numérico tolerando miles '.' y decimales ','."""
-    if not pd.api.types.is_string_dtype(s):
-        return pd.to_numeric(s, errors="coerce").fillna(0)
-    s2 = (
-        s.astype(str)
-         .str.replace(r"\.", "", regex=True)  # quita miles
-         .str.replace(",", ".", regex=False)  # decimales
-    )
-    return pd.to_numeric(s2, errors="coerce").fillna(0)
+    valores, _ = parsear_numeros(s)
+    return valores.fillna(0)
 
 
 def calcular_efecto_neto(
@@ -43,7 +39,11 @@ def calcular_efecto_neto(
     out["Total Neto"] = out[col_monto_exento] + out[col_monto_neto]
 
     # Signo por tipo de documento (p.ej. 61 = Nota de Crédito)
-    tipo = out[col_tipo_doc].astype(str).str.strip()
+    tipo = out[col_tipo_doc]
+    if pd.api.types.is_float_dtype(tipo):
+        # 61.0 -> "61" (p.ej. leído desde Parquet como double)
+        tipo = tipo.round().astype("Int64")
+    tipo = tipo.astype(str).str.strip()
     mask_nc = tipo.isin(set(str(x).strip() for x in notas_credito))
     out["Signo Doc"] = 1
     out.loc[mask_nc, "Signo Doc"] = -1
@@ -1,7 +1,17 @@
 from __future__ import annotations
+import codecs
+import os
+import re
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import pandas as pd
-from typing import Iterable
+from ..escritores import crear_escritor
+from ..instrumentacion import medir, registrar
+from ..numeros import convertir_columnas
+from .almacen import EscritorParquet, periodo_de_archivo
+from typing import Iterable, Iterator
 
 # --- Utilidades internas -----------------------------------------------------
 
@@ -32,28 +42,103 @@ def _corregir_desplazamiento(df: pd.DataFrame) -> pd.DataFrame:
         pass
     return df
 
-def _convertir_numericos(df: pd.DataFrame, columnas: Iterable[str]) -> pd.DataFrame:
-    # Convierte solo columnas que vienen en encabezados y existen en df
-    for col in columnas:
-        if col not in df.columns:
-            continue
-        s = df[col]
-        if s.dtype == object:
-            s2 = (
-                s.astype(str)
-                 .str.replace(r"\.", "", regex=True)
-                 .str.replace(",", ".", regex=False)
-            )
-            df[col] = pd.to_numeric(s2, errors="ignore")
+def _convertir_numericos(df: pd.DataFrame, columnas: Iterable[str], stats: Counter | None = None) -> pd.DataFrame:
+    # Convierte solo columnas que vienen en encabezados y existen en df (una pasada por columna)
+    fallas = convertir_columnas(df, columnas)
+    if stats is not None:
+        for col, n in fallas.items():
+            stats[("fallas_numericas", col)] += n
     return df
 
-def _leer_csv_inteligente(path: Path) -> pd.DataFrame:
+# --- Detección de formato CSV ------------------------------------------------
+
+# Formato por (carpeta, patrón de nombre): los CSV de un mismo tipo SII son uniformes
+_CACHE_FORMATOS: dict[tuple[str, str], tuple[str, str]] = {}
+
+# Contadores acumulados del proceso principal (ver resumen_lectura())
+ESTADISTICAS_LECTURA: Counter = Counter()
+
+_SEPS = [";", ","]
+_ENCS = ["latin-1", "utf-8-sig", "cp1252"]
+_MUESTRA_BYTES = 64 * 1024
+
+def _patron_archivo(path: Path) -> str:
+    """RCV_COMPRA_REGISTRO_76156793-4_202401.csv -> RCV_COMPRA_REGISTRO_#-#_#"""
+    return re.sub(r"\d+", "#", path.stem)
+
+def _sniff_csv(path: Path) -> tuple[str, str] | None:
+    """Decide (encoding, separador) mirando solo los primeros KB del archivo."""
+    with open(path, "rb") as f:
+        muestra = f.read(_MUESTRA_BYTES)
+    if not muestra:
+        return None
+    if muestra.startswith(codecs.BOM_UTF8):
+        enc = "utf-8-sig"
+    elif muestra.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        enc = "utf-16"
+    else:
+        # corta en el último salto para no partir un carácter multibyte
+        completa = muestra if len(muestra) < _MUESTRA_BYTES else muestra[: muestra.rfind(b"\n") + 1] or muestra
+        try:
+            completa.decode("utf-8")
+            enc = "utf-8"
+        except UnicodeDecodeError:
+            enc = "latin-1"
+    texto = muestra.decode(enc, errors="ignore")
+    encabezado = texto.lstrip("\ufeff").splitlines()[0] if texto.strip() else ""
+    conteos = {sep: encabezado.count(sep) for sep in (";", ",", "\t", "|")}
+    sep, n = max(conteos.items(), key=lambda kv: kv[1])
+    if n == 0:
+        return None
+    return enc, sep
+
+def _bom_coincide(path: Path, enc: str) -> bool:
+    """El formato cacheado sirve si el archivo trae BOM UTF-8 justo cuando enc es utf-8-sig."""
+    with open(path, "rb") as f:
+        return f.read(len(codecs.BOM_UTF8)).startswith(codecs.BOM_UTF8) == (enc == "utf-8-sig")
+
+def _formato_para(path: Path, stats: Counter) -> tuple[str, str] | None:
+    clave = (str(path.parent), _patron_archivo(path))
+    fmt = _CACHE_FORMATOS.get(clave)
+    try:
+        # una carpeta puede mezclar descargas latin-1 y utf-8-sig con el mismo patrón
+        if fmt and _bom_coincide(path, fmt[0]):
+            stats["cache_hits"] += 1
+            return fmt
+    except OSError:
+        return None
+    stats["sniffs"] += 1
+    try:
+        fmt = _sniff_csv(path)
+    except OSError:
+        return None
+    if fmt:
+        _CACHE_FORMATOS[clave] = fmt
+    return fmt
+
+def _olvidar_formato(path: Path) -> None:
+    _CACHE_FORMATOS.pop((str(path.parent), _patron_archivo(path)), None)
+
+def limpiar_cache_formatos() -> None:
+    _CACHE_FORMATOS.clear()
+
+def resumen_lectura(stats: Counter | None = None) -> str:
+    st = stats if stats is not None else ESTADISTICAS_LECTURA
+    texto = (
+        f"{st['archivos']} archivos | {st['sniffs']} sniff, {st['cache_hits']} desde caché | "
+        f"{st['parses']} lecturas completas, {st['parses_ahorrados']} evitadas | {st['fallbacks']} fallbacks"
+    )
+    fallas = {k[1]: n for k, n in st.items() if isinstance(k, tuple) and k[0] == "fallas_numericas" and n}
+    if fallas:
+        texto += " | valores no numéricos: " + ", ".join(f"{c}={n:,}" for c, n in sorted(fallas.items()))
+    return texto
+
+def _leer_fuerza_bruta(path: Path, stats: Counter) -> pd.DataFrame:
     # Intenta detectar separador y encoding común en archivos SII
-    seps = [";", ","]
-    encs = ["latin-1", "utf-8-sig", "cp1252"]
-    for enc in encs:
-        for sep in seps:
+    for enc in _ENCS:
+        for sep in _SEPS:
             try:
+                stats["parses"] += 1
                 df = pd.read_csv(path, sep=sep, encoding=enc, dtype=str)
                 if df.shape[1] >= 2:
                     return df
@@ -61,14 +146,138 @@ def _leer_csv_inteligente(path: Path) -> pd.DataFrame:
                 continue
     # último intento con el motor de Python autodetectando
     try:
+        stats["parses"] += 1
         return pd.read_csv(path, sep=None, engine="python", dtype=str)
     except Exception as e:
         raise RuntimeError(f"no se pudo leer {path.name}: {e}")
 
+def _leer_csv_inteligente(
+    path: Path, formato: tuple[str, str] | None = None, stats: Counter | None = None
+) -> pd.DataFrame:
+    """Una sola lectura completa con el formato detectado (o el de `formato`).
+
+    Si el formato no sirve (error o < 2 columnas) cae a la búsqueda exhaustiva
+    de encodings/separadores de siempre.
+    """
+    stats = stats if stats is not None else Counter()
+    stats["archivos"] += 1
+    if formato is None:
+        formato = _formato_para(path, stats)
+    if formato:
+        enc, sep = formato
+        try:
+            stats["parses"] += 1
+            df = pd.read_csv(path, sep=sep, encoding=enc, dtype=str)
+            if df.shape[1] >= 2:
+                # la búsqueda exhaustiva probaba ';' antes que ','
+                stats["parses_ahorrados"] += _SEPS.index(sep) if sep in _SEPS else len(_ENCS) * len(_SEPS)
+                return df
+        except Exception:
+            pass
+        _olvidar_formato(path)
+    stats["fallbacks"] += 1
+    return _leer_fuerza_bruta(path, stats)
+
+def _procesar_archivo(
+    path: Path, encabezados: list[str], formato: tuple[str, str] | None = None
+) -> tuple[pd.DataFrame | None, str | None, Counter]:
+    """Lee y normaliza un CSV. Devuelve (df, aviso, contadores); corre dentro del pool de procesos."""
+    stats: Counter = Counter()
+    t0, c0 = time.perf_counter(), time.thread_time()
+    try:
+        df = _leer_csv_inteligente(path, formato, stats)
+        df.columns = [str(c).strip() for c in df.columns]
+        df = _limpiar_duplicado_encabezado(df)
+        df = _corregir_desplazamiento(df)
+
+        # Mantén solo columnas esperadas (en el orden del encabezado)
+        cols_presentes = [c for c in encabezados if c in df.columns]
+        if not cols_presentes:
+            return None, f"⚠️ {path.name}: ninguna columna esperada coincide; se omite", stats
+
+        df = df[cols_presentes].copy()
+        df = _convertir_numericos(df, cols_presentes, stats)
+
+        df["Archivo.Origen"] = path.name
+        return df.reset_index(drop=True), None, stats
+    except Exception as e:
+        return None, f"❌ Error en {path.name}: {e}", stats
+    finally:
+        # tiempos medidos en el worker; _iterar_frames los saca antes de acumular
+        stats["_seg"] = time.perf_counter() - t0
+        stats["_cpu"] = time.thread_time() - c0
+
+def _iterar_frames(
+    archivos: list[Path], encabezados: list[str], workers: int, etiquetas: dict | None = None
+) -> Iterator[tuple[pd.DataFrame | None, str | None]]:
+    """Procesa los archivos y entrega (df, aviso) en el orden de `archivos`.
+
+    El formato de cada CSV se resuelve en el proceso principal (donde vive la
+    caché) y viaja al worker; los contadores se acumulan en ESTADISTICAS_LECTURA.
+    """
+    stats: Counter = Counter()
+    try:
+        for f, (df, aviso, st) in _resultados_en_orden(archivos, encabezados, workers, stats):
+            seg, cpu = st.pop("_seg", 0.0), st.pop("_cpu", None)
+            anho, mes = periodo_de_archivo(f.name)
+            registrar("csv_parse", seg, cpu_s=cpu, ok=df is not None, filas=0 if df is None else len(df),
+                      bytes=f.stat().st_size, archivo=f.name, periodo=f"{anho}-{mes:02d}" if anho else None,
+                      **(etiquetas or {}))
+            stats.update(st)
+            if st["fallbacks"]:
+                _olvidar_formato(f)
+            yield df, aviso
+    finally:
+        ESTADISTICAS_LECTURA.update(stats)
+        print(f"[CSV] {resumen_lectura(stats)}")
+
+def _resultados_en_orden(
+    archivos: list[Path], encabezados: list[str], workers: int, stats: Counter
+) -> Iterator[tuple[Path, tuple]]:
+    """Pool de procesos con a lo más 2*workers resultados en vuelo, así la memoria
+    no crece con la cantidad de archivos aunque el escritor vaya más lento."""
+    if workers <= 1 or len(archivos) < 2:
+        for f in archivos:
+            yield f, _procesar_archivo(f, encabezados, _formato_para(f, stats))
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        def _enviar(f: Path):
+            return f, pool.submit(_procesar_archivo, f, encabezados, _formato_para(f, stats))
+
+        en_vuelo = deque(_enviar(f) for f in archivos[: 2 * workers])
+        pendientes = iter(archivos[2 * workers:])
+        while en_vuelo:
+            f, fut = en_vuelo.popleft()
+            res = fut.result()
+            siguiente = next(pendientes, None)
+            if siguiente is not None:
+                en_vuelo.append(_enviar(siguiente))
+            yield f, res
+
 # --- Función pública ---------------------------------------------------------
 
-def consolidar_libros_por_rut(base_dir: str, rut: str, tipo: str, path_encabezados: str, salida_xlsx: str) -> None:
-    carpeta = Path(base_dir) / f"SII_{rut}" / ("RCV_Venta" if tipo.lower() == "venta" else "RCV_Compra")
+def _carpeta_tipo(base_dir: str, rut: str, tipo: str) -> Path:
+    return Path(base_dir) / f"SII_{rut}" / ("RCV_Venta" if tipo.lower() == "venta" else "RCV_Compra")
+
+def columnas_salida(path_encabezados: str, tipo: str) -> list[str]:
+    """Columnas del consolidado: las del encabezado (en su orden) más "Archivo.Origen"."""
+    return _cargar_encabezados(path_encabezados, tipo) + ["Archivo.Origen"]
+
+def iterar_consolidado(
+    base_dir: str,
+    rut: str,
+    tipo: str,
+    path_encabezados: str,
+    *,
+    workers: int | None = None,
+) -> Iterator[pd.DataFrame]:
+    """Entrega el consolidado como lotes (uno por CSV, en orden de nombre).
+
+    Cada lote ya viene normalizado y con las columnas de columnas_salida();
+    sirve para encadenar el cálculo sin pasar por disco. Los CSV se parsean
+    en un pool de procesos (`workers`, por defecto hasta 4 núcleos).
+    """
+    carpeta = _carpeta_tipo(base_dir, rut, tipo)
     if not carpeta.exists():
         print(f"⚠️ Carpeta no encontrada: {carpeta}")
         return
@@ -79,38 +288,61 @@ def consolidar_libros_por_rut(base_dir: str, rut: str, tipo: str, path_encabezad
         print(f"❌ Error cargando encabezados desde {path_encabezados}: {e}")
         return
 
-    frames: list[pd.DataFrame] = []
     archivos = sorted(carpeta.glob("*.csv"))
     if not archivos:
         print(f"⚠️ Sin CSV en {carpeta}")
         return
 
-    for f in archivos:
-        try:
-            df = _leer_csv_inteligente(f)
-            df.columns = [str(c).strip() for c in df.columns]
-            df = _limpiar_duplicado_encabezado(df)
-            df = _corregir_desplazamiento(df)
-
-            # Mantén solo columnas esperadas (en el orden del encabezado)
-            cols_presentes = [c for c in encabezados if c in df.columns]
-            if not cols_presentes:
-                print(f"⚠️ {f.name}: ninguna columna esperada coincide; se omite")
-                continue
+    if workers is None:
+        workers = min(4, os.cpu_count() or 1)
+    workers = max(1, min(workers, len(archivos)))
 
-            df = df[cols_presentes].copy()
-            df = _convertir_numericos(df, cols_presentes)
+    columnas = encabezados + ["Archivo.Origen"]
+    entregados = 0
+    for df, aviso in _iterar_frames(archivos, encabezados, workers, {"rut": rut, "tipo": tipo.upper()}):
+        if aviso:
+            print(aviso)
+        if df is not None:
+            entregados += 1
+            yield df.reindex(columns=columnas)
+    if not entregados:
+        print(f"⚠️ Sin archivos válidos en {carpeta}")
 
-            df["Archivo.Origen"] = f.name
-            frames.append(df.reset_index(drop=True))
-        except Exception as e:
-            print(f"❌ Error en {f.name}: {e}")
+def consolidar_libros_por_rut(
+    base_dir: str,
+    rut: str,
+    tipo: str,
+    path_encabezados: str,
+    salida_xlsx: str | None,
+    *,
+    workers: int | None = None,
+    parquet_dir: str | None = None,
+    backend: str | None = None,
+) -> None:
+    """Consolida los CSV de RCV_<Tipo> en un XLSX y/o un dataset Parquet.
 
-    if frames:
-        out = pd.concat(frames, ignore_index=True)
-        out_path = Path(salida_xlsx)
-        out_path.parent.mkdir(parents=True, exist_ok=True)
-        out.to_excel(out_path, index=False)
-        print(f"✅ Consolidado: {out_path.name} ({len(out):,} filas)")
-    else:
-        print(f"⚠️ Sin archivos válidos en {carpeta}")
+    Cada lote de iterar_consolidado() se escribe apenas está listo, sin
+    concatenar todo en memoria. Con `parquet_dir` se escribe además (o en
+    lugar del XLSX, si salida_xlsx es None) el dataset particionado por
+    rut/tipo/año/mes que lee almacen.leer_parquet(). `backend` elige el
+    escritor de salida_xlsx (ver conciliacion.escritores; por defecto según
+    la extensión).
+    """
+    escritores: list = []
+    with medir("consolidacion", rut=rut, tipo=tipo.upper()) as sp:
+        for df in iterar_consolidado(base_dir, rut, tipo, path_encabezados, workers=workers):
+            if not escritores:
+                columnas = list(df.columns)
+                if salida_xlsx:
+                    escritores.append(crear_escritor(salida_xlsx, columnas, backend))
+                if parquet_dir:
+                    escritores.append(EscritorParquet(parquet_dir, rut, tipo, columnas))
+            for esc in escritores:
+                esc.escribir(df)
+
+        for esc in escritores:
+            esc.cerrar()
+        sp.filas = escritores[0].filas if escritores else 0
+    if escritores:
+        destinos = ", ".join(e.path.name if hasattr(e, "path") else str(e.dir) for e in escritores)
+        print(f"✅ Consolidado: {destinos} ({escritores[0].filas:,} filas)")
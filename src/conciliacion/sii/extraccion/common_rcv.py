@@ -5,8 +5,9 @@ import os
 import time
 import shutil
 import tempfile
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Iterator, List, Optional, Sequence, Tuple
 
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
@@ -21,7 +22,14 @@ from selenium.common.exceptions import (
     NoSuchElementException,
 )
 
-SII_URL = "https://www4.sii.cl/consdcvinternetui/"
+from .descargas import ArchivoDescargado, SeguidorDescargas
+from .http_rcv import descargar_periodos_http, nombre_archivo, sesion_desde_driver
+from .manifest import PoliticaIncremental, cargar as cargar_manifest, clave_periodo, registrar_periodo
+from . import esperas, navegador, recursos
+from ...instrumentacion import medir, registrar
+
+# BEKILLY_SII_URL permite apuntar a otro host (p.ej. benchmarks/sii_simulado.py)
+SII_URL = os.environ.get("BEKILLY_SII_URL", "https://www4.sii.cl/consdcvinternetui/").rstrip("/") + "/"
 
 # =========================
 # Utilidades ambiente
@@ -32,30 +40,28 @@ def _free_port() -> int:
         s.bind(("", 0))
         return s.getsockname()[1]
 
-def _autodetect_chrome_binary(explicit: Optional[str]) -> Optional[str]:
-    if explicit and os.path.exists(explicit):
-        return explicit
-    for p in (
-        os.environ.get("CHROME_BIN"),
-        shutil.which("google-chrome"),
-        "/usr/bin/google-chrome",
-        shutil.which("chromium-browser"),
-        "/usr/bin/chromium-browser",
-        shutil.which("chromium"),
-        "/snap/bin/chromium",
-    ):
-        if p and os.path.exists(p):
-            return p
-    return None
-
 def build_driver(
     *,
     download_dir: Path,
     headless: bool,
     chrome_binary: Optional[str] = None,
     chromedriver_path: Optional[str] = None,
-) -> Tuple[webdriver.Chrome, WebDriverWait, str]:
-    """Crea un Chrome listo para descargar en download_dir (WSL-friendly)."""
+    max_memoria_mb: Optional[int] = None,
+    liviano: Optional[bool] = None,
+    reutilizar: bool = True,
+    bloquear_recursos: Optional[bool] = None,
+) -> Tuple[webdriver.Remote, WebDriverWait, str]:
+    """Crea un Chrome listo para descargar en download_dir (WSL-friendly).
+
+    max_memoria_mb limita el heap JS de cada renderer y la cantidad de
+    renderers, para acotar la memoria cuando corren varios workers en paralelo.
+    Con `reutilizar` (por defecto) el navegador sale de navegador.crear_driver:
+    chromedriver compartido y perfil clonado de la plantilla; si no, el arranque
+    clásico (servicio y perfil vacío propios). `liviano` (por defecto = headless)
+    desactiva imágenes, fuentes remotas y tráfico de fondo. `bloquear_recursos`
+    (por defecto = liviano) aplica la lista de bloqueo de recursos.py; con
+    `reutilizar` además la caché HTTP va a un --disk-cache-dir persistente.
+    """
     opts = Options()
     if headless:
         opts.add_argument("--headless=new")
@@ -68,14 +74,23 @@ def build_driver(
         "--no-first-run",
         "--no-default-browser-check",
         "--disable-sync",
+        # las pestañas en segundo plano (multipestana) no se frenan
+        "--disable-background-timer-throttling",
+        "--disable-renderer-backgrounding",
+        "--disable-backgrounding-occluded-windows",
     ):
         opts.add_argument(a)
 
-    tmp_profile = tempfile.mkdtemp(prefix="bekilly_chrome_")
-    opts.add_argument(f"--user-data-dir={tmp_profile}")
+    if max_memoria_mb:
+        opts.add_argument(f"--js-flags=--max-old-space-size={int(max_memoria_mb)}")
+        opts.add_argument("--renderer-process-limit=2")
+    liviano = headless if liviano is None else liviano
+    if liviano:
+        navegador.livianas(opts)
+
     opts.add_argument(f"--remote-debugging-port={_free_port()}")
 
-    bin_loc = _autodetect_chrome_binary(chrome_binary)
+    bin_loc = navegador.detectar_chrome(chrome_binary)
     if bin_loc:
         opts.binary_location = bin_loc
 
@@ -86,121 +101,185 @@ def build_driver(
         "download.directory_upgrade": True,
         "safebrowsing.enabled": True,
         "plugins.always_open_pdf_externally": True,
+        # Resumen y Detalle son dos descargas seguidas: evita el aviso de descargas múltiples
+        "profile.default_content_setting_values.automatic_downloads": 1,
+        **(navegador.PREFS_LIVIANAS if liviano else {}),
     }
     opts.add_experimental_option("prefs", prefs)
 
-    if chromedriver_path:
-        service = Service(chromedriver_path)
+    if reutilizar:
+        slot = recursos.reservar_cache(navegador.raiz_cache())
+        if slot is not None:
+            opts.add_argument(f"--disk-cache-dir={slot}")
+        try:
+            driver, tmp_profile = navegador.crear_driver(opts, chrome_binary=bin_loc, chromedriver_path=chromedriver_path)
+        except Exception:
+            if slot is not None:
+                recursos.liberar(str(slot))
+            raise
+        if slot is not None:
+            recursos.asociar(slot, tmp_profile)
     else:
-        which_cd = shutil.which("chromedriver")
+        tmp_profile = tempfile.mkdtemp(prefix="bekilly_chrome_")
+        opts.add_argument(f"--user-data-dir={tmp_profile}")
+        which_cd = navegador.ruta_chromedriver(chromedriver_path)
         service = Service(which_cd) if which_cd else Service()
-
-    driver = webdriver.Chrome(service=service, options=opts)
+        with medir("arranque_driver", servicio="nuevo", perfil="vacio"):
+            driver = webdriver.Chrome(service=service, options=opts)
+    if bloquear_recursos is None:
+        bloquear_recursos = liviano
+    driver.recursos_bloqueados = recursos.patrones() if bloquear_recursos else []  # se repite en pestañas nuevas
+    if driver.recursos_bloqueados:
+        recursos.bloquear(driver, driver.recursos_bloqueados)
+    driver.set_script_timeout(esperas.SCRIPT_TIMEOUT_S)  # carreras de esperas.py
+    _contar_comandos(driver)
     wait = WebDriverWait(driver, 14)
     return driver, wait, tmp_profile
 
+def _contar_comandos(driver) -> None:
+    """Envuelve driver.execute: cada comando WebDriver (un round trip al
+    chromedriver, incluidos los de WebElement) suma en driver.comandos_webdriver."""
+    original = driver.execute
+    driver.comandos_webdriver = 0
+
+    def execute(comando, params=None):
+        driver.comandos_webdriver += 1
+        return original(comando, params)
+
+    driver.execute = execute
+
+@contextmanager
+def _comandos_periodo(driver, **etiquetas) -> Iterator[None]:
+    """Emite 'comandos_webdriver' con los comandos que usó el bloque (un período)."""
+    n0, t0 = getattr(driver, "comandos_webdriver", 0), time.perf_counter()
+    try:
+        yield
+    finally:
+        n = getattr(driver, "comandos_webdriver", 0) - n0
+        registrar("comandos_webdriver", time.perf_counter() - t0, comandos=n, **etiquetas)
+        print(f"[UI] {etiquetas.get('tipo')} {etiquetas.get('periodo')}: {n} comandos WebDriver")
+
 # =========================
 # Sesión / navegación SII
 # =========================
+# Sondas en una sola llamada execute_script: todos los selectores se evalúan en
+# la página y vuelve un estado compacto, en vez de un find_element por selector.
+_JS_XPATH = """
+function xp(q, ctx) {
+  return document.evaluate(q, ctx || document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+}
+function visible(el) { return !!(el && (el.offsetWidth || el.offsetHeight || el.getClientRects().length)); }
+"""
+
+# Login AUT2000: por URL o por los campos con id de su formulario. No vale
+# [name="rut"]: la página RCV tiene <select name="rut"> en formContribuyente.
+URL_LOGIN = "IngresoRutClave|AUT2000|AUTENTICACION"
+CAMPOS_LOGIN = "#rutcntr, #clave, #bt_ingresar"
+# expresión JS, compartida con multipestana._JS_ESTADO
+_JS_ES_LOGIN = "/" + URL_LOGIN + "/.test(location.href) || !!document.querySelector('" + CAMPOS_LOGIN + "')"
+_JS_LOGIN = "return " + _JS_ES_LOGIN + ";"
+
+_JS_PANEL = _JS_XPATH + """
+var tipo = arguments[0], base = arguments[1];
+var strong = xp("//ul//li//strong[normalize-space()='" + tipo + "']");
+var li = strong && strong.parentElement && strong.parentElement.parentElement && strong.parentElement.parentElement.parentElement;
+return {
+  pestana: !!(visible(strong) && li && /(^|\\s)active(\\s|$)/.test(li.className || '')),
+  hash: (location.hash || '').indexOf('#' + base + '/') >= 0,
+  panel: !!document.querySelector('#' + base + '.active, #pane-' + base + ".active, [role='tabpanel'].active[id*='" + base + "']")
+};
+"""
+
+_JS_ALERTAS = _JS_XPATH + """
+var xps = arguments[0], vistos = [], clics = 0;
+for (var i = 0; i < xps.length; i++) {
+  var r = document.evaluate(xps[i], document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+  for (var j = 0; j < r.snapshotLength; j++) {
+    var el = r.snapshotItem(j);
+    if (vistos.indexOf(el) >= 0 || !visible(el) || el.disabled) continue;
+    vistos.push(el);
+    try { el.click(); clics++; } catch (e) {}
+  }
+}
+return {clics: clics, modal: !!document.querySelector('.modal.show')};
+"""
+
+_XPATHS_ALERTA = (
+    "//div[contains(@class,'modal') and contains(@class,'show')]//button[normalize-space()='Aceptar']",
+    "//div[contains(@class,'modal') and contains(@class,'show')]//button[normalize-space()='OK']",
+    "//div[contains(@class,'modal') and contains(@class,'show')]//button[contains(.,'Cerrar')]",
+    "//button[normalize-space()='Aceptar']",
+    "//button[normalize-space()='OK']",
+    "//button[contains(.,'Cerrar')]",
+)
+
 def _esta_en_login(driver) -> bool:
     try:
-        url = driver.current_url
-        if any(k in url for k in ("IngresoRutClave", "AUT2000", "AUTENTICACION")):
-            return True
+        return bool(driver.execute_script(_JS_LOGIN))
     except Exception:
-        pass
-    for by, sel in (
-        (By.ID, "rutcntr"),
-        (By.NAME, "rut"),
-        (By.ID, "clave"),
-        (By.NAME, "clave"),
-        (By.ID, "bt_ingresar"),
-    ):
+        return False
+
+def _cerrar_alertas(driver, wait: WebDriverWait) -> None:
+    try:
+        estado = driver.execute_script(_JS_ALERTAS, list(_XPATHS_ALERTA)) or {}
+    except Exception:
+        return
+    if estado.get("clics") and estado.get("modal"):
+        # en vez de una pausa fija por clic: hasta que no quede un modal visible
         try:
-            if driver.find_element(by, sel):
-                return True
+            esperas.carrera(driver, "alerta_cierre", [(By.CSS_SELECTOR, ".modal.show")], condicion="ausente", defecto=2.0)
         except Exception:
-            continue
-    return False
+            pass
 
-def _cerrar_alertas(driver, wait: WebDriverWait) -> None:
-    xps = (
-        "//div[contains(@class,'modal') and contains(@class,'show')]//button[normalize-space()='Aceptar']",
-        "//div[contains(@class,'modal') and contains(@class,'show')]//button[normalize-space()='OK']",
-        "//div[contains(@class,'modal') and contains(@class,'show')]//button[contains(.,'Cerrar')]",
-        "//button[normalize-space()='Aceptar']",
-        "//button[normalize-space()='OK']",
-        "//button[contains(.,'Cerrar')]",
-    )
-    for xp in xps:
-        for el in driver.find_elements(By.XPATH, xp):
-            try:
-                if el.is_displayed() and el.is_enabled():
-                    driver.execute_script("arguments[0].click();", el)
-                    time.sleep(0.2)
-            except Exception:
-                pass
+_CAMPO_RUT = (By.ID, "rutcntr")
+_BOTONES_LOGIN = ("//*[@id='bt_ingresar']", "//button[contains(.,'Ingresar')]", "//input[@type='submit']")
 
 def _asegurar_sesion(driver, wait: WebDriverWait, rut: str, clave: str) -> None:
     if not _esta_en_login(driver):
         return
-    # Variante común
     try:
-        rut_el = wait.until(EC.presence_of_element_located((By.ID, "rutcntr")))
+        _, rut_el = esperas.carrera(driver, "login_formulario", [_CAMPO_RUT])
         rut_el.clear(); rut_el.send_keys(rut)
         clave_el = driver.find_element(By.ID, "clave")
         clave_el.clear(); clave_el.send_keys(clave)
-        btn = driver.find_element(By.ID, "bt_ingresar")
-        driver.execute_script("arguments[0].click();", btn)
-        time.sleep(0.2)
-        return
     except Exception:
-        pass
-    # Variante alternativa
-    try:
-        rut_el = wait.until(EC.presence_of_element_located((By.NAME, "rut")))
-        rut_el.clear(); rut_el.send_keys(rut)
-        clave_el = driver.find_element(By.NAME, "clave")
-        clave_el.clear(); clave_el.send_keys(clave)
-        for xp in ("//button[@id='bt_ingresar']", "//button[contains(.,'Ingresar')]", "//input[@type='submit']"):
-            try:
-                b = driver.find_element(By.XPATH, xp)
-                driver.execute_script("arguments[0].click();", b)
-                time.sleep(0.2)
-                return
-            except Exception:
-                continue
-    except Exception:
-        pass
+        return
+    for xp in _BOTONES_LOGIN:
+        try:
+            b = driver.find_element(By.XPATH, xp)
+            driver.execute_script("arguments[0].click();", b)
+        except Exception:
+            continue
+        # que el envío arranque antes de que el llamador navegue (antes: pausa fija)
+        try:
+            esperas.carrera(driver, "login_envio", [_CAMPO_RUT], condicion="ausente", defecto=3.0)
+        except Exception:
+            pass
+        return
 
 def goto_rcv(driver, wait: WebDriverWait, rut: str, clave: str) -> None:
+    with medir("login", rut=rut) as sp:
+        _goto_rcv(driver, wait, rut, clave)
+        sp.bytes = recursos.bytes_pagina(driver)
+
+_PAGINA_RCV = ((By.ID, "periodoMes"), (By.XPATH, "//select[@ng-model='periodoAnho']"))
+
+def _goto_rcv(driver, wait: WebDriverWait, rut: str, clave: str) -> None:
     driver.get(SII_URL)
     try:
-        wait.until(
-            EC.any_of(
-                EC.presence_of_element_located((By.ID, "periodoMes")),
-                EC.presence_of_element_located((By.XPATH, "//select[@ng-model='periodoAnho']")),
-                EC.presence_of_element_located((By.ID, "rutcntr")),
-            )
-        )
+        esperas.carrera(driver, "rcv_carga", _PAGINA_RCV + (_CAMPO_RUT,))
     except TimeoutException:
         pass
     _asegurar_sesion(driver, wait, rut, clave)
     try:
-        wait.until(
-            EC.any_of(
-                EC.presence_of_element_located((By.ID, "periodoMes")),
-                EC.presence_of_element_located((By.XPATH, "//select[@ng-model='periodoAnho']")),
-            )
-        )
+        esperas.carrera(driver, "rcv_listo", _PAGINA_RCV)
     except TimeoutException:
-        time.sleep(0.2)
+        pass
 
 # =========================
 # UI helpers
 # =========================
-def _click_resiliente(driver, locator, timeout=14) -> bool:
-    el = WebDriverWait(driver, timeout).until(EC.element_to_be_clickable(locator))
+def _clickear(driver, el) -> bool:
     driver.execute_script("arguments[0].scrollIntoView({block:'center'});", el)
     try:
         el.click()
@@ -218,66 +297,56 @@ def _click_resiliente(driver, locator, timeout=14) -> bool:
     except Exception:
         return False
 
+def _click_resiliente(driver, locator, timeout=14) -> bool:
+    el = WebDriverWait(driver, timeout).until(EC.element_to_be_clickable(locator))
+    return _clickear(driver, el)
+
 def select_period_and_consult(driver, wait: WebDriverWait, *, anho: int, mes: int) -> None:
+    _enviar_consulta(driver, anho=anho, mes=mes)
+    _esperar_consulta(driver)
+
+def _enviar_consulta(driver, *, anho: int, mes: int) -> None:
+    """Elige el período y hace click en 'Consultar' sin esperar el resultado."""
     # 1) Mes y Año (IDs/atributos reales del sitio)
-    mes_el = wait.until(EC.presence_of_element_located((By.ID, "periodoMes")))
+    _, mes_el = esperas.carrera(driver, "periodo", [(By.ID, "periodoMes")])
     Select(mes_el).select_by_value(f"{mes:02d}")
-    anho_el = wait.until(EC.presence_of_element_located((By.XPATH, "//select[@ng-model='periodoAnho']")))
+    _, anho_el = esperas.carrera(driver, "periodo_anho", [(By.XPATH, "//select[@ng-model='periodoAnho']")])
     Select(anho_el).select_by_value(str(anho))
 
-    # 2) Consultar (XPath absoluto + fallbacks)
+    # 2) Consultar (XPath absoluto + fallbacks, compitiendo en una sola espera)
     locs = [
         (By.XPATH, "/html/body/div[1]/div[2]/div[1]/div[1]/div/div[1]/div/div[3]/div/form/div[3]/button"),
         (By.XPATH, "//button[@type='submit' and normalize-space()='Consultar']"),
         (By.CSS_SELECTOR, "form button.btn.btn-default.btn-xs-block.btn-block[type='submit']"),
     ]
-    for loc in locs:
-        try:
-            if _click_resiliente(driver, loc):
-                break
-        except TimeoutException:
-            continue
-    else:
+    try:
+        _, boton = esperas.carrera(driver, "consultar", locs, condicion="clickable")
+    except TimeoutException:
+        boton = None
+    if boton is None or not _clickear(driver, boton):
         raise RuntimeError("No fue posible hacer click en 'Consultar'.")
 
-    # 3) Espera inicial post-consulta
+def _esperar_consulta(driver) -> None:
+    # 3) Espera post-consulta: pestañas presentes y sin indicador de carga
     try:
-        wait.until(
-            EC.any_of(
-                EC.presence_of_element_located((By.XPATH, "//*[@role='tablist']")),
-                EC.presence_of_element_located((By.XPATH, "//*[contains(@class,'nav-tabs')]")),
-                EC.presence_of_element_located((By.XPATH, "//strong[normalize-space()='COMPRA']")),
-                EC.presence_of_element_located((By.XPATH, "//strong[normalize-space()='VENTA']")),
-                EC.invisibility_of_element_located((By.CSS_SELECTOR, ".loading, .spinner, .block-ui-message-container")),
-            )
-        )
+        esperas.carrera(driver, "post_consulta", [
+            (By.XPATH, "//*[@role='tablist']"),
+            (By.XPATH, "//*[contains(@class,'nav-tabs')]"),
+            (By.XPATH, "//strong[normalize-space()='COMPRA']"),
+            (By.XPATH, "//strong[normalize-space()='VENTA']"),
+        ])
+        esperas.carrera(driver, "post_consulta_carga",
+                        [(By.CSS_SELECTOR, ".loading, .spinner, .block-ui-message-container")], condicion="ausente")
     except TimeoutException:
         pass
 
 def _panel_visible(driver, tipo_up: str) -> bool:
     """Confirma que la pestaña correcta está activa (texto, li.active y hash #venta/#compra)."""
-    base = tipo_up.lower()
     try:
-        strong = driver.find_element(By.XPATH, f"//ul//li//strong[normalize-space()='{tipo_up}']")
-        if strong.is_displayed():
-            li = strong.find_element(By.XPATH, "../../..")
-            if "active" in (li.get_attribute("class") or ""):
-                return True
+        estado = driver.execute_script(_JS_PANEL, tipo_up, tipo_up.lower()) or {}
     except Exception:
-        pass
-    try:
-        hashval = driver.execute_script("return window.location.hash || ''") or ""
-        if f"#{base}/" in hashval:
-            return True
-    except Exception:
-        pass
-    for css in (f"#{base}.active", f"#pane-{base}.active", f"[role='tabpanel'].active[id*='{base}']"):
-        try:
-            if driver.find_element(By.CSS_SELECTOR, css):
-                return True
-        except Exception:
-            continue
-    return False
+        return False
+    return any(estado.values())
 
 def activate_tab(driver, wait: WebDriverWait, *, tipo_up: str) -> None:
     """Activa COMPRA/VENTA priorizando ui-sref/href; incluye reintentos y fallback JS."""
@@ -285,44 +354,29 @@ def activate_tab(driver, wait: WebDriverWait, *, tipo_up: str) -> None:
         return
 
     base = tipo_up.lower()
+    activa = lambda: _panel_visible(driver, tipo_up)  # noqa: E731
 
-    # Preferidos: ui-sref / href
-    preferidos = [
+    # Preferidos: ui-sref / href; respaldo: <a> de los XPaths absolutos de <strong>
+    absolutos = {
+        "COMPRA": "/html/body/div[1]/div[2]/div[1]/div[1]/div/div[2]/ul/li[1]/a/strong",
+        "VENTA":  "/html/body/div[1]/div[2]/div[1]/div[1]/div/div[2]/ul/li[2]/a/strong",
+    }
+    candidatos = [
         (By.CSS_SELECTOR, f"a[ui-sref='{base}']"),
         (By.CSS_SELECTOR, f"a[href='#{base}/']"),
         (By.XPATH, f"//ul/li/a[@ui-sref='{base}']"),
         (By.XPATH, f"//ul/li/a[@href='#{base}/']"),
     ]
-    for by, sel in preferidos:
-        try:
-            a = WebDriverWait(driver, 6).until(EC.element_to_be_clickable((by, sel)))
-            driver.execute_script("arguments[0].scrollIntoView({block:'center'});", a)
-            driver.execute_script("arguments[0].click();", a)
-            for _ in range(12):
-                if _panel_visible(driver, tipo_up):
-                    return
-                time.sleep(0.1)
-        except Exception:
-            continue
-
-    # Respaldo: XPaths absolutos de <strong>
-    absolutos = {
-        "COMPRA": "/html/body/div[1]/div[2]/div[1]/div[1]/div/div[2]/ul/li[1]/a/strong",
-        "VENTA":  "/html/body/div[1]/div[2]/div[1]/div[1]/div/div[2]/ul/li[2]/a/strong",
-    }
-    xp = absolutos.get(tipo_up)
-    if xp:
-        try:
-            st = WebDriverWait(driver, 6).until(EC.presence_of_element_located((By.XPATH, xp)))
-            a = st.find_element(By.XPATH, "./parent::*")
-            driver.execute_script("arguments[0].scrollIntoView({block:'center'});", a)
-            driver.execute_script("arguments[0].click();", a)
-            for _ in range(12):
-                if _panel_visible(driver, tipo_up):
-                    return
-                time.sleep(0.1)
-        except Exception:
-            pass
+    if tipo_up in absolutos:
+        candidatos.append((By.XPATH, absolutos[tipo_up] + "/parent::*"))
+    try:
+        _, a = esperas.carrera(driver, f"pestaña_{base}", candidatos, condicion="clickable", defecto=6.0)
+        driver.execute_script("arguments[0].scrollIntoView({block:'center'});", a)
+        driver.execute_script("arguments[0].click();", a)
+        if esperas.hasta(driver, "panel_activo", activa, defecto=1.2):
+            return
+    except Exception:
+        pass
 
     # Fallback JS
     js = """
@@ -333,58 +387,210 @@ def activate_tab(driver, wait: WebDriverWait, *, tipo_up: str) -> None:
     """
     try:
         ok = driver.execute_script(js, base)
-        if ok:
-            for _ in range(12):
-                if _panel_visible(driver, tipo_up):
-                    return
-                time.sleep(0.1)
+        if ok and esperas.hasta(driver, "panel_activo", activa, defecto=1.2):
+            return
     except Exception:
         pass
 
     raise NoSuchElementException(f"No fue posible activar la pestaña {tipo_up}")
 
-def download_resumen_y_detalle(driver, wait: WebDriverWait) -> None:
-    """Click en 'Descargar Resumenes' y luego 'Descargar Detalles' si existen."""
+def download_resumen_y_detalle(
+    driver, wait: WebDriverWait, seguidor: Optional[SeguidorDescargas] = None, timeout: float = 10.0,
+) -> List[ArchivoDescargado]:
+    """Click en 'Descargar Resumenes' y luego 'Descargar Detalles' si existen.
+
+    Con un seguidor, tras cada click espera solo hasta que ese archivo esté
+    completo (en vez de pausas fijas) y devuelve los archivos descargados.
+    """
     try:
-        wait.until(
-            EC.any_of(
-                EC.presence_of_element_located((By.XPATH, "//button[contains(.,'Descargar Resumenes')]")),
-                EC.presence_of_element_located((By.XPATH, "//button[contains(.,'Descargar Detalles')]")),
-                EC.presence_of_element_located((By.XPATH, "/html/body/div[1]/div[2]/div[1]/div[2]/div/div/div/div/div[4]")),
-            )
-        )
+        esperas.carrera(driver, "botones_descarga", [
+            (By.XPATH, "//button[contains(.,'Descargar Resumenes')]"),
+            (By.XPATH, "//button[contains(.,'Descargar Detalles')]"),
+            (By.XPATH, "/html/body/div[1]/div[2]/div[1]/div[2]/div/div/div/div/div[4]"),
+        ])
     except TimeoutException:
         pass
 
-    # Resumenes
-    for loc in (
-        (By.XPATH, "/html/body/div[1]/div[2]/div[1]/div[2]/div/div/div/div/div[4]/div[1]/div[1]/button"),
-        (By.XPATH, "//button[normalize-space()='Descargar Resumenes']"),
-        (By.XPATH, "//button[contains(.,'Descargar Resumenes')]"),
-    ):
-        try:
-            if _click_resiliente(driver, loc):
-                time.sleep(1.0)
-                break
-        except Exception:
-            pass
-
-    # Detalles
-    for loc in (
-        (By.XPATH, "/html/body/div[1]/div[2]/div[1]/div[2]/div/div/div/div/div[4]/div[1]/div[2]/button"),
-        (By.XPATH, "//button[normalize-space()='Descargar Detalles']"),
-        (By.XPATH, "//button[contains(.,'Descargar Detalles')]"),
-    ):
+    botones = (
+        ("resumen", 1.0, (
+            (By.XPATH, "/html/body/div[1]/div[2]/div[1]/div[2]/div/div/div/div/div[4]/div[1]/div[1]/button"),
+            (By.XPATH, "//button[normalize-space()='Descargar Resumenes']"),
+            (By.XPATH, "//button[contains(.,'Descargar Resumenes')]"),
+        )),
+        ("detalle", 2.0, (
+            (By.XPATH, "/html/body/div[1]/div[2]/div[1]/div[2]/div/div/div/div/div[4]/div[1]/div[2]/button"),
+            (By.XPATH, "//button[normalize-space()='Descargar Detalles']"),
+            (By.XPATH, "//button[contains(.,'Descargar Detalles')]"),
+        )),
+    )
+    archivos: List[ArchivoDescargado] = []
+    for clase, pausa, locs in botones:
         try:
-            if _click_resiliente(driver, loc):
-                time.sleep(2.0)
-                break
+            _, boton = esperas.carrera(driver, f"boton_{clase}", locs, condicion="clickable")
+            if seguidor:
+                seguidor.marcar()
+            if _clickear(driver, boton):
+                if seguidor:
+                    archivos += seguidor.esperar([clase], timeout=timeout)
+                else:
+                    time.sleep(pausa)  # sin seguidor no hay señal de fin de descarga
         except Exception:
             pass
+    return archivos
 
 # =========================
 # Core reutilizable por tipo
 # =========================
+def _periodos(anho_ini: int, mes_ini: int, anho_fin: int, mes_fin: int) -> Iterator[Tuple[int, int]]:
+    for anho in range(int(anho_ini), int(anho_fin) + 1):
+        m_ini = int(mes_ini) if anho == int(anho_ini) else 1
+        m_fin = int(mes_fin) if anho == int(anho_fin) else 12
+        for mes in range(m_ini, m_fin + 1):
+            yield anho, mes
+
+def _asignados(bitacora, rut: str, tipo_up: str, periodos: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Con bitácora, solo los períodos que este proceso tiene reclamados (reanudación)."""
+    if bitacora is None:
+        return periodos
+    propios = [(a, m) for a, m in periodos if bitacora.asignado(rut, tipo_up, clave_periodo(a, m))]
+    if len(propios) < len(periodos):
+        print(f"[REANUDAR] {rut} {tipo_up}: {len(periodos) - len(propios)} períodos ya terminados o de otro worker; se omiten.")
+    return propios
+
+def _marcar(bitacora, rut: str, tipo_up: str, anho: int, mes: int, ok: bool, error: Optional[str] = None) -> None:
+    """Anota en la bitácora (si hay) el resultado de extraer el período."""
+    if bitacora is not None:
+        bitacora.terminar(rut, tipo_up, clave_periodo(anho, mes), "extraccion", ok=ok, error=error)
+
+def _pendientes(
+    out_dir: Path, anho_ini: int, mes_ini: int, anho_fin: int, mes_fin: int, politica: PoliticaIncremental,
+) -> List[Tuple[int, int]]:
+    """Períodos del rango que hay que (re)descargar según el manifiesto de out_dir."""
+    data = cargar_manifest(out_dir)
+    todos = list(_periodos(anho_ini, mes_ini, anho_fin, mes_fin))
+    pendientes = [(a, m) for a, m in todos if politica.debe_descargar(out_dir, a, m, data)]
+    if len(pendientes) < len(todos):
+        print(f"[INC] {out_dir.name}: {len(todos) - len(pendientes)} de {len(todos)} períodos vigentes en manifiesto; se omiten.")
+    return pendientes
+
+_cdp = navegador.cdp
+
+def _set_download_dir(driver, download_dir: Path) -> None:
+    """Redirige las descargas del navegador ya abierto a download_dir."""
+    download_dir.mkdir(parents=True, exist_ok=True)
+    params = {"behavior": "allow", "downloadPath": str(download_dir)}
+    try:
+        _cdp(driver, "Browser.setDownloadBehavior", params)
+    except Exception:
+        _cdp(driver, "Page.setDownloadBehavior", params)
+
+def _dump_debug(driver, carpeta_base: Path, nombre: str) -> None:
+    try:
+        dbg = (carpeta_base / "debug")
+        dbg.mkdir(parents=True, exist_ok=True)
+        with open(dbg / f"debug_{nombre}.html", "w", encoding="utf-8") as f:
+            f.write(driver.page_source)
+        driver.save_screenshot(str(dbg / f"debug_{nombre}.png"))
+    except Exception:
+        pass
+
+def _a_nombres_canonicos(out_dir: Path, *, rut: str, tipo_up: str, anho: int, mes: int,
+                         archivos: List[ArchivoDescargado]) -> List[ArchivoDescargado]:
+    """Renombra las descargas al nombre canónico del período (http_rcv.nombre_archivo).
+
+    Si el período ya estaba en disco Chrome guarda la copia nueva como
+    '... (1).csv'; os.replace la deja en el lugar de la anterior. Queda un
+    archivo por clase (si se bajó dos veces, el último).
+    """
+    por_clase = {}
+    for a in archivos:
+        nombre = nombre_archivo(rut, tipo_up, a.clase, anho, mes)
+        if a.nombre != nombre and (out_dir / a.nombre).exists():
+            os.replace(out_dir / a.nombre, out_dir / nombre)
+        por_clase[a.clase] = ArchivoDescargado(nombre, a.clase, a.bytes, a.segundos)
+    return list(por_clase.values())
+
+def _descargar_tipo(driver, wait: WebDriverWait, *, rut: str, tipo_up: str, anho: int, mes: int, out_dir: Path) -> bool:
+    """Con el período ya consultado: activa la pestaña tipo_up, descarga en out_dir y
+    registra en el manifiesto los archivos completos (bytes y duración).
+    Devuelve si llegó algún archivo."""
+    ms = f"{mes:02d}"
+    etiquetas = dict(rut=rut, tipo=tipo_up, periodo=f"{anho}-{ms}")
+
+    with medir("pestaña", **etiquetas):
+        # (2) Activar pestaña correcta
+        activate_tab(driver, wait, tipo_up=tipo_up)
+        _cerrar_alertas(driver, wait)
+
+        # Guard-rail: confirmar activa; reintento si no
+        if not _panel_visible(driver, tipo_up):
+            print(f"[WARN] {tipo_up} {anho}-{ms}: pestaña no activa. Reintentando…")
+            activate_tab(driver, wait, tipo_up=tipo_up)
+        if not _panel_visible(driver, tipo_up):
+            raise RuntimeError(f"Pestaña {tipo_up} no activa tras reintentos")
+
+    print(f"[UI] Pestaña activa: {tipo_up} | {anho}-{ms}")
+
+    # (3) Seguidor de descargas (snapshot de lo existente)
+    with SeguidorDescargas(out_dir) as seguidor:
+        # (4) Descargar Resumenes y Detalles; retorna apenas cada archivo está completo
+        archivos = download_resumen_y_detalle(driver, wait, seguidor=seguidor)
+
+        # (5) Sin archivos completos: reintentar descarga una vez.
+        if not archivos:
+            print(f"[WARN] {tipo_up} {anho}-{ms}: sin archivos completos tras 10s, reintentando descarga…")
+            archivos = download_resumen_y_detalle(driver, wait, seguidor=seguidor)
+
+    archivos = _a_nombres_canonicos(out_dir, rut=rut, tipo_up=tipo_up, anho=anho, mes=mes, archivos=archivos)
+    for a in archivos:
+        print(f"[DL] {tipo_up} {anho}-{ms} | {a.clase:<7} {a.nombre} | {a.bytes:,} B en {a.segundos:.1f}s")
+        registrar("descarga", a.segundos, bytes=a.bytes, clase=a.clase, **etiquetas)
+    if archivos:
+        registrar_periodo(out_dir, rut=rut, tipo_up=tipo_up, anho=anho, mes=mes, archivos=archivos)
+    return bool(archivos)
+
+def _fase_http(
+    driver, *, rut: str, tipo_up: str, periodos: Sequence[Tuple[int, int]], out_dir: Path, workers: int,
+) -> List[Tuple[int, int]]:
+    """Camino rápido: con la sesión ya logueada, baja los CSV por HTTP en paralelo.
+
+    Devuelve los períodos que fallaron, que el llamador debe reintentar por la UI.
+    """
+    if not periodos:
+        return []
+    try:
+        sesion = sesion_desde_driver(driver, pool=workers)
+    except Exception as e:
+        print(f"[HTTP] {rut} {tipo_up}: no disponible ({e}); se usa la UI.")
+        return list(periodos)
+    t0 = time.monotonic()
+    with sesion:
+        ok, fallidos = descargar_periodos_http(
+            sesion, base_url=SII_URL, rut=rut, tipo_up=tipo_up,
+            periodos=periodos, out_dir=out_dir, workers=workers,
+        )
+    for (anho, mes), archivos in sorted(ok.items()):
+        registrar_periodo(out_dir, rut=rut, tipo_up=tipo_up, anho=anho, mes=mes, archivos=archivos)
+        for a in archivos:
+            registrar("descarga_http", a.segundos, bytes=a.bytes, clase=a.clase,
+                      rut=rut, tipo=tipo_up, periodo=f"{anho}-{mes:02d}")
+    for (anho, mes), err in sorted(fallidos.items()):
+        print(f"[HTTP] {tipo_up} {anho}-{mes:02d}: {err}; se reintenta por la UI.")
+    print(f"[HTTP] {rut} {tipo_up}: {len(ok)}/{len(periodos)} períodos en {time.monotonic() - t0:.1f}s")
+    return sorted(fallidos)
+
+def _cerrar_driver(driver, tmp_profile: str) -> None:
+    esperas.memoria().guardar()
+    try:
+        driver.quit()
+    except Exception:
+        pass
+    recursos.liberar(tmp_profile)
+    try:
+        shutil.rmtree(tmp_profile, ignore_errors=True)
+    except Exception:
+        pass
+
 def extract_for_tipo(
     *,
     rut: str,
@@ -398,81 +604,81 @@ def extract_for_tipo(
     headless: bool,
     chrome_binary: Optional[str],
     chromedriver_path: Optional[str],
+    max_memoria_mb: Optional[int] = None,
+    politica: Optional[PoliticaIncremental] = None,
+    modo_http: bool = False,
+    http_workers: int = 4,
+    bitacora=None,
+    pestanas: int = 1,
 ) -> None:
-    """Flujo completo para COMPRA o VENTA (incluye guard-rail y reintento de descarga)."""
+    """Flujo completo para COMPRA o VENTA (incluye guard-rail y reintento de descarga).
+
+    Los períodos cerrados que el manifiesto ya tiene intactos se omiten según
+    `politica`; si no queda ninguno pendiente no se abre el navegador.
+    Con modo_http, tras el login los CSV se piden directo a los servicios de
+    RCV; solo los períodos que fallen pasan por la UI.
+    Con `bitacora` (sii.bitacora.Bitacora) solo se procesan los períodos
+    reclamados por este proceso y el resultado de cada uno queda anotado.
+    Con `pestanas` > 1 los períodos se reparten entre varias pestañas del
+    mismo navegador (ver multipestana), con un solo login.
+    """
     tipo_up = tipo_up.strip().upper()
     assert tipo_up in {"COMPRA", "VENTA"}, "tipo_up debe ser COMPRA o VENTA"
 
     out_dir = carpeta_base / f"SII_{rut}" / f"RCV_{tipo_up.capitalize()}"
+    periodos = _pendientes(out_dir, anho_ini, mes_ini, anho_fin, mes_fin, politica or PoliticaIncremental())
+    periodos = _asignados(bitacora, rut, tipo_up, periodos)
+    if not periodos:
+        print(f"[RCV] {rut} {tipo_up}: todos los períodos ya descargados; nada que hacer.")
+        return
+
     driver, wait, tmp_profile = build_driver(
         download_dir=out_dir,
         headless=headless,
         chrome_binary=chrome_binary,
         chromedriver_path=chromedriver_path,
+        max_memoria_mb=max_memoria_mb,
     )
 
     try:
         caps = driver.capabilities
-        print(f"[RCV] {tipo_up} | Headless={headless} | Chrome={caps.get('browserVersion') or caps.get('version')} → {out_dir}")
+        print(f"[RCV] {rut} {tipo_up} | Headless={headless} | Chrome={caps.get('browserVersion') or caps.get('version')} → {out_dir}")
         goto_rcv(driver, wait, rut, clave)
         _cerrar_alertas(driver, wait)
 
-        for anho in range(int(anho_ini), int(anho_fin) + 1):
-            m_ini = int(mes_ini) if anho == int(anho_ini) else 1
-            m_fin = int(mes_fin) if anho == int(anho_fin) else 12
-
-            for mes in range(m_ini, m_fin + 1):
-                ms = f"{mes:02d}"
+        if modo_http:
+            fallidos = _fase_http(driver, rut=rut, tipo_up=tipo_up, periodos=periodos, out_dir=out_dir, workers=http_workers)
+            for anho, mes in set(periodos) - set(fallidos):
+                _marcar(bitacora, rut, tipo_up, anho, mes, True)
+            periodos = fallidos
+
+        if pestanas > 1 and len(periodos) > 1:
+            from .multipestana import extraer_en_pestanas
+            extraer_en_pestanas(driver, wait, rut=rut, clave=clave, trabajo={p: [tipo_up] for p in periodos},
+                                out_dirs={tipo_up: out_dir}, carpeta_base=carpeta_base,
+                                pestanas=pestanas, bitacora=bitacora)
+            return
+
+        for anho, mes in periodos:
+            ms = f"{mes:02d}"
+            with _comandos_periodo(driver, rut=rut, tipo=tipo_up, periodo=f"{anho}-{ms}"):
                 try:
                     if _esta_en_login(driver):
                         _asegurar_sesion(driver, wait, rut, clave)
                         goto_rcv(driver, wait, rut, clave)
 
                     # (1) Período + Consultar
-                    select_period_and_consult(driver, wait, anho=anho, mes=mes)
-                    _cerrar_alertas(driver, wait)
-
-                    # (2) Activar pestaña correcta
-                    activate_tab(driver, wait, tipo_up=tipo_up)
-                    _cerrar_alertas(driver, wait)
-
-                    # Guard-rail: confirmar activa; reintento si no
-                    if not _panel_visible(driver, tipo_up):
-                        print(f"[WARN] {tipo_up} {anho}-{ms}: pestaña no activa. Reintentando…")
-                        activate_tab(driver, wait, tipo_up=tipo_up)
-                        time.sleep(0.5)
-                    if not _panel_visible(driver, tipo_up):
-                        raise RuntimeError(f"Pestaña {tipo_up} no activa tras reintentos")
-
-                    print(f"[UI] Pestaña activa: {tipo_up} | {anho}-{ms}")
-
-                    # (3) Snapshot antes de descargar
-                    before = set(p.name for p in out_dir.glob("*"))
-
-                    # (4) Descargar Resumenes y Detalles
-                    download_resumen_y_detalle(driver, wait)
-
-                    # (5) Verificar archivos nuevos (10s). Si no, reintentar descarga.
-                    for _ in range(10):
-                        after = set(p.name for p in out_dir.glob("*"))
-                        if after - before:
-                            break
-                        time.sleep(1)
-                    else:
-                        print(f"[WARN] {tipo_up} {anho}-{ms}: sin archivos nuevos tras 10s, reintentando descarga…")
-                        download_resumen_y_detalle(driver, wait)
+                    with medir("consulta_periodo", rut=rut, tipo=tipo_up, periodo=f"{anho}-{ms}"):
+                        select_period_and_consult(driver, wait, anho=anho, mes=mes)
+                        _cerrar_alertas(driver, wait)
+
+                    ok = _descargar_tipo(driver, wait, rut=rut, tipo_up=tipo_up, anho=anho, mes=mes, out_dir=out_dir)
+                    _marcar(bitacora, rut, tipo_up, anho, mes, ok, None if ok else "sin archivos completos")
 
                 except Exception as e:
-                    print(f"[ERR] {tipo_up} {anho}-{ms}: {e}")
-                    # Dump de depuración
-                    try:
-                        dbg = (carpeta_base / "debug")
-                        dbg.mkdir(parents=True, exist_ok=True)
-                        with open(dbg / f"debug_{tipo_up}_{anho}-{ms}.html", "w", encoding="utf-8") as f:
-                            f.write(driver.page_source)
-                        driver.save_screenshot(str(dbg / f"debug_{tipo_up}_{anho}-{ms}.png"))
-                    except Exception:
-                        pass
+                    print(f"[ERR] {rut} {tipo_up} {anho}-{ms}: {e}")
+                    _marcar(bitacora, rut, tipo_up, anho, mes, False, str(e))
+                    _dump_debug(driver, carpeta_base, f"{rut}_{tipo_up}_{anho}-{ms}")
                     # Reposiciona en el módulo y sigue
                     try:
                         goto_rcv(driver, wait, rut, clave)
@@ -480,11 +686,113 @@ def extract_for_tipo(
                         pass
                     continue
     finally:
-        try:
-            driver.quit()
-        except Exception:
-            pass
-        try:
-            shutil.rmtree(tmp_profile, ignore_errors=True)
-        except Exception:
-            pass
+        _cerrar_driver(driver, tmp_profile)
+
+# =========================
+# Core por RUT (una sesión, ambas pestañas)
+# =========================
+def extract_for_rut(
+    *,
+    rut: str,
+    clave: str,
+    anho_ini: int,
+    mes_ini: int,
+    anho_fin: int,
+    mes_fin: int,
+    tipos_up: Sequence[str],  # subconjunto de ("COMPRA", "VENTA")
+    carpeta_base: Path,
+    headless: bool,
+    chrome_binary: Optional[str],
+    chromedriver_path: Optional[str],
+    max_memoria_mb: Optional[int] = None,
+    politica: Optional[PoliticaIncremental] = None,
+    modo_http: bool = False,
+    http_workers: int = 4,
+    bitacora=None,
+    pestanas: int = 1,
+) -> None:
+    """Un solo Chrome y un solo login para todos los tipos del RUT.
+
+    Por cada período se hace un único "Consultar"; luego se recorre cada
+    pestaña (COMPRA primero, que es la activa tras consultar) redirigiendo
+    las descargas a su carpeta RCV_* vía DevTools. Con modo_http se intenta
+    primero el camino HTTP directo (ver extract_for_tipo); `bitacora` y
+    `pestanas` igual que en extract_for_tipo.
+    """
+    tipos = sorted({t.strip().upper() for t in tipos_up}, key=("COMPRA", "VENTA").index)
+    assert tipos and set(tipos) <= {"COMPRA", "VENTA"}, "tipos_up debe contener COMPRA y/o VENTA"
+
+    out_dirs = {t: carpeta_base / f"SII_{rut}" / f"RCV_{t.capitalize()}" for t in tipos}
+    politica = politica or PoliticaIncremental()
+    por_periodo: dict = {}
+    for t in tipos:
+        pendientes = _pendientes(out_dirs[t], anho_ini, mes_ini, anho_fin, mes_fin, politica)
+        for periodo in _asignados(bitacora, rut, t, pendientes):
+            por_periodo.setdefault(periodo, []).append(t)
+    if not por_periodo:
+        print(f"[RCV] {rut} {'+'.join(tipos)}: todos los períodos ya descargados; nada que hacer.")
+        return
+
+    driver, wait, tmp_profile = build_driver(
+        download_dir=out_dirs[tipos[0]],
+        headless=headless,
+        chrome_binary=chrome_binary,
+        chromedriver_path=chromedriver_path,
+        max_memoria_mb=max_memoria_mb,
+    )
+
+    try:
+        caps = driver.capabilities
+        print(f"[RCV] {rut} {'+'.join(tipos)} | Headless={headless} | Chrome={caps.get('browserVersion') or caps.get('version')} → {carpeta_base / f'SII_{rut}'}")
+        goto_rcv(driver, wait, rut, clave)
+        _cerrar_alertas(driver, wait)
+
+        if modo_http:
+            for t in tipos:
+                propios = sorted(p for p, ts in por_periodo.items() if t in ts)
+                fallidos = set(_fase_http(driver, rut=rut, tipo_up=t, periodos=propios, out_dir=out_dirs[t], workers=http_workers))
+                for p in propios:
+                    if p not in fallidos:
+                        por_periodo[p].remove(t)
+                        _marcar(bitacora, rut, t, *p, True)
+            por_periodo = {p: ts for p, ts in por_periodo.items() if ts}
+
+        if pestanas > 1 and len(por_periodo) > 1:
+            from .multipestana import extraer_en_pestanas
+            extraer_en_pestanas(driver, wait, rut=rut, clave=clave, trabajo=por_periodo, out_dirs=out_dirs,
+                                carpeta_base=carpeta_base, pestanas=pestanas, bitacora=bitacora)
+            return
+
+        for (anho, mes), tipos_periodo in sorted(por_periodo.items()):
+            ms = f"{mes:02d}"
+            with _comandos_periodo(driver, rut=rut, tipo="+".join(tipos_periodo), periodo=f"{anho}-{ms}"):
+                consultado = False
+                for tipo_up in tipos_periodo:
+                    try:
+                        if not consultado:
+                            if _esta_en_login(driver):
+                                _asegurar_sesion(driver, wait, rut, clave)
+                                goto_rcv(driver, wait, rut, clave)
+                            # (1) Período + Consultar (una vez para todas las pestañas)
+                            with medir("consulta_periodo", rut=rut, tipo="+".join(tipos_periodo), periodo=f"{anho}-{ms}"):
+                                select_period_and_consult(driver, wait, anho=anho, mes=mes)
+                                _cerrar_alertas(driver, wait)
+                            consultado = True
+
+                        _set_download_dir(driver, out_dirs[tipo_up])
+                        ok = _descargar_tipo(driver, wait, rut=rut, tipo_up=tipo_up, anho=anho, mes=mes, out_dir=out_dirs[tipo_up])
+                        _marcar(bitacora, rut, tipo_up, anho, mes, ok, None if ok else "sin archivos completos")
+
+                    except Exception as e:
+                        print(f"[ERR] {rut} {tipo_up} {anho}-{ms}: {e}")
+                        _marcar(bitacora, rut, tipo_up, anho, mes, False, str(e))
+                        _dump_debug(driver, carpeta_base, f"{rut}_{tipo_up}_{anho}-{ms}")
+                        # Reposiciona en el módulo; el siguiente tipo vuelve a consultar
+                        consultado = False
+                        try:
+                            goto_rcv(driver, wait, rut, clave)
+                        except Exception:
+                            pass
+                        continue
+    finally:
+        _cerrar_driver(driver, tmp_profile)
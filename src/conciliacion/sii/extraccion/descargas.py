@@ -0,0 +1,146 @@
+# src/conciliacion/sii/extraccion/descargas.py
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import os
+import select
+import sys
+import time
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+# Sufijos de descargas en curso (Chrome / Firefox / genéricos)
+PARCIALES = (".crdownload", ".part", ".tmp", ".download")
+
+@dataclass
+class ArchivoDescargado:
+    nombre: str
+    clase: str        # "resumen" | "detalle"
+    bytes: int
+    segundos: float   # desde el click hasta que el archivo quedó completo
+
+    def to_dict(self) -> dict:
+        d = asdict(self)
+        d["segundos"] = round(self.segundos, 3)
+        return d
+
+def clasificar(nombre: str) -> str:
+    """SII nombra RCV_RESUMEN_<TIPO>_... al resumen; el resto es detalle."""
+    return "resumen" if "RESUMEN" in nombre.upper() else "detalle"
+
+def _es_parcial(nombre: str) -> bool:
+    return nombre.startswith(".") or nombre.lower().endswith(PARCIALES)
+
+# =========================
+# inotify (Linux) vía ctypes
+# =========================
+class _Inotify:
+    """Despertador por eventos de directorio; solo avisa, el estado se relee del disco."""
+    IN_CLOSE_WRITE = 0x008
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+
+    def __init__(self, carpeta: Path):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        mask = self.IN_CLOSE_WRITE | self.IN_MOVED_TO | self.IN_CREATE
+        if libc.inotify_add_watch(fd, os.fsencode(str(carpeta)), mask) < 0:
+            os.close(fd)
+            raise OSError(ctypes.get_errno(), "inotify_add_watch")
+        self.fd = fd
+
+    def esperar(self, timeout: float) -> None:
+        r, _, _ = select.select([self.fd], [], [], max(0.0, timeout))
+        if r:
+            try:
+                while os.read(self.fd, 4096):
+                    pass
+            except BlockingIOError:
+                pass
+
+    def cerrar(self) -> None:
+        try:
+            os.close(self.fd)
+        except OSError:
+            pass
+
+# =========================
+# Seguidor de descargas
+# =========================
+class SeguidorDescargas:
+    """Detecta descargas completas en una carpeta sin sondear a intervalos fijos.
+
+    Uso: crear (toma snapshot de lo existente), marcar() justo antes de cada
+    click y esperar(["resumen"]) para bloquear solo hasta que ese archivo esté
+    completo. En Linux despierta por inotify; en otros sistemas (o si inotify
+    falla) sondea cada `intervalo` segundos.
+    """
+
+    def __init__(self, carpeta: Path, *, intervalo: float = 0.1):
+        self.carpeta = Path(carpeta)
+        self.carpeta.mkdir(parents=True, exist_ok=True)
+        self.intervalo = intervalo
+        self._previos = {p.name for p in self.carpeta.iterdir()}
+        self._vistos: Dict[str, ArchivoDescargado] = {}
+        self._t0 = time.monotonic()
+        self._inotify: Optional[_Inotify] = None
+        if sys.platform.startswith("linux"):
+            try:
+                self._inotify = _Inotify(self.carpeta)
+            except Exception:
+                self._inotify = None
+
+    def __enter__(self) -> SeguidorDescargas:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.cerrar()
+
+    def cerrar(self) -> None:
+        if self._inotify:
+            self._inotify.cerrar()
+            self._inotify = None
+
+    def marcar(self) -> None:
+        """Reinicia el cronómetro (llamar justo antes del click de descarga)."""
+        self._t0 = time.monotonic()
+
+    def _escanear(self) -> None:
+        """Incorpora los archivos nuevos ya completos (ignora .crdownload y similares)."""
+        for p in self.carpeta.iterdir():
+            n = p.name
+            if n in self._previos or n in self._vistos or _es_parcial(n):
+                continue
+            try:
+                size = p.stat().st_size
+            except OSError:
+                continue
+            self._vistos[n] = ArchivoDescargado(n, clasificar(n), size, time.monotonic() - self._t0)
+
+    def completos(self) -> List[ArchivoDescargado]:
+        self._escanear()
+        return sorted(self._vistos.values(), key=lambda a: a.nombre)
+
+    def esperar(self, clases: Iterable[str], timeout: float = 10.0) -> List[ArchivoDescargado]:
+        """Bloquea hasta que haya un archivo completo de cada clase pedida o venza timeout.
+
+        Devuelve los archivos completos de esas clases (puede ser parcial si venció).
+        """
+        pendientes = set(clases)
+        limite = time.monotonic() + timeout
+        while True:
+            self._escanear()
+            listos = {a.clase for a in self._vistos.values()}
+            restante = limite - time.monotonic()
+            if pendientes <= listos or restante <= 0:
+                break
+            if self._inotify:
+                # tope por si algún FS (p.ej. /mnt/c en WSL) no emite eventos
+                self._inotify.esperar(min(restante, 0.5))
+            else:
+                time.sleep(min(restante, self.intervalo))
+        return [a for a in self.completos() if a.clase in pendientes]
@@ -0,0 +1,234 @@
+# src/conciliacion/sii/extraccion/esperas.py
+from __future__ import annotations
+
+import atexit
+import json
+import math
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlparse
+
+from selenium.common.exceptions import JavascriptException, TimeoutException
+from selenium.webdriver.common.by import By
+
+# Esperas adaptativas para la UI del SII:
+#  - carrera(): todos los localizadores candidatos compiten en UNA llamada
+#    execute_async_script; del lado JS un MutationObserver (más un sondeo
+#    corto para cambios solo de CSS) resuelve apenas aparece cualquiera. Un
+#    localizador ausente ya no cuesta su propio timeout de 6-14 s;
+#  - Memoria: por sitio y paso guarda la latencia típica (EWMA de media y
+#    varianza) y qué localizador ganó; el timeout sale de lo aprendido y el
+#    ganador se prueba primero la próxima vez. Se persiste como JSON.
+
+ALFA = 0.2            # peso de la última observación en la EWMA
+MIN_MUESTRAS = 3      # antes de esto se usa el timeout por defecto del paso
+PISO_S = 2.0
+SCRIPT_TIMEOUT_S = 120.0  # set_script_timeout del driver; las carreras quedan por debajo
+
+_JS_CARRERA = """
+var cands = arguments[0], cond = arguments[1], limite = arguments[2] * 1000;
+var listo = arguments[arguments.length - 1], terminado = false, obs, t, iv;
+function buscar(c) {
+  if (c[0] === 'css') return document.querySelector(c[1]);
+  return document.evaluate(c[1], document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+}
+function visible(el) { return !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length); }
+function cumple(el) {
+  if (!el) return false;
+  if (cond === 'presente') return true;
+  if (cond === 'visible') return visible(el);
+  return visible(el) && !el.disabled;
+}
+function probar() {
+  if (cond === 'ausente') {
+    for (var i = 0; i < cands.length; i++) { var e = buscar(cands[i]); if (e && visible(e)) return null; }
+    return [-1, null];
+  }
+  for (var j = 0; j < cands.length; j++) { var el = buscar(cands[j]); if (cumple(el)) return [j, el]; }
+  return null;
+}
+function fin(r) {
+  if (terminado) return; terminado = true;
+  if (obs) obs.disconnect(); clearTimeout(t); clearInterval(iv); listo(r);
+}
+var r = probar();
+if (r) { fin(r); return; }
+obs = new MutationObserver(function () { var r = probar(); if (r) fin(r); });
+obs.observe(document, {childList: true, subtree: true, attributes: true});
+iv = setInterval(function () { var r = probar(); if (r) fin(r); }, 100);
+t = setTimeout(function () { fin(null); }, limite);
+"""
+
+def _a_js(loc: Tuple[str, str]) -> List[str]:
+    by, sel = loc
+    if by == By.XPATH:
+        return ["xpath", sel]
+    if by == By.ID:
+        return ["css", f'[id="{sel}"]']
+    if by == By.NAME:
+        return ["css", f'[name="{sel}"]']
+    if by == By.CSS_SELECTOR:
+        return ["css", sel]
+    raise ValueError(f"Localizador no soportado en carrera: {by}")
+
+def _id(loc: Tuple[str, str]) -> str:
+    return f"{loc[0]}={loc[1]}"
+
+# =========================
+# Memoria de latencias y ganadores
+# =========================
+class Memoria:
+    """EWMA de latencia por (sitio, paso) y conteo de localizadores ganadores."""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else None
+        self._lock = threading.Lock()
+        self._sucia = False
+        self.pasos: Dict[str, Dict[str, float]] = {}
+        self.ganadores: Dict[str, Dict[str, int]] = {}
+        if self.path and self.path.exists():
+            try:
+                data = json.loads(self.path.read_text(encoding="utf-8"))
+                self.pasos = data.get("pasos", {})
+                self.ganadores = data.get("ganadores", {})
+            except (OSError, ValueError):
+                pass
+
+    def observar(self, clave: str, seg: float, ganador: Optional[str] = None) -> None:
+        with self._lock:
+            st = self.pasos.setdefault(clave, {"n": 0, "media": seg, "var": 0.0})
+            if st["n"]:
+                delta = seg - st["media"]
+                st["media"] += ALFA * delta
+                st["var"] = (1 - ALFA) * (st["var"] + ALFA * delta * delta)
+            st["n"] += 1
+            if ganador:
+                g = self.ganadores.setdefault(clave, {})
+                g[ganador] = g.get(ganador, 0) + 1
+            self._sucia = True
+
+    def timeout(self, clave: str, defecto: float) -> float:
+        """media + 4σ (mínimo PISO_S y 2×media), tope 2×defecto; `defecto` sin historia."""
+        st = self.pasos.get(clave)
+        if not st or st["n"] < MIN_MUESTRAS:
+            return defecto
+        aprendido = st["media"] + 4 * math.sqrt(st["var"])
+        return round(min(2 * defecto, max(PISO_S, 2 * st["media"], aprendido)), 2)
+
+    def ordenar(self, clave: str, candidatos: Sequence[Tuple[str, str]]) -> List[Tuple[str, str]]:
+        """Los que más veces ganaron primero; empate -> orden original."""
+        g = self.ganadores.get(clave, {})
+        return sorted(candidatos, key=lambda loc: -g.get(_id(loc), 0))
+
+    def guardar(self) -> None:
+        if not self.path:
+            return
+        with self._lock:
+            if not self._sucia:
+                return
+            data = json.dumps({"pasos": self.pasos, "ganadores": self.ganadores}, indent=1, sort_keys=True)
+            self._sucia = False
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            tmp.write_text(data, encoding="utf-8")
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"[ESPERAS] No se pudo guardar {self.path}: {e}")
+
+_MEMORIA: Optional[Memoria] = None
+_lock_memoria = threading.Lock()
+
+def memoria() -> Memoria:
+    """Memoria global, en <raiz de caché>/esperas.json (BEKILLY_ESPERAS la reubica)."""
+    global _MEMORIA
+    with _lock_memoria:
+        if _MEMORIA is None:
+            from .navegador import raiz_cache
+            _MEMORIA = Memoria(Path(os.environ.get("BEKILLY_ESPERAS") or raiz_cache() / "esperas.json"))
+            atexit.register(_MEMORIA.guardar)
+        return _MEMORIA
+
+def _clave(driver, paso: str) -> str:
+    try:
+        sitio = urlparse(driver.current_url).netloc or "local"
+    except Exception:
+        sitio = "?"
+    return f"{sitio}|{paso}"
+
+# =========================
+# Esperas
+# =========================
+def carrera(
+    driver,
+    paso: str,
+    candidatos: Sequence[Tuple[str, str]],
+    *,
+    condicion: str = "presente",
+    defecto: float = 14.0,
+    mem: Optional[Memoria] = None,
+) -> Tuple[int, Any]:
+    """Espera al primero de `candidatos` que cumpla `condicion` y devuelve
+    (índice en `candidatos`, WebElement).
+
+    condicion: 'presente' | 'visible' | 'clickable' | 'ausente' (ninguno
+    visible; devuelve (-1, None)). Lanza TimeoutException si vence el plazo
+    aprendido para `paso`.
+    """
+    mem = mem or memoria()
+    clave = _clave(driver, paso)
+    orden = mem.ordenar(clave, candidatos)
+    limite = min(mem.timeout(clave, defecto), SCRIPT_TIMEOUT_S - 5)
+    cands = [_a_js(c) for c in orden]
+    t0 = time.perf_counter()
+    r = None
+    while True:
+        restante = limite - (time.perf_counter() - t0)
+        if restante <= 0:
+            break
+        try:
+            r = driver.execute_async_script(_JS_CARRERA, cands, condicion, restante)
+            break
+        except JavascriptException:
+            # la página navegó durante la espera (p.ej. tras el login): sigue en el documento nuevo
+            time.sleep(0.05)
+    seg = time.perf_counter() - t0
+    if not r:
+        mem.observar(clave, limite)  # censurado: empuja el plazo hacia arriba
+        raise TimeoutException(f"{paso}: ningún candidato '{condicion}' en {limite:.1f}s")
+    i, el = r
+    if i < 0:
+        mem.observar(clave, seg)
+        return -1, None
+    mem.observar(clave, seg, _id(orden[i]))
+    return list(candidatos).index(orden[i]), el
+
+def hasta(
+    driver,
+    paso: str,
+    fn: Callable[[], Any],
+    *,
+    defecto: float = 6.0,
+    mem: Optional[Memoria] = None,
+) -> Any:
+    """Sondea fn() (del lado Python) con intervalos crecientes hasta que sea
+    verdadera; el plazo sale de la memoria. Devuelve el último valor (falsy si venció)."""
+    mem = mem or memoria()
+    clave = _clave(driver, paso)
+    limite = mem.timeout(clave, defecto)
+    t0 = time.perf_counter()
+    pausa = 0.02
+    while True:
+        valor = fn()
+        seg = time.perf_counter() - t0
+        if valor:
+            mem.observar(clave, seg)
+            return valor
+        if seg >= limite:
+            mem.observar(clave, limite)
+            return valor
+        time.sleep(min(pausa, limite - seg))
+        pausa = min(pausa * 2, 0.25)
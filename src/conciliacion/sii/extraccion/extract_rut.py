@@ -0,0 +1,28 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Optional, Sequence
+from .manifest import PoliticaIncremental
+from .common_rcv import extract_for_rut
+
+def run_rut(*, rut: str, clave: str,
+            anho_ini: int, mes_ini: int, anho_fin: int, mes_fin: int,
+            tipos: Sequence[str],
+            carpeta_base: Path, headless: bool,
+            chrome_binary: Optional[str], chromedriver_path: Optional[str],
+            max_memoria_mb: Optional[int] = None,
+            politica: Optional[PoliticaIncremental] = None,
+            modo_http: bool = False,
+            bitacora=None,
+            pestanas: int = 1) -> None:
+    extract_for_rut(
+        rut=rut, clave=clave,
+        anho_ini=anho_ini, mes_ini=mes_ini, anho_fin=anho_fin, mes_fin=mes_fin,
+        tipos_up=tipos,
+        carpeta_base=carpeta_base, headless=headless,
+        chrome_binary=chrome_binary, chromedriver_path=chromedriver_path,
+        max_memoria_mb=max_memoria_mb,
+        politica=politica,
+        modo_http=modo_http,
+        bitacora=bitacora,
+        pestanas=pestanas,
+    )
@@ -0,0 +1,182 @@
+# src/conciliacion/sii/extraccion/http_rcv.py
+from __future__ import annotations
+
+import csv
+import io
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:  # dependencia opcional: solo para el modo HTTP
+    import requests
+    from requests.adapters import HTTPAdapter
+except ImportError:  # pragma: no cover - depende del entorno
+    requests = None
+    HTTPAdapter = None
+
+from .descargas import ArchivoDescargado
+
+# Servicios JSON que usa la app Angular de RCV para exportar
+SERVICIO = "services/data/facadeService/"
+NAMESPACE = "cl.sii.sdi.lob.diii.consdcv.data.api.interfaces.FacadeService/"
+METODOS = {
+    ("COMPRA", "resumen"): "getResumenExport",
+    ("VENTA", "resumen"): "getResumenExport",
+    ("COMPRA", "detalle"): "getDetalleCompraExport",
+    ("VENTA", "detalle"): "getDetalleVentaExport",
+}
+
+class ErrorHTTP(RuntimeError):
+    pass
+
+def _requiere_requests() -> None:
+    if requests is None:
+        raise RuntimeError("El modo HTTP requiere 'requests' (pip install requests).")
+
+def _split_rut(rut: str) -> Tuple[str, str]:
+    limpio = rut.replace(".", "").strip()
+    cuerpo, _, dv = limpio.partition("-")
+    if not dv:
+        cuerpo, dv = limpio[:-1], limpio[-1:]
+    return cuerpo, dv.upper()
+
+def nombre_archivo(rut: str, tipo_up: str, clase: str, anho: int, mes: int) -> str:
+    """Mismos nombres que genera la descarga desde la UI."""
+    periodo = f"{int(anho)}{int(mes):02d}"
+    if clase == "resumen":
+        return f"RCV_RESUMEN_{tipo_up}_{rut}_{periodo}.csv"
+    return f"RCV_{tipo_up}_REGISTRO_{rut}_{periodo}.csv"
+
+# =========================
+# Sesión HTTP
+# =========================
+def sesion_desde_driver(driver, *, pool: int = 8) -> requests.Session:
+    """Crea una sesión requests (con pool de conexiones) con las cookies del navegador logueado."""
+    _requiere_requests()
+    s = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool, pool_maxsize=pool, max_retries=0)
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
+    for c in driver.get_cookies():
+        s.cookies.set(c["name"], c["value"], domain=c.get("domain"), path=c.get("path") or "/")
+    try:
+        ua = driver.execute_script("return navigator.userAgent")
+        if ua:
+            s.headers["User-Agent"] = ua
+    except Exception:
+        pass
+    s.headers.update({"Accept": "application/json, text/plain, */*", "Content-Type": "application/json"})
+    return s
+
+def _payload(metodo: str, token: Optional[str], rut: str, tipo_up: str, anho: int, mes: int) -> Dict[str, Any]:
+    cuerpo, dv = _split_rut(rut)
+    return {
+        "metaData": {
+            "namespace": NAMESPACE + metodo,
+            "conversationId": token,
+            "transactionId": str(uuid.uuid4()),
+            "page": None,
+        },
+        "data": {
+            "rutEmisor": cuerpo,
+            "dvEmisor": dv,
+            "ptributario": f"{int(anho)}{int(mes):02d}",
+            "codTipoDoc": 0,
+            "operacion": tipo_up,
+            "estadoContab": "REGISTRO",
+        },
+    }
+
+def _a_csv(resp) -> Optional[bytes]:
+    """Bytes del CSV (';') para la respuesta del servicio; None si el período no trae filas.
+
+    Un CSV se guarda tal cual (consolidación detecta su encoding); solo la
+    respuesta JSON se serializa, en UTF-8.
+    """
+    ctype = resp.headers.get("Content-Type", "")
+    if "json" not in ctype:
+        return resp.content
+    body = resp.json()
+    estado = body.get("respEstado") or {}
+    if estado.get("codRespuesta") not in (None, 0):
+        raise ErrorHTTP(f"SII respondió {estado.get('codRespuesta')}: {estado.get('msgeRespuesta')}")
+    data = body.get("data")
+    if data is None:
+        raise ErrorHTTP("respuesta sin 'data'")
+    if not data:
+        return None  # sin encabezado que escribir: consolidación lo contaría como error
+    if all(isinstance(x, str) for x in data):
+        return ("\n".join(x.rstrip("\r\n") for x in data) + "\n").encode("utf-8")
+    # lista de objetos -> CSV con las llaves del primero como encabezado
+    buf = io.StringIO()
+    w = csv.DictWriter(buf, fieldnames=list(data[0].keys()), delimiter=";", extrasaction="ignore")
+    w.writeheader()
+    w.writerows(data)
+    return buf.getvalue().encode("utf-8")
+
+def _descargar_uno(
+    sesion, *, base_url: str, rut: str, tipo_up: str, clase: str, anho: int, mes: int,
+    out_dir: Path, timeout: float,
+) -> Optional[ArchivoDescargado]:
+    metodo = METODOS[(tipo_up, clase)]
+    t0 = time.monotonic()
+    resp = sesion.post(
+        base_url + SERVICIO + metodo,
+        json=_payload(metodo, sesion.cookies.get("TOKEN"), rut, tipo_up, anho, mes),
+        timeout=timeout,
+    )
+    if resp.status_code != 200:
+        raise ErrorHTTP(f"{metodo} HTTP {resp.status_code}")
+    contenido = _a_csv(resp)
+    if contenido is None:
+        return None
+    nombre = nombre_archivo(rut, tipo_up, clase, anho, mes)
+    # escritura atómica: el seguidor/consolidación nunca ven un archivo a medias
+    destino = out_dir / nombre
+    tmp = out_dir / (nombre + ".part")
+    tmp.write_bytes(contenido)
+    os.replace(tmp, destino)
+    return ArchivoDescargado(nombre, clase, destino.stat().st_size, time.monotonic() - t0)
+
+def descargar_periodos_http(
+    sesion,
+    *,
+    base_url: str,
+    rut: str,
+    tipo_up: str,
+    periodos: Sequence[Tuple[int, int]],
+    out_dir: Path,
+    workers: int = 4,
+    timeout: float = 60.0,
+) -> Tuple[Dict[Tuple[int, int], List[ArchivoDescargado]], Dict[Tuple[int, int], str]]:
+    """Descarga resumen y detalle de todos los períodos en paralelo.
+
+    Devuelve (ok, fallidos): archivos por período (vacío si el SII no tiene
+    filas para él) y mensaje de error por período fallido, para que el
+    llamador reintente esos por la UI.
+    """
+    _requiere_requests()
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    def _periodo(p: Tuple[int, int]) -> List[ArchivoDescargado]:
+        anho, mes = p
+        archivos = (
+            _descargar_uno(sesion, base_url=base_url, rut=rut, tipo_up=tipo_up, clase=clase,
+                           anho=anho, mes=mes, out_dir=out_dir, timeout=timeout)
+            for clase in ("resumen", "detalle")
+        )
+        return [a for a in archivos if a is not None]
+
+    ok: Dict[Tuple[int, int], List[ArchivoDescargado]] = {}
+    fallidos: Dict[Tuple[int, int], str] = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="rcv-http") as pool:
+        futuros = {p: pool.submit(_periodo, p) for p in periodos}
+        for p, fut in futuros.items():
+            try:
+                ok[p] = fut.result()
+            except Exception as e:
+                fallidos[p] = str(e)
+    return ok, fallidos
@@ -0,0 +1,145 @@
+# src/conciliacion/sii/extraccion/manifest.py
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from .descargas import ArchivoDescargado
+
+# Un manifiesto por carpeta RCV_* (así VENTA y COMPRA del mismo RUT no compiten
+# por el mismo archivo cuando corren en workers distintos). El punto inicial lo
+# deja fuera del glob de consolidación y del seguidor de descargas.
+NOMBRE = ".manifest_rcv.json"
+
+def clave_periodo(anho: int, mes: int) -> str:
+    return f"{int(anho)}-{int(mes):02d}"
+
+def parse_periodo(valor: str) -> Tuple[int, int]:
+    """'2024-03' | '202403' | '2024/03' -> (2024, 3)."""
+    limpio = str(valor).strip().replace("/", "-")
+    if "-" in limpio:
+        a, m = limpio.split("-", 1)
+    else:
+        a, m = limpio[:4], limpio[4:]
+    anho, mes = int(a), int(m)
+    if not 1 <= mes <= 12:
+        raise ValueError(f"Período inválido: {valor!r}")
+    return anho, mes
+
+def cargar(out_dir: Path) -> Dict[str, Any]:
+    p = Path(out_dir) / NOMBRE
+    if not p.exists():
+        return {"periodos": {}}
+    try:
+        data = json.loads(p.read_text(encoding="utf-8"))
+    except Exception:
+        return {"periodos": {}}
+    data.setdefault("periodos", {})
+    return data
+
+def guardar(out_dir: Path, data: Dict[str, Any]) -> None:
+    p = Path(out_dir) / NOMBRE
+    tmp = p.with_name(p.name + ".tmp")
+    tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp, p)
+
+def _huella(path: Path) -> Tuple[str, int]:
+    """sha256 y cantidad de filas de datos (líneas menos encabezado) en una pasada."""
+    h = hashlib.sha256()
+    lineas = 0
+    ultimo = b"\n"
+    with open(path, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloque)
+            lineas += bloque.count(b"\n")
+            ultimo = bloque[-1:]
+    if ultimo != b"\n":
+        lineas += 1  # última línea sin salto
+    return h.hexdigest(), max(0, lineas - 1)
+
+def registrar_periodo(
+    out_dir: Path,
+    *,
+    rut: str,
+    tipo_up: str,
+    anho: int,
+    mes: int,
+    archivos: Iterable[ArchivoDescargado],
+) -> Dict[str, Any]:
+    """Agrega/actualiza la entrada del período y la persiste. Devuelve la entrada.
+
+    Los archivos que la entrada anterior listaba y la nueva no se borran: si
+    no, la consolidación (glob *.csv) contaría el período dos veces.
+    """
+    data = cargar(out_dir)
+    data.update({"rut": rut, "tipo": tipo_up})
+    registros = []
+    for a in archivos:
+        reg = a.to_dict()
+        try:
+            reg["sha256"], reg["filas"] = _huella(Path(out_dir) / a.nombre)
+        except OSError:
+            reg["sha256"], reg["filas"] = None, None
+        registros.append(reg)
+    entrada = {
+        "descargado": datetime.now().isoformat(timespec="seconds"),
+        "archivos": registros,
+    }
+    clave = clave_periodo(anho, mes)
+    nuevos = {r["nombre"] for r in registros}
+    for reg in (data["periodos"].get(clave) or {}).get("archivos", []):
+        if reg.get("nombre") and reg["nombre"] not in nuevos:
+            (Path(out_dir) / Path(reg["nombre"]).name).unlink(missing_ok=True)
+    data["periodos"][clave] = entrada
+    guardar(out_dir, data)
+    return entrada
+
+def periodo_intacto(out_dir: Path, entrada: Optional[Dict[str, Any]]) -> bool:
+    """True si todos los archivos del período siguen en disco con igual tamaño y hash."""
+    if not entrada or not entrada.get("archivos"):
+        return False
+    for reg in entrada["archivos"]:
+        p = Path(out_dir) / reg["nombre"]
+        try:
+            if p.stat().st_size != reg.get("bytes"):
+                return False
+            if reg.get("sha256") and _huella(p)[0] != reg["sha256"]:
+                return False
+        except OSError:
+            return False
+    return True
+
+# =========================
+# Política incremental
+# =========================
+@dataclass(frozen=True)
+class PoliticaIncremental:
+    """Decide qué períodos volver a descargar.
+
+    Los últimos `meses_abiertos` meses (contando el actual) siempre se
+    refrescan porque el SII aún puede modificarlos; los anteriores se omiten
+    si el manifiesto los tiene y sus archivos siguen intactos.
+    `forzar` descarga todo; `refrescar_desde` fuerza desde ese período en adelante.
+    """
+    forzar: bool = False
+    refrescar_desde: Optional[Tuple[int, int]] = None
+    meses_abiertos: int = 2
+    hoy: Optional[date] = None
+
+    def periodo_abierto(self, anho: int, mes: int) -> bool:
+        hoy = self.hoy or date.today()
+        atras = (hoy.year * 12 + hoy.month - 1) - (int(anho) * 12 + int(mes) - 1)
+        return atras < max(0, int(self.meses_abiertos))
+
+    def debe_descargar(self, out_dir: Path, anho: int, mes: int, data: Optional[Dict[str, Any]] = None) -> bool:
+        if self.forzar or self.periodo_abierto(anho, mes):
+            return True
+        if self.refrescar_desde and (int(anho), int(mes)) >= tuple(self.refrescar_desde):
+            return True
+        data = data if data is not None else cargar(out_dir)
+        return not periodo_intacto(out_dir, data["periodos"].get(clave_periodo(anho, mes)))
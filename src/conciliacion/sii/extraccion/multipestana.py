@@ -0,0 +1,396 @@
+# src/conciliacion/sii/extraccion/multipestana.py
+from __future__ import annotations
+
+import os
+import re
+import shutil
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Deque, Dict, List, Optional, Tuple
+
+from selenium.webdriver.support.ui import WebDriverWait
+
+from ...instrumentacion import registrar
+from . import esperas, navegador, recursos
+from .common_rcv import (
+    _JS_ES_LOGIN,
+    SII_URL,
+    _cerrar_alertas,
+    _dump_debug,
+    _enviar_consulta,
+    _marcar,
+    _panel_visible,
+    _set_download_dir,
+    activate_tab,
+    goto_rcv,
+)
+from .descargas import ArchivoDescargado, SeguidorDescargas
+from .http_rcv import nombre_archivo
+from .manifest import registrar_periodo
+
+# Varios períodos a la vez dentro de UNA sesión: K pestañas del mismo Chrome
+# comparten las cookies del login (sin logins extra). Selenium habla con una
+# pestaña por vez, así que un bucle round-robin avanza una máquina de estados
+# por pestaña sin bloquearse en ninguna (consulta en la 1 mientras la 2 descarga):
+#   cargando -> libre -> consultando -> pestaña -> descargando -> (otro tipo | libre)
+# Cada pestaña descarga a su carpeta de staging (<SII_rut>/.pestana_<k>, fuera
+# del glob de consolidación) vía Page.setDownloadBehavior. Chrome aplica ese
+# ajuste al contexto del navegador y no siempre a la pestaña, por eso una sola
+# pestaña a la vez tiene el turno de descarga: desde que fija su carpeta hasta
+# que sus archivos aparecen en ella. Los archivos completos se mueven al RCV_*
+# del tipo con el nombre canónico del período (http_rcv.nombre_archivo).
+
+CARGANDO = "cargando"
+LIBRE = "libre"
+CONSULTANDO = "consultando"
+PESTANA = "pestaña"
+DESCARGANDO = "descargando"
+CERRADA = "cerrada"
+
+# Plazo por estado sin historia; con historia sale de esperas.memoria()
+PLAZO_S = {CARGANDO: 30.0, CONSULTANDO: 30.0, PESTANA: 8.0, DESCARGANDO: 20.0}
+REINTENTOS = 1  # un período que falla vuelve una vez a la cola
+_PERIODO_EN_NOMBRE = re.compile(r"_(\d{6})\.")
+
+# Estado de la pestaña en una sola llamada. "xhr": terminó alguna petición
+# desde el click en Consultar (performance se limpia antes del click), así las
+# pestañas del período anterior no se confunden con el resultado nuevo.
+_JS_ESTADO = """
+function visible(el) { return !!(el && (el.offsetWidth || el.offsetHeight || el.getClientRects().length)); }
+var xhr = performance.getEntriesByType('resource').some(function (e) {
+  return e.initiatorType === 'xmlhttprequest' || e.initiatorType === 'fetch';
+});
+return {
+  login: """ + _JS_ES_LOGIN + """,
+  formulario: !!document.getElementById('periodoMes'),
+  pestanas: visible(document.querySelector("[role='tablist'], .nav-tabs")),
+  cargando: visible(document.querySelector('.loading, .spinner, .block-ui-message-container')),
+  xhr: xhr
+};
+"""
+
+_JS_ACTIVAR = """
+var base = arguments[0];
+var a = document.querySelector("a[ui-sref='"+base+"']") || document.querySelector("a[href='#"+base+"/']");
+if (a) { a.click(); return true; }
+return false;
+"""
+
+_JS_DESCARGAR = """
+var hechos = [];
+var pares = [['resumen', 'Descargar Resumenes'], ['detalle', 'Descargar Detalles']];
+var bs = document.querySelectorAll('button');
+for (var i = 0; i < pares.length; i++) {
+  for (var j = 0; j < bs.length; j++) {
+    var b = bs[j];
+    if (b.disabled || (b.textContent || '').indexOf(pares[i][1]) < 0) continue;
+    if (!(b.offsetWidth || b.offsetHeight || b.getClientRects().length)) continue;
+    b.click(); hechos.push(pares[i][0]); break;
+  }
+}
+return hechos;
+"""
+
+@dataclass
+class _Pestana:
+    k: int
+    handle: str
+    staging: Path
+    estado: str = CARGANDO
+    desde: float = field(default_factory=time.monotonic)
+    limite: float = PLAZO_S[CARGANDO]
+    periodo: Optional[Tuple[int, int]] = None
+    tipos: List[str] = field(default_factory=list)  # pendientes del período actual
+    etiqueta: str = ""
+    t_periodo: float = 0.0
+    comandos: int = 0
+    seguidor: Optional[SeguidorDescargas] = None
+    clases: List[str] = field(default_factory=list)  # botones clickeados en la descarga en curso
+    previos: set = field(default_factory=set)  # contenido del staging antes del click
+
+def _dirigir_descargas(driver, carpeta: Path) -> None:
+    carpeta.mkdir(parents=True, exist_ok=True)
+    try:
+        navegador.cdp(driver, "Page.setDownloadBehavior", {"behavior": "allow", "downloadPath": str(carpeta)})
+    except Exception:
+        _set_download_dir(driver, carpeta)
+
+def _contador(driver) -> int:
+    return getattr(driver, "comandos_webdriver", 0)
+
+class Ronda:
+    """Reparte `trabajo` ({(anho, mes): [tipos]}) entre `pestanas` pestañas del driver."""
+
+    def __init__(
+        self,
+        driver,
+        wait: WebDriverWait,
+        *,
+        rut: str,
+        clave: str,
+        trabajo: Dict[Tuple[int, int], List[str]],
+        out_dirs: Dict[str, Path],
+        carpeta_base: Path,
+        pestanas: int,
+        bitacora=None,
+    ):
+        self.driver, self.wait = driver, wait
+        self.rut, self.clave = rut, clave
+        self.out_dirs = out_dirs
+        self.carpeta_base = carpeta_base
+        self.bitacora = bitacora
+        self.cola: Deque[Tuple[Tuple[int, int], List[str]]] = deque(sorted((p, list(ts)) for p, ts in trabajo.items()))
+        self.n = max(1, min(int(pestanas), len(self.cola)))
+        self.intentos: Counter = Counter()
+        self.turno: Optional[_Pestana] = None  # quién tiene la carpeta de descarga
+        self.tabs: List[_Pestana] = []
+        self.mem = esperas.memoria()
+        self._n0 = 0  # contador de comandos al empezar el paso en curso
+
+    # ---------- ciclo ----------
+    def correr(self) -> None:
+        d = self.driver
+        principal = d.current_window_handle
+        raiz = self.carpeta_base / f"SII_{self.rut}"
+        self.tabs.append(_Pestana(0, principal, raiz / ".pestana_0"))
+        bloqueo = getattr(d, "recursos_bloqueados", None)
+        for k in range(1, self.n):
+            d.switch_to.new_window("tab")
+            if bloqueo:
+                recursos.bloquear(d, bloqueo)
+            d.execute_script("location.href = arguments[0];", SII_URL)  # carga sin bloquear el bucle
+            self.tabs.append(_Pestana(k, d.current_window_handle, raiz / f".pestana_{k}"))
+        print(f"[PESTAÑAS] {self.rut}: {len(self.cola)} períodos en {self.n} pestañas")
+        try:
+            while True:
+                vivas = [p for p in self.tabs if p.estado != CERRADA]
+                if not vivas or (not self.cola and all(p.estado in (LIBRE, CARGANDO) for p in vivas)):
+                    break
+                avanzo = False
+                for p in vivas:
+                    if p.estado in (LIBRE, CARGANDO) and not self.cola:
+                        continue
+                    d.switch_to.window(p.handle)
+                    self._n0 = _contador(d)
+                    try:
+                        avanzo |= self._paso(p)
+                    except Exception as e:
+                        self._fallar(p, e)
+                        avanzo = True
+                    p.comandos += _contador(d) - self._n0
+                if not avanzo:
+                    time.sleep(0.05)
+            for (anho, mes), tipos in self.cola:  # quedaron sin pestaña viva
+                for t in tipos:
+                    _marcar(self.bitacora, self.rut, t, anho, mes, False, "sin pestañas disponibles")
+        finally:
+            self._cerrar(principal)
+
+    def _cerrar(self, principal: str) -> None:
+        d = self.driver
+        for p in self.tabs:
+            if p.seguidor:
+                p.seguidor.cerrar()
+            if p.handle != principal:
+                try:
+                    d.switch_to.window(p.handle)
+                    d.close()
+                except Exception:
+                    pass
+            shutil.rmtree(p.staging, ignore_errors=True)
+        try:
+            d.switch_to.window(principal)
+        except Exception:
+            pass
+
+    def _entrar(self, p: _Pestana, estado: str) -> None:
+        p.estado, p.desde = estado, time.monotonic()
+        if estado in PLAZO_S:
+            p.limite = self.mem.timeout(esperas._clave(self.driver, f"pestanas_{estado}"), PLAZO_S[estado])
+
+    def _salir(self, p: _Pestana) -> float:
+        """Segundos en el estado actual (también alimentan la memoria de plazos)."""
+        seg = time.monotonic() - p.desde
+        self.mem.observar(esperas._clave(self.driver, f"pestanas_{p.estado}"), seg)
+        return seg
+
+    def _vencido(self, p: _Pestana) -> bool:
+        return time.monotonic() - p.desde > p.limite
+
+    # ---------- máquina de estados ----------
+    def _paso(self, p: _Pestana) -> bool:
+        """Avanza la pestaña activa un estado si puede; True si hubo progreso."""
+        d = self.driver
+        if p.estado == CARGANDO:
+            e = d.execute_script(_JS_ESTADO) or {}
+            if e.get("formulario"):
+                self._salir(p)
+                self._entrar(p, LIBRE)
+                return True
+            if e.get("login") or self._vencido(p):
+                goto_rcv(d, self.wait, self.rut, self.clave)  # re-login / recarga (bloqueante)
+                if not (d.execute_script(_JS_ESTADO) or {}).get("formulario"):
+                    raise RuntimeError(f"pestaña {p.k}: no cargó el formulario RCV")
+                self._entrar(p, LIBRE)
+                return True
+            return False
+
+        if p.estado == LIBRE:
+            (anho, mes), tipos = self.cola.popleft()
+            p.periodo, p.tipos = (anho, mes), tipos
+            p.etiqueta = "+".join(tipos)
+            p.t_periodo, p.comandos, self._n0 = time.monotonic(), 0, _contador(d)
+            d.execute_script("performance.clearResourceTimings();")
+            _enviar_consulta(d, anho=anho, mes=mes)
+            self._entrar(p, CONSULTANDO)
+            return True
+
+        anho, mes = p.periodo
+        etiquetas = dict(rut=self.rut, periodo=f"{anho}-{mes:02d}")
+
+        if p.estado == CONSULTANDO:
+            e = d.execute_script(_JS_ESTADO) or {}
+            if e.get("login"):
+                raise RuntimeError("sesión expirada durante la consulta")
+            if e.get("xhr") and e.get("pestanas") and not e.get("cargando"):
+                registrar("consulta_periodo", self._salir(p), tipo=p.etiqueta, pestana=p.k, **etiquetas)
+                _cerrar_alertas(d, self.wait)
+                self._activar(p)
+                return True
+            if self._vencido(p):
+                raise TimeoutError(f"consulta sin respuesta en {p.limite:.0f}s")
+            return False
+
+        tipo = p.tipos[0]
+        if p.estado == PESTANA:
+            if not _panel_visible(d, tipo):
+                if self._vencido(p):
+                    activate_tab(d, self.wait, tipo_up=tipo)  # fallbacks completos; lanza si no puede
+                    return True
+                return False
+            if self.turno is not None and self.turno is not p:
+                return False  # otra pestaña está iniciando sus descargas
+            registrar("pestaña", self._salir(p), tipo=tipo, pestana=p.k, **etiquetas)
+            self.turno = p
+            _dirigir_descargas(d, p.staging)
+            p.seguidor = SeguidorDescargas(p.staging)
+            p.previos = set(os.listdir(p.staging))
+            p.clases = list(d.execute_script(_JS_DESCARGAR) or [])
+            if not p.clases:
+                self._soltar(p)
+                raise RuntimeError("no aparecieron los botones de descarga")
+            self._entrar(p, DESCARGANDO)
+            return True
+
+        if p.estado == DESCARGANDO:
+            listos = p.seguidor.completos()
+            vencido = self._vencido(p)
+            if self.turno is p and (len(set(os.listdir(p.staging)) - p.previos) >= len(p.clases) or vencido):
+                self.turno = None  # las descargas ya eligieron carpeta
+            if {a.clase for a in listos} >= set(p.clases) or vencido:
+                self._salir(p)
+                self._terminar_tipo(p, listos)
+                return True
+            return False
+        raise RuntimeError(f"estado desconocido: {p.estado}")
+
+    def _activar(self, p: _Pestana) -> None:
+        tipo = p.tipos[0]
+        if not _panel_visible(self.driver, tipo):
+            self.driver.execute_script(_JS_ACTIVAR, tipo.lower())
+        self._entrar(p, PESTANA)
+
+    def _soltar(self, p: _Pestana) -> None:
+        if self.turno is p:
+            self.turno = None
+        if p.seguidor:
+            p.seguidor.cerrar()
+            p.seguidor = None
+
+    def _mover(self, p: _Pestana, tipo: str, archivos: List[ArchivoDescargado]) -> List[ArchivoDescargado]:
+        """Staging -> RCV_<Tipo> con el nombre canónico del período."""
+        anho, mes = p.periodo
+        destino_dir = self.out_dirs[tipo]
+        destino_dir.mkdir(parents=True, exist_ok=True)
+        movidos = []
+        for a in archivos:
+            origen = p.staging / a.nombre
+            m = _PERIODO_EN_NOMBRE.search(a.nombre)
+            if m and m.group(1) != f"{anho}{mes:02d}":
+                # descarga tardía de otro período que cayó en esta carpeta: no se atribuye
+                print(f"[WARN] pestaña {p.k}: {a.nombre} no es de {anho}-{mes:02d}; se descarta")
+                origen.unlink(missing_ok=True)
+                continue
+            nombre = nombre_archivo(self.rut, tipo, a.clase, anho, mes)
+            os.replace(origen, destino_dir / nombre)
+            movidos.append(ArchivoDescargado(nombre, a.clase, a.bytes, a.segundos))
+        return movidos
+
+    def _terminar_tipo(self, p: _Pestana, listos: List[ArchivoDescargado]) -> None:
+        anho, mes = p.periodo
+        tipo = p.tipos[0]
+        self._soltar(p)
+        archivos = self._mover(p, tipo, [a for a in listos if a.clase in p.clases])
+        if not archivos:
+            raise RuntimeError("sin archivos completos")
+        for a in archivos:
+            print(f"[DL] {tipo} {anho}-{mes:02d} | {a.clase:<7} {a.nombre} | {a.bytes:,} B en {a.segundos:.1f}s (pestaña {p.k})")
+            registrar("descarga", a.segundos, bytes=a.bytes, clase=a.clase,
+                      rut=self.rut, tipo=tipo, periodo=f"{anho}-{mes:02d}", pestana=p.k)
+        registrar_periodo(self.out_dirs[tipo], rut=self.rut, tipo_up=tipo, anho=anho, mes=mes, archivos=archivos)
+        _marcar(self.bitacora, self.rut, tipo, anho, mes, True)
+        p.tipos.pop(0)
+        if p.tipos:
+            self._activar(p)  # mismo "Consultar", siguiente pestaña COMPRA/VENTA
+        else:
+            self._cerrar_periodo(p)
+            self._entrar(p, LIBRE)
+
+    def _cerrar_periodo(self, p: _Pestana) -> None:
+        n = p.comandos + _contador(self.driver) - self._n0  # más lo que va del paso en curso
+        p.comandos, self._n0 = 0, _contador(self.driver)
+        anho, mes = p.periodo
+        registrar("comandos_webdriver", time.monotonic() - p.t_periodo, comandos=n,
+                  rut=self.rut, tipo=p.etiqueta, periodo=f"{anho}-{mes:02d}", pestana=p.k)
+        print(f"[UI] {p.etiqueta} {anho}-{mes:02d}: {n} comandos WebDriver (pestaña {p.k})")
+        p.periodo, p.tipos = None, []
+
+    def _fallar(self, p: _Pestana, e: Exception) -> None:
+        self._soltar(p)
+        if p.periodo is None:  # no cargó: se reintenta una vez, luego la pestaña queda fuera
+            self.intentos[("pestaña", p.k)] += 1
+            if self.intentos[("pestaña", p.k)] > REINTENTOS:
+                print(f"[WARN] pestaña {p.k} fuera de la rotación: {e}")
+                p.estado = CERRADA
+            else:
+                self._entrar(p, CARGANDO)
+            return
+        anho, mes = p.periodo
+        ms = f"{mes:02d}"
+        print(f"[ERR] {self.rut} {'+'.join(p.tipos)} {anho}-{ms} (pestaña {p.k}): {e}")
+        _dump_debug(self.driver, self.carpeta_base, f"{self.rut}_{'+'.join(p.tipos)}_{anho}-{ms}_p{p.k}")
+        self.intentos[p.periodo] += 1
+        if self.intentos[p.periodo] <= REINTENTOS:
+            self.cola.append((p.periodo, list(p.tipos)))
+        else:
+            for t in p.tipos:
+                _marcar(self.bitacora, self.rut, t, anho, mes, False, str(e))
+        self._cerrar_periodo(p)
+        # Reposiciona la pestaña en el módulo (re-login si hace falta) y vuelve a la rotación
+        try:
+            goto_rcv(self.driver, self.wait, self.rut, self.clave)
+            self._entrar(p, LIBRE)
+        except Exception:
+            self._entrar(p, CARGANDO)
+
+def extraer_en_pestanas(driver, wait: WebDriverWait, **kwargs) -> None:
+    """Descarga los períodos de `trabajo` en varias pestañas del navegador ya logueado.
+
+    Con K pestañas y un servidor que responde en paralelo, un backfill largo
+    se acerca a K veces el ritmo de una sola pestaña sin logins extra. Mismos
+    registros que el flujo secuencial (manifiesto, bitácora y métricas, estas
+    con la etiqueta `pestana`).
+    """
+    Ronda(driver, wait, **kwargs).correr()
@@ -0,0 +1,252 @@
+# src/conciliacion/sii/extraccion/navegador.py
+from __future__ import annotations
+
+import atexit
+import hashlib
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from functools import cache
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.chromium.remote_connection import ChromiumRemoteConnection
+from selenium.webdriver.common.driver_finder import DriverFinder
+
+from ...instrumentacion import registrar
+
+# Fábrica de Chrome para arranques rápidos (en WSL un Chrome en frío tarda varios s):
+#  - un chromedriver por proceso, compartido por todos los navegadores; se habla
+#    con él vía webdriver.Remote (webdriver.Chrome.quit() detendría el servicio);
+#  - un perfil plantilla ya inicializado (primer arranque hecho) que se clona por
+#    navegador: con reflink (cp --reflink=auto) donde el FS lo soporta, si no copia.
+#    No se usan hardlinks: Chrome modifica en el lugar sus SQLite (Cookies,
+#    History...) y ensuciaría la plantilla;
+#  - detección del binario de Chrome y de chromedriver cacheada;
+#  - en headless, sin imágenes, fuentes remotas ni tráfico de fondo.
+# Cada arranque se registra como etapa "arranque_driver" en instrumentacion.
+
+ARGS_LIVIANOS = (
+    "--blink-settings=imagesEnabled=false",
+    "--disable-remote-fonts",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-domain-reliability",
+    "--disable-client-side-phishing-detection",
+    "--disable-features=Translate,OptimizationHints,MediaRouter,AutofillServerCommunication",
+    "--metrics-recording-only",
+    "--mute-audio",
+)
+PREFS_LIVIANAS = {"profile.managed_default_content_settings.images": 2}
+
+LISTA = ".plantilla_lista"
+# Lo que el primer arranque deja y no aporta al clon (cachés, locks del proceso)
+_DESCARTABLE = (
+    "SingletonLock", "SingletonSocket", "SingletonCookie", "Crashpad", "BrowserMetrics",
+    "ShaderCache", "GrShaderCache", "GraphiteDawnCache", "component_crx_cache",
+    "Default/Cache", "Default/Code Cache", "Default/GPUCache", "Default/DawnCache",
+    "Default/Service Worker/CacheStorage",
+)
+
+_lock = threading.Lock()
+_lock_plantilla = threading.Lock()
+_servicios: Dict[str, Service] = {}
+_sin_plantilla: set = set()  # binarios con los que la plantilla ya falló
+
+# =========================
+# Binarios (cacheados)
+# =========================
+@cache
+def detectar_chrome(explicit: Optional[str] = None) -> Optional[str]:
+    if explicit and os.path.exists(explicit):
+        return explicit
+    for p in (
+        os.environ.get("CHROME_BIN"),
+        shutil.which("google-chrome"),
+        "/usr/bin/google-chrome",
+        shutil.which("chromium-browser"),
+        "/usr/bin/chromium-browser",
+        shutil.which("chromium"),
+        "/snap/bin/chromium",
+    ):
+        if p and os.path.exists(p):
+            return p
+    return None
+
+@cache
+def ruta_chromedriver(explicit: Optional[str] = None) -> Optional[str]:
+    """chromedriver indicado, el del PATH o None (lo resuelve Selenium Manager)."""
+    return explicit or shutil.which("chromedriver")
+
+# =========================
+# Servicio chromedriver compartido
+# =========================
+def servicio(chromedriver_path: Optional[str], opts: Options) -> Tuple[Service, bool]:
+    """El chromedriver del proceso (lo levanta o relevanta si murió). Devuelve (servicio, reusado)."""
+    clave = chromedriver_path or ""
+    with _lock:
+        srv = _servicios.get(clave)
+        if srv is not None and srv.process is not None and srv.process.poll() is None and srv.is_connectable():
+            return srv, True
+        srv = Service(ruta_chromedriver(chromedriver_path))
+        if not srv.path:
+            srv.path = DriverFinder(srv, opts).get_driver_path()
+        srv.start()
+        _servicios[clave] = srv
+        return srv, False
+
+def detener_servicios() -> None:
+    with _lock:
+        for srv in _servicios.values():
+            try:
+                srv.stop()
+            except Exception:
+                pass
+        _servicios.clear()
+
+atexit.register(detener_servicios)
+
+def cdp(driver, cmd: str, params: dict) -> dict:
+    """Ejecuta un comando Chrome DevTools sobre la pestaña actual.
+
+    webdriver.Remote no trae execute_cdp_cmd, pero el chromedriver atiende el
+    mismo comando vendor (ChromiumRemoteConnection lo registra).
+    """
+    if hasattr(driver, "execute_cdp_cmd"):
+        return driver.execute_cdp_cmd(cmd, params)
+    return driver.execute("executeCdpCommand", {"cmd": cmd, "params": params})["value"]
+
+def _remoto(srv: Service, opts: Options) -> webdriver.Remote:
+    conexion = ChromiumRemoteConnection(
+        remote_server_addr=srv.service_url, vendor_prefix="goog", browser_name="chrome",
+        keep_alive=True, ignore_proxy=opts._ignore_local_proxy,
+    )
+    return webdriver.Remote(command_executor=conexion, options=opts)
+
+# =========================
+# Perfil plantilla
+# =========================
+def raiz_cache() -> Path:
+    """Carpeta persistente de plantillas de perfil y cachés en disco."""
+    return Path(os.environ.get("BEKILLY_CACHE_DIR") or Path.home() / ".cache" / "bekilly_sii")
+
+def _ruta_plantilla(chrome_binary: Optional[str]) -> Path:
+    return raiz_cache() / f"perfil_{hashlib.sha1(str(chrome_binary).encode()).hexdigest()[:10]}"
+
+def _limpiar_perfil(perfil: Path) -> None:
+    for rel in _DESCARTABLE:
+        p = perfil / rel
+        if p.is_dir() and not p.is_symlink():
+            shutil.rmtree(p, ignore_errors=True)
+        elif p.exists() or p.is_symlink():
+            try:
+                p.unlink()
+            except OSError:
+                pass
+
+def plantilla_perfil(chrome_binary: Optional[str], chromedriver_path: Optional[str]) -> Optional[Path]:
+    """Perfil inicializado una vez por binario de Chrome (persistente entre corridas).
+
+    Se crea arrancando Chrome headless sobre un directorio temporal y se publica
+    con un rename atómico, así procesos concurrentes no ven una plantilla a medias.
+    None si no se pudo crear (se usa un perfil vacío).
+    """
+    destino = _ruta_plantilla(chrome_binary)
+    raiz = destino.parent
+    if (destino / LISTA).exists():
+        return destino
+    with _lock_plantilla:
+        if destino in _sin_plantilla:
+            return None
+        if (destino / LISTA).exists():
+            return destino
+        raiz.mkdir(parents=True, exist_ok=True)
+        tmp = Path(tempfile.mkdtemp(prefix="creando_", dir=raiz))
+        opts = Options()
+        opts.add_argument("--headless=new")
+        for a in ("--no-sandbox", "--disable-dev-shm-usage", "--disable-gpu", "--no-first-run",
+                  "--no-default-browser-check", f"--user-data-dir={tmp}"):
+            opts.add_argument(a)
+        if chrome_binary:
+            opts.binary_location = chrome_binary
+        try:
+            srv, _ = servicio(chromedriver_path, opts)
+            driver = _remoto(srv, opts)
+            try:
+                driver.get("about:blank")
+            finally:
+                driver.quit()
+        except Exception as e:
+            print(f"[CHROME] No se pudo preparar el perfil plantilla ({e}); se usa un perfil vacío.")
+            shutil.rmtree(tmp, ignore_errors=True)
+            _sin_plantilla.add(destino)
+            return None
+        _limpiar_perfil(tmp)
+        (tmp / LISTA).write_text(time.strftime("%Y-%m-%dT%H:%M:%S"), encoding="utf-8")
+        try:
+            os.rename(tmp, destino)
+        except OSError:  # otro proceso la publicó primero
+            shutil.rmtree(tmp, ignore_errors=True)
+        return destino if (destino / LISTA).exists() else None
+
+def clonar_perfil(plantilla: Optional[Path]) -> str:
+    """Directorio de perfil nuevo; copia de la plantilla si hay (reflink cuando se puede)."""
+    destino = tempfile.mkdtemp(prefix="bekilly_chrome_")
+    if plantilla is None:
+        return destino
+    try:
+        if sys.platform.startswith("linux") and shutil.which("cp"):
+            subprocess.run(["cp", "-a", "--reflink=auto", f"{plantilla}/.", destino],
+                           check=True, capture_output=True)
+        else:
+            shutil.copytree(plantilla, destino, dirs_exist_ok=True)
+        Path(destino, LISTA).unlink(missing_ok=True)
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"[CHROME] No se pudo clonar el perfil plantilla ({e}); se usa un perfil vacío.")
+        shutil.rmtree(destino, ignore_errors=True)
+        destino = tempfile.mkdtemp(prefix="bekilly_chrome_")
+    return destino
+
+# =========================
+# Fábrica
+# =========================
+def livianas(opts: Options) -> None:
+    """Apaga imágenes, fuentes remotas y tráfico de fondo (no afectan a las descargas CSV)."""
+    for a in ARGS_LIVIANOS:
+        opts.add_argument(a)
+
+def crear_driver(
+    opts: Options,
+    *,
+    chrome_binary: Optional[str],
+    chromedriver_path: Optional[str],
+    usar_plantilla: bool = True,
+) -> Tuple[webdriver.Remote, str]:
+    """Abre un Chrome con `opts` sobre el chromedriver compartido.
+
+    Agrega --user-data-dir con un clon de la plantilla; devuelve (driver,
+    carpeta del perfil) y registra el tiempo de arranque.
+    """
+    t0 = time.perf_counter()
+    srv, reusado = servicio(chromedriver_path, opts)
+    plantilla = plantilla_perfil(chrome_binary, chromedriver_path) if usar_plantilla else None
+    perfil = clonar_perfil(plantilla)
+    opts.add_argument(f"--user-data-dir={perfil}")
+    try:
+        driver = _remoto(srv, opts)
+    except Exception as e:
+        shutil.rmtree(perfil, ignore_errors=True)
+        registrar("arranque_driver", time.perf_counter() - t0, ok=False, error=str(e),
+                  servicio="reusado" if reusado else "nuevo", perfil="plantilla" if plantilla else "vacio")
+        raise
+    registrar("arranque_driver", time.perf_counter() - t0,
+              servicio="reusado" if reusado else "nuevo", perfil="plantilla" if plantilla else "vacio")
+    return driver, perfil
@@ -0,0 +1,99 @@
+# src/conciliacion/sii/extraccion/recursos.py
+from __future__ import annotations
+
+import threading
+from pathlib import Path
+from typing import IO, Dict, List, Optional, Set, Tuple
+
+try:  # no existe en Windows: ahí los slots solo se coordinan dentro del proceso
+    import fcntl
+except ImportError:  # pragma: no cover - depende del sistema
+    fcntl = None
+
+# Política de recursos de la navegación RCV. Cada goto_rcv (tras un error de
+# período o un re-login) vuelve a pedir el bundle Angular del SII con sus
+# imágenes, fuentes y analítica:
+#  - imágenes, fuentes y rastreadores de terceros se bloquean con
+#    Network.setBlockedURLs (por pestaña, vía CDP);
+#  - el JS/CSS estable sale de la caché HTTP de Chrome en un --disk-cache-dir
+#    persistente por "slot" (uno por navegador simultáneo): Chrome la indexa por
+#    URL y revalida con ETag/If-None-Match, así los reloads reciben 304 o nada.
+# Selenium no recibe eventos CDP (Fetch.requestPaused), por eso no se
+# intercepta a mano: bloqueo declarativo + caché del propio navegador.
+
+IMAGENES = ("*.png", "*.jpg", "*.jpeg", "*.gif", "*.svg", "*.ico", "*.webp", "*.bmp")
+FUENTES = ("*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot")
+RASTREADORES = (
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*hotjar.com*", "*facebook.net*", "*clarity.ms*", "*nr-data.net*", "*newrelic.com*",
+)
+
+_lock = threading.Lock()
+_en_uso: Set[Path] = set()
+_reservas: Dict[str, Tuple[Path, IO]] = {}  # perfil -> (slot, lock abierto)
+
+def patrones(*, imagenes: bool = True, fuentes: bool = True, rastreadores: bool = True) -> List[str]:
+    return [*(IMAGENES if imagenes else ()), *(FUENTES if fuentes else ()), *(RASTREADORES if rastreadores else ())]
+
+def bloquear(driver, urls: List[str]) -> bool:
+    """Aplica la lista de bloqueo en la pestaña actual. False si el navegador no lo soporta."""
+    from .navegador import cdp
+    try:
+        cdp(driver, "Network.enable", {})
+        cdp(driver, "Network.setBlockedURLs", {"urls": list(urls)})
+        return True
+    except Exception as e:
+        print(f"[RECURSOS] No se pudo aplicar el bloqueo ({e}); se sigue sin él.")
+        return False
+
+def bytes_pagina(driver) -> Optional[int]:
+    """Bytes transferidos por la red para la página actual (documento + recursos).
+
+    Lo servido desde la caché cuenta 0 y un 304 solo sus encabezados.
+    """
+    try:
+        total = driver.execute_script(
+            "return performance.getEntriesByType('navigation').concat(performance.getEntriesByType('resource'))"
+            ".reduce(function (s, e) { return s + (e.transferSize || 0); }, 0);"
+        )
+        return int(total) if total is not None else None
+    except Exception:
+        return None
+
+# =========================
+# Caché en disco por slot
+# =========================
+def reservar_cache(raiz: Path, maximo: int = 32) -> Optional[Path]:
+    """Toma el primer slot libre <raiz>/cache_<n> (lock de archivo entre procesos)."""
+    raiz.mkdir(parents=True, exist_ok=True)
+    with _lock:
+        for n in range(maximo):
+            slot = raiz / f"cache_{n}"
+            if slot in _en_uso:
+                continue
+            fh = open(raiz / f"cache_{n}.lock", "a+")
+            if fcntl is not None:
+                try:
+                    fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    fh.close()
+                    continue
+            _en_uso.add(slot)
+            _reservas[str(slot)] = (slot, fh)
+            return slot
+    return None
+
+def asociar(slot: Path, perfil: str) -> None:
+    """El slot se libera junto con el perfil del navegador (ver liberar)."""
+    with _lock:
+        _reservas[perfil] = _reservas.pop(str(slot))
+
+def liberar(clave: str) -> None:
+    """Suelta el slot de un perfil (o de un slot aún sin asociar)."""
+    with _lock:
+        reserva = _reservas.pop(str(clave), None)
+        if reserva is None:
+            return
+        slot, fh = reserva
+        _en_uso.discard(slot)
+        fh.close()  # cierra y suelta el flock
@@ -16,6 +16,20 @@ def main() -> int:
     parser.add_argument("--no-headless", action="store_true", help="Desactivar modo headless en Chrome")
     parser.add_argument("--rut", help="RUT específico a procesar (opcional)")
     parser.add_argument("--tipos", nargs="+", choices=["COMPRA", "VENTA"], help="Tipos a procesar (opcional)")
+    parser.add_argument("--workers", type=int, help="Navegadores en paralelo (por defecto: ejecucion.workers del YAML o 1)")
+    parser.add_argument("--memoria-mb", type=int, help="Tope de heap JS por navegador en MB (opcional)")
+    parser.add_argument("--sesion-unica", action="store_true", default=None,
+                        help="Un navegador y un login por RUT para VENTA y COMPRA (un 'Consultar' por período)")
+    parser.add_argument("--force", action="store_true", help="Redescargar todos los períodos aunque estén en el manifiesto")
+    parser.add_argument("--refresh-since", metavar="AAAA-MM", help="Redescargar desde este período en adelante")
+    parser.add_argument("--http", action="store_true", default=None,
+                        help="Bajar los CSV por HTTP con las cookies del login (UI como respaldo por período)")
+    parser.add_argument("--metricas", metavar="ARCHIVO.jsonl",
+                        help="Escribir métricas por etapa (JSON lines); por defecto ejecucion.metricas del YAML")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continuar una corrida interrumpida: omite lo que la bitácora da por terminado")
+    parser.add_argument("--pestanas", type=int,
+                        help="Períodos en paralelo por navegador (pestañas de la misma sesión; por defecto ejecucion.pestanas o 1)")
 
     args = parser.parse_args()
 
@@ -34,6 +48,15 @@ def main() -> int:
         headless=not args.no_headless,
         rut_filtro=args.rut,
         tipos_filtro=args.tipos,
+        workers=args.workers,
+        max_memoria_mb=args.memoria_mb,
+        sesion_unica=args.sesion_unica,
+        forzar=args.force,
+        refrescar_desde=args.refresh_since,
+        modo_http=args.http,
+        metricas=args.metricas,
+        reanudar=args.resume,
+        pestanas=args.pestanas,
     )
     return 0
 
@@ -1,4 +1,6 @@
 from __future__ import annotations
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path, PureWindowsPath
 from typing import Any, Dict, List, Optional, Tuple
 import yaml
@@ -6,6 +8,11 @@ import yaml
 # Importes relativos a la carpeta "extraccion"
 from .extraccion.extract_venta import run_venta
 from .extraccion.extract_compra import run_compra
+from .extraccion.extract_rut import run_rut
+from .extraccion.manifest import PoliticaIncremental, parse_periodo
+from . import bitacora as bitacora_mod
+from .bitacora import Bitacora
+from .. import instrumentacion
 
 
 # ---------------- helpers de tipos / rango ----------------
@@ -59,6 +66,67 @@ def _norm_path(p: Optional[str], default: Optional[str] = None) -> Path:
     return _to_wsl_path(p).resolve()
 
 
+# ---------------- ejecución de trabajos ----------------
+def _ejecutar_trabajo(
+    *,
+    rut: str,
+    clave: str,
+    tipos: List[str],
+    rango: Tuple[int, int, int, int],
+    carpeta_base: Path,
+    headless: bool,
+    chrome_binary: Optional[str],
+    chromedriver: Optional[str],
+    max_memoria_mb: Optional[int],
+    politica: PoliticaIncremental,
+    modo_http: bool = False,
+    bitacora: Optional[Bitacora] = None,
+    pestanas: int = 1,
+) -> Dict[str, Any]:
+    """Ejecuta un trabajo (rut, tipos) y devuelve su resultado; nunca propaga errores.
+
+    Con un solo tipo usa su extractor dedicado; con varios, una sola sesión
+    de navegador recorre todas las pestañas (run_rut).
+    """
+    anho_ini, mes_ini, anho_fin, mes_fin = rango
+    tipo = "+".join(tipos)
+    kwargs = dict(
+        rut=rut, clave=clave,
+        anho_ini=anho_ini, mes_ini=mes_ini, anho_fin=anho_fin, mes_fin=mes_fin,
+        carpeta_base=carpeta_base, headless=headless,
+        chrome_binary=chrome_binary, chromedriver_path=chromedriver,
+        max_memoria_mb=max_memoria_mb,
+        politica=politica,
+        modo_http=modo_http,
+        bitacora=bitacora,
+        pestanas=pestanas,
+    )
+    t0 = time.monotonic()
+    try:
+        print(f"[Extracción] {rut} {tipo.title()}…")
+        if len(tipos) > 1:
+            run_rut(tipos=tipos, **kwargs)
+        elif tipos[0] == "VENTA":
+            run_venta(**kwargs)
+        else:
+            run_compra(**kwargs)
+        print(f"[OK] {rut} {tipo.title()} completado.")
+        return {"rut": rut, "tipo": tipo, "ok": True, "segundos": time.monotonic() - t0, "error": None}
+    except Exception as e:
+        print(f"[WARN] Falló {tipo} para {rut}: {e}")
+        return {"rut": rut, "tipo": tipo, "ok": False, "segundos": time.monotonic() - t0, "error": str(e)}
+
+def _imprimir_resumen(resultados: List[Dict[str, Any]], segundos_total: float) -> None:
+    ok = sum(1 for r in resultados if r["ok"])
+    print("\n" + "="*60)
+    print(f"[RESUMEN] {len(resultados)} trabajos | OK {ok} | Fallidos {len(resultados) - ok} | {segundos_total:.1f}s")
+    for r in sorted(resultados, key=lambda r: (r["rut"], r["tipo"])):
+        estado = "OK   " if r["ok"] else "FALLO"
+        detalle = f" | {r['error']}" if r["error"] else ""
+        print(f"  [{estado}] {r['rut']} {r['tipo']:<6} {r['segundos']:7.1f}s{detalle}")
+    print("="*60)
+
+
 # ---------------- API principal ----------------
 def run(
     *,
@@ -66,10 +134,38 @@ def run(
     headless: bool,
     rut_filtro: Optional[str] = None,
     tipos_filtro: Optional[List[str]] = None,
-) -> None:
+    workers: Optional[int] = None,
+    max_memoria_mb: Optional[int] = None,
+    sesion_unica: Optional[bool] = None,
+    forzar: bool = False,
+    refrescar_desde: Optional[str] = None,
+    modo_http: Optional[bool] = None,
+    metricas: Optional[str] = None,
+    reanudar: bool = False,
+    pestanas: Optional[int] = None,
+) -> List[Dict[str, Any]]:
     """
     Orquesta las extracciones según el config ya cargado (dict).
     Compatible con main.py que llama orquestador.run(...)
+
+    Los trabajos (rut, tipo) salen de la bitácora SQLite (sii.bitacora, en
+    <carpeta_base>/.bitacora_rcv.sqlite o ejecucion.bitacora): cada uno de los
+    `workers` reclama el siguiente y cada trabajo levanta su propio Chrome
+    (perfil, carpeta de descarga y puerto de depuración aislados). Con
+    sesion_unica, cada RUT es un solo trabajo que descarga todos sus tipos con
+    un login y un "Consultar" por período. Sin `reanudar` la bitácora de los
+    RUT de la corrida parte de cero; con `reanudar` se omiten los períodos ya
+    terminados y se reintentan los fallidos y los que quedaron a medias.
+    La extracción es incremental: los períodos cerrados ya presentes e intactos
+    en el manifiesto se omiten, salvo `forzar` o `refrescar_desde` ('AAAA-MM').
+    Con modo_http los CSV se piden por HTTP con las cookies del login (la UI
+    queda como respaldo por período). Con `pestanas` (o ejecucion.pestanas) > 1
+    cada navegador reparte los períodos de su trabajo entre esa cantidad de
+    pestañas de la misma sesión.
+    Cada etapa (login, consulta, pestaña, descarga) se mide con
+    conciliacion.instrumentacion; con `metricas` (o ejecucion.metricas) los
+    eventos se escriben como JSON lines y al final se imprime su resumen.
+    Devuelve el resultado de cada trabajo.
     """
     rutas = config.get("rutas", {}) or {}
     carpeta_base = _to_wsl_path(rutas.get("carpeta_base", "./data")).resolve()
@@ -88,37 +184,89 @@ def run(
     if tipos_filtro:
         tipos_cfg = _normalize_tipos(tipos_filtro)
 
+    politica = PoliticaIncremental(
+        forzar=bool(forzar or not d.get("incremental", True)),
+        refrescar_desde=parse_periodo(refrescar_desde) if refrescar_desde else None,
+        meses_abiertos=int(d.get("meses_abiertos", 2)),
+    )
+
+    ejec = config.get("ejecucion", {}) or {}
+    workers = max(1, int(workers or ejec.get("workers") or 1))
+    if max_memoria_mb is None and ejec.get("memoria_mb_por_worker"):
+        max_memoria_mb = int(ejec["memoria_mb_por_worker"])
+    if sesion_unica is None:
+        sesion_unica = bool(ejec.get("sesion_unica", False))
+    if modo_http is None:
+        modo_http = bool(ejec.get("modo_http", False))
+    pestanas = max(1, int(pestanas or ejec.get("pestanas") or 1))
+    metricas = metricas or ejec.get("metricas")
+    instrumentacion.configurar(_to_wsl_path(metricas) if metricas else None)
+
     clientes = _select_clientes(config, rut_filtro)
     if not clientes:
         raise ValueError("No hay clientes/credenciales válidas (o el filtro --rut no coincide).")
 
-    print(f"[SETUP] Base: {carpeta_base} | Rango {anho_ini}-{mes_ini:02d} → {anho_fin}-{mes_fin:02d} | Tipos: {', '.join(tipos_cfg)} | headless={headless}")
-
-    for c in clientes:
-        rut, clave = c["rut"], c["clave"]
-        print("\n" + "="*60)
-        print(f"Cliente: {rut}")
-        print("="*60)
-        for tipo in tipos_cfg:
-            try:
-                print(f"[Extracción] {tipo.title()}…")
-                if tipo == "VENTA":
-                    run_venta(
-                        rut=rut, clave=clave,
-                        anho_ini=anho_ini, mes_ini=mes_ini, anho_fin=anho_fin, mes_fin=mes_fin,
-                        carpeta_base=carpeta_base, headless=headless,
-                        chrome_binary=chrome_binary, chromedriver_path=chromedriver
-                    )
-                else:
-                    run_compra(
-                        rut=rut, clave=clave,
-                        anho_ini=anho_ini, mes_ini=mes_ini, anho_fin=anho_fin, mes_fin=mes_fin,
-                        carpeta_base=carpeta_base, headless=headless,
-                        chrome_binary=chrome_binary, chromedriver_path=chromedriver
-                    )
-                print(f"[OK] {tipo.title()} completado.")
-            except Exception as e:
-                print(f"[WARN] Falló {tipo} para {rut}: {e}")
+    print(f"[SETUP] Base: {carpeta_base} | Rango {anho_ini}-{mes_ini:02d} → {anho_fin}-{mes_fin:02d} | Tipos: {', '.join(tipos_cfg)} | headless={headless} | workers={workers} | sesion_unica={sesion_unica} | http={modo_http} | pestanas={pestanas}")
+
+    ruta_bitacora = ejec.get("bitacora")
+    bitacora = Bitacora(_to_wsl_path(ruta_bitacora) if ruta_bitacora else carpeta_base / bitacora_mod.NOMBRE)
+    ruts = [c["rut"] for c in clientes]
+    claves = {c["rut"]: c["clave"] for c in clientes}
+    if reanudar:
+        n = bitacora.recuperar()
+        print(f"[REANUDAR] {bitacora.path}" + (f" | {n} trabajos interrumpidos vuelven a pendiente" if n else ""))
+    else:
+        bitacora.reiniciar(ruts)
+    meses = bitacora_mod.meses(anho_ini, mes_ini, anho_fin, mes_fin)
+    bitacora.planificar((rut, t, p, "extraccion") for rut in ruts for t in tipos_cfg for p in meses)
+
+    comunes = dict(
+        rango=(anho_ini, mes_ini, anho_fin, mes_fin),
+        carpeta_base=carpeta_base, headless=headless,
+        chrome_binary=chrome_binary, chromedriver=chromedriver,
+        max_memoria_mb=max_memoria_mb,
+        politica=politica,
+        modo_http=modo_http,
+        bitacora=bitacora,
+        pestanas=pestanas,
+    )
+    t0 = time.monotonic()
+
+    def _trabajador(encabezados: bool = False) -> List[Dict[str, Any]]:
+        # Reclama trabajos hasta vaciar la bitácora; lo que el extractor no
+        # cerró (períodos intactos en el manifiesto, o todos si falló antes)
+        # se cierra con el resultado del trabajo.
+        propios: List[Dict[str, Any]] = []
+        ultimo = None
+        while True:
+            rec = bitacora.reclamar("extraccion", tipos=tipos_cfg, ruts=ruts, juntos=sesion_unica)
+            if rec is None:
+                return propios
+            if encabezados and rec.rut != ultimo:
+                print("\n" + "="*60)
+                print(f"Cliente: {rec.rut}")
+                print("="*60)
+                ultimo = rec.rut
+            tipos = [t for t in tipos_cfg if t in rec.periodos]
+            res = _ejecutar_trabajo(rut=rec.rut, clave=claves[rec.rut], tipos=tipos, **comunes)
+            bitacora.liberar(rec, ok=res["ok"], error=res["error"])
+            propios.append(res)
+
+    if workers == 1:
+        resultados = _trabajador(encabezados=True)
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rcv") as pool:
+            futuros = [pool.submit(_trabajador) for _ in range(workers)]
+            resultados = [r for fut in futuros for r in fut.result()]
+
+    if not resultados:
+        print("[REANUDAR] Nada pendiente en la bitácora para este rango.")
+    _imprimir_resumen(resultados, time.monotonic() - t0)
+    print(bitacora.resumen())
+    bitacora.cerrar()
+    print(instrumentacion.resumen())
+    instrumentacion.registro().cerrar()
+    return resultados
 
 
 # ---------------- modo CLI opcional ----------------
@@ -133,11 +281,26 @@ def main() -> int:
     p.add_argument("--no-headless", action="store_true", help="Mostrar navegador")
     p.add_argument("--rut", help="Procesar solo este RUT")
     p.add_argument("--tipos", help="Forzar tipos: 'venta', 'compra' o 'venta,compra'")
+    p.add_argument("--workers", type=int, help="Navegadores en paralelo (por defecto 1)")
+    p.add_argument("--memoria-mb", type=int, help="Tope de heap JS por navegador (MB)")
+    p.add_argument("--sesion-unica", action="store_true", default=None,
+                   help="Un navegador y un login por RUT para VENTA y COMPRA")
+    p.add_argument("--force", action="store_true", help="Redescargar todos los períodos (ignora el manifiesto)")
+    p.add_argument("--refresh-since", metavar="AAAA-MM", help="Redescargar desde este período en adelante")
+    p.add_argument("--http", action="store_true", default=None,
+                   help="Camino rápido: bajar los CSV por HTTP reutilizando la sesión del navegador")
+    p.add_argument("--metricas", metavar="ARCHIVO.jsonl", help="Escribir métricas por etapa (JSON lines)")
+    p.add_argument("--resume", action="store_true",
+                   help="Continuar la corrida anterior según la bitácora (omite lo ya terminado)")
+    p.add_argument("--pestanas", type=int, help="Períodos en paralelo por navegador, en pestañas de la misma sesión")
     args = p.parse_args()
 
     cfg = _load_yaml(Path(args.config))
     tipos = [t.strip() for t in args.tipos.split(",")] if args.tipos else None
-    run(config=cfg, headless=not args.no_headless, rut_filtro=args.rut, tipos_filtro=tipos)
+    run(config=cfg, headless=not args.no_headless, rut_filtro=args.rut, tipos_filtro=tipos,
+        workers=args.workers, max_memoria_mb=args.memoria_mb, sesion_unica=args.sesion_unica,
+        forzar=args.force, refrescar_desde=args.refresh_since, modo_http=args.http,
+        metricas=args.metricas, reanudar=args.resume, pestanas=args.pestanas)
     print("\n[OK] Extracción finalizada.")
     return 0
 
@@ -0,0 +1,130 @@
+from __future__ import annotations
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable
+import pandas as pd
+
+from ..escritores import crear_escritor
+from ..instrumentacion import medir, registrar
+from .almacen import EscritorParquet
+from .calculo import calcular_efecto_neto
+from .consolidacion import iterar_consolidado
+
+# --- Escritura en segundo plano ----------------------------------------------
+
+class EscritorEnSegundoPlano:
+    """Hilo único que ejecuta las escrituras a disco en orden de llegada.
+
+    La cola es acotada: si el disco va más lento que el cálculo, el productor
+    espera en vez de acumular lotes en memoria. Los errores se guardan y se
+    devuelven en cerrar().
+    """
+
+    def __init__(self, max_pendientes: int = 16):
+        self._cola: queue.Queue = queue.Queue(maxsize=max_pendientes)
+        self.errores: list[str] = []
+        self._hilo = threading.Thread(target=self._bucle, name="escritor", daemon=True)
+        self._hilo.start()
+
+    def _bucle(self) -> None:
+        while True:
+            item = self._cola.get()
+            if item is None:
+                return
+            fn, args, etiqueta = item
+            if etiqueta is None:  # marca de al_vaciar
+                try:
+                    fn(len(self.errores) == args[0])
+                except Exception as e:
+                    print(f"❌ Error confirmando escrituras: {e}")
+                continue
+            filas = sum(len(a) for a in args if isinstance(a, pd.DataFrame)) or None
+            try:
+                with medir("escritura", destino=etiqueta) as sp:
+                    sp.filas = filas
+                    fn(*args)
+            except Exception as e:
+                self.errores.append(f"{etiqueta}: {e}")
+                print(f"❌ Error escribiendo {etiqueta}: {e}")
+
+    def enviar(self, fn: Callable[..., Any], *args: Any, etiqueta: str = "") -> None:
+        self._cola.put((fn, args, etiqueta))
+
+    def al_vaciar(self, fn: Callable[[bool], Any]) -> None:
+        """Llama fn(ok) en el hilo escritor cuando terminen las escrituras ya encoladas.
+
+        ok es False si alguna escritura falló desde esta llamada; sirve para dar
+        por terminado un trabajo solo con sus archivos ya en disco.
+        """
+        self._cola.put((fn, (len(self.errores),), None))
+
+    def cerrar(self) -> list[str]:
+        """Espera a que terminen todas las escrituras pendientes."""
+        self._cola.put(None)
+        self._hilo.join()
+        return self.errores
+
+# --- Consolidación -> cálculo en memoria -------------------------------------
+
+def consolidar_y_calcular(
+    base_dir: str,
+    rut: str,
+    tipo: str,
+    path_encabezados: str,
+    escritor: EscritorEnSegundoPlano,
+    *,
+    salida_xlsx: str | Path | None = None,
+    salida_calc_xlsx: str | Path | None = None,
+    parquet_dir: str | Path | None = None,
+    workers: int | None = None,
+    backend: str | None = None,
+) -> int:
+    """Consolida y calcula lote a lote; las escrituras van al hilo de `escritor`.
+
+    calcular_efecto_neto trabaja fila a fila, así que se aplica a cada lote del
+    consolidado sin releer nada desde disco. Devuelve las filas procesadas; el
+    cierre de los archivos queda encolado (no bloquea al siguiente cliente).
+    `backend` elige el escritor de las salidas de archivo (openpyxl,
+    xlsxwriter, csv o parquet; por defecto según la extensión).
+    """
+    consolidados: list = []
+    calculados: list = []
+    filas = 0
+    etiquetas = dict(rut=rut, tipo=tipo.upper())
+    lotes = iter(iterar_consolidado(base_dir, rut, tipo, path_encabezados, workers=workers))
+    t_espera, c_espera = 0.0, 0.0
+    while True:
+        # "consolidacion" = tiempo esperando el siguiente lote (lectura + normalización)
+        t0, c0 = time.perf_counter(), time.thread_time()
+        lote = next(lotes, None)
+        t_espera += time.perf_counter() - t0
+        c_espera += time.thread_time() - c0
+        if lote is None:
+            break
+        with medir("calculo", **etiquetas) as sp:
+            sp.filas = len(lote)
+            calc = calcular_efecto_neto(lote)
+        if not consolidados and not calculados:
+            cols, cols_calc = list(lote.columns), list(calc.columns)
+            if salida_xlsx:
+                consolidados.append(crear_escritor(salida_xlsx, cols, backend))
+            if salida_calc_xlsx:
+                calculados.append(crear_escritor(salida_calc_xlsx, cols_calc, backend))
+            if parquet_dir:
+                consolidados.append(EscritorParquet(Path(parquet_dir) / "consolidado", rut, tipo, cols))
+                calculados.append(EscritorParquet(Path(parquet_dir) / "calculado", rut, tipo, cols_calc))
+        for esc in consolidados:
+            escritor.enviar(esc.escribir, lote, etiqueta=f"{rut}/{tipo}")
+        for esc in calculados:
+            escritor.enviar(esc.escribir, calc, etiqueta=f"{rut}/{tipo}")
+        filas += len(lote)
+    registrar("consolidacion", t_espera, cpu_s=c_espera, filas=filas, **etiquetas)
+
+    for esc in consolidados + calculados:
+        destino = esc.path.name if hasattr(esc, "path") else str(esc.dir)
+        escritor.enviar(esc.cerrar, etiqueta=destino)
+    if filas:
+        print(f"✅ Consolidado + cálculo {tipo}: {filas:,} filas (escritura en segundo plano)")
+    return filas
@@ -0,0 +1,19 @@
+import pandas as pd
+import pytest
+from conciliacion.sii import almacen
+
+pytest.importorskip("pyarrow")
+
+
+def test_parquet_particiona_y_promueve_tipos(tmp_path):
+    cols = ["Tipo Doc", "Folio", "Archivo.Origen"]
+    esc = almacen.EscritorParquet(tmp_path, "1-9", "compra", cols)
+    esc.escribir(pd.DataFrame({"Tipo Doc": [33.0], "Folio": [10.0], "Archivo.Origen": ["RCV_COMPRA_REGISTRO_1-9_202402.csv"]}))
+    esc.escribir(pd.DataFrame({"Tipo Doc": [61.0], "Folio": ["A-1"], "Archivo.Origen": ["RCV_COMPRA_REGISTRO_1-9_202401.csv"]}))
+    esc.cerrar()
+
+    assert (tmp_path / "rut=1-9" / "tipo=compra" / "anho=2024" / "mes=01").is_dir()
+    df = almacen.leer_parquet(tmp_path, "1-9", "compra")
+    assert df["Archivo.Origen"].tolist() == ["RCV_COMPRA_REGISTRO_1-9_202401.csv", "RCV_COMPRA_REGISTRO_1-9_202402.csv"]
+    assert df["Tipo Doc"].tolist() == [61.0, 33.0]
+    assert df["Folio"].tolist() == ["A-1", "10"]
@@ -0,0 +1,93 @@
+import subprocess
+import sys
+import threading
+
+from conciliacion.sii.bitacora import EN_CURSO, FALLIDO, OK, PENDIENTE, TODOS, Bitacora, meses
+
+
+def _plan(b, ruts=("1-9", "2-7"), tipos=("VENTA", "COMPRA")):
+    b.planificar((r, t, p, "extraccion") for r in ruts for t in tipos for p in meses(2024, 11, 2025, 2))
+
+
+def test_meses_cruza_el_anho():
+    assert meses(2024, 11, 2025, 2) == ["2024-11", "2024-12", "2025-01", "2025-02"]
+
+
+def test_reclamar_por_rut_o_por_tipo(tmp_path):
+    b = Bitacora(tmp_path / "b.sqlite")
+    _plan(b)
+    rec = b.reclamar("extraccion", tipos=["VENTA", "COMPRA"])
+    assert rec.rut == "1-9" and rec.tipos == ["VENTA", "COMPRA"] and len(rec.periodos["COMPRA"]) == 4
+    rec = b.reclamar("extraccion", tipos=["VENTA", "COMPRA"], juntos=False)
+    assert (rec.rut, rec.tipos) == ("2-7", ["VENTA"])
+    assert b.reclamar("extraccion", tipos=["VENTA"]) is None
+    assert b.estado("2-7", "VENTA", "2025-01", "extraccion") == EN_CURSO
+
+
+def test_resume_omite_lo_terminado_y_reintenta_fallidos(tmp_path):
+    path = tmp_path / "b.sqlite"
+    b = Bitacora(path, dueno="host:1")
+    _plan(b, ruts=("1-9",), tipos=("COMPRA",))
+    rec = b.reclamar("extraccion", tipos=["COMPRA"])
+    b.terminar("1-9", "COMPRA", "2024-11", "extraccion", ok=True)
+    b.terminar("1-9", "COMPRA", "2024-12", "extraccion", ok=False, error="timeout")
+    assert b.asignado("1-9", "COMPRA", "2025-01") and not b.asignado("1-9", "COMPRA", "2024-11")
+    b.liberar(rec, ok=True)  # lo que quedó en curso (intacto en el manifiesto) se da por hecho
+    # el mismo dueño no reintenta en la misma corrida
+    assert b.reclamar("extraccion", tipos=["COMPRA"]) is None
+    b.cerrar()
+
+    otra = Bitacora(path, dueno="host:2")
+    _plan(otra, ruts=("1-9",), tipos=("COMPRA",))  # replanificar no pisa el avance
+    rec = otra.reclamar("extraccion", tipos=["COMPRA"])
+    assert rec.periodos == {"COMPRA": ["2024-12"]}
+    assert otra.conteo()[("extraccion", OK)] == 3
+
+
+def test_fallido_sin_intentos_no_se_reclama(tmp_path):
+    b = Bitacora(tmp_path / "b.sqlite", max_intentos=2)
+    b.planificar([("1-9", "VENTA", TODOS, "consolidacion")])
+    for n in range(2):
+        b.dueno = f"host:{n}"
+        assert b.reclamar("consolidacion", tipos=["VENTA"]) is not None
+        b.terminar("1-9", "VENTA", TODOS, "consolidacion", ok=False, error="x")
+    b.dueno = "host:9"
+    assert b.reclamar("consolidacion", tipos=["VENTA"]) is None
+    assert "sin reintentos" in b.resumen()
+
+
+def test_recuperar_en_curso_de_proceso_muerto(tmp_path):
+    import socket
+    proc = subprocess.Popen([sys.executable, "-c", "pass"])
+    proc.wait()
+    b = Bitacora(tmp_path / "b.sqlite", dueno=f"{socket.gethostname()}:{proc.pid}")
+    _plan(b, ruts=("1-9",), tipos=("VENTA",))
+    b.reclamar("extraccion", tipos=["VENTA"])
+    vivo = Bitacora(tmp_path / "b.sqlite")
+    assert vivo.reclamar("extraccion", tipos=["VENTA"]) is None
+    assert vivo.recuperar() == 4
+    assert vivo.estado("1-9", "VENTA", "2024-11", "extraccion") == PENDIENTE
+    assert vivo.reclamar("extraccion", tipos=["VENTA"]).periodos["VENTA"][0] == "2024-11"
+
+
+def test_workers_concurrentes_no_repiten_trabajos(tmp_path):
+    path = tmp_path / "b.sqlite"
+    ruts = [f"{i}-0" for i in range(30)]
+    _plan(Bitacora(path), ruts=ruts)
+    tomados, lock = [], threading.Lock()
+
+    def worker(n):
+        b = Bitacora(path, dueno=f"host:{n}")  # como procesos distintos
+        while (rec := b.reclamar("extraccion", tipos=["VENTA", "COMPRA"], juntos=False)) is not None:
+            with lock:
+                tomados.append((rec.rut, rec.tipos[0]))
+            b.liberar(rec, ok=True)
+
+    hilos = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    assert sorted(tomados) == sorted((r, t) for r in ruts for t in ("VENTA", "COMPRA"))
+    assert Bitacora(path).conteo() == {("extraccion", OK): 30 * 2 * 4}
+    assert FALLIDO not in {s for _, s in Bitacora(path).conteo()}
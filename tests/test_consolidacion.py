@@ -0,0 +1,32 @@
+from collections import Counter
+
+from conciliacion.sii import consolidacion as c
+
+
+def test_sniff_bom_y_separador(tmp_path):
+    p = tmp_path / "RCV_VENTA_REGISTRO_1-9_202401.csv"
+    p.write_bytes("\ufeffTipo Doc,Razon Social\n33,Ñandú\n".encode())
+    assert c._sniff_csv(p) == ("utf-8-sig", ",")
+
+
+def test_cache_por_patron_evita_sniffs(tmp_path):
+    c.limpiar_cache_formatos()
+    for mes in (1, 2, 3):
+        p = tmp_path / f"RCV_COMPRA_REGISTRO_1-9_20240{mes}.csv"
+        p.write_bytes("Tipo Doc;Razon Social\n33;Peña\n".encode("latin-1"))
+    stats = Counter()
+    dfs = [c._leer_csv_inteligente(p, stats=stats) for p in sorted(tmp_path.glob("*.csv"))]
+    assert stats["sniffs"] == 1 and stats["cache_hits"] == 2
+    assert stats["parses"] == 3 and stats["fallbacks"] == 0
+    assert dfs[0].loc[0, "Razon Social"] == "Peña"
+
+
+def test_cache_no_confunde_utf8_sig_con_latin1(tmp_path):
+    c.limpiar_cache_formatos()
+    (tmp_path / "RCV_COMPRA_REGISTRO_1-9_202401.csv").write_bytes("Nro;Razon Social\n1;Peña\n".encode("latin-1"))
+    (tmp_path / "RCV_COMPRA_REGISTRO_1-9_202402.csv").write_bytes("Nro;Razon Social\n2;Ñuñoa\n".encode("utf-8-sig"))
+    stats = Counter()
+    dfs = [c._leer_csv_inteligente(p, stats=stats) for p in sorted(tmp_path.glob("*.csv"))]
+    assert [list(df.columns) for df in dfs] == [["Nro", "Razon Social"]] * 2
+    assert dfs[1].loc[0, "Razon Social"] == "Ñuñoa"
+    assert stats["sniffs"] == 2 and stats["fallbacks"] == 0
@@ -0,0 +1,26 @@
+import os
+import threading
+import time
+
+from conciliacion.sii.extraccion.descargas import SeguidorDescargas
+
+
+def test_seguidor_ignora_parciales_y_clasifica(tmp_path):
+    (tmp_path / "previo.csv").write_text("x")
+
+    def chrome():
+        time.sleep(0.1)
+        parcial = tmp_path / "Unconfirmed 1.crdownload"
+        parcial.write_text("a;b\n1;2\n")
+        time.sleep(0.1)
+        os.replace(parcial, tmp_path / "RCV_RESUMEN_COMPRA_1-9_202401.csv")
+
+    with SeguidorDescargas(tmp_path) as seg:
+        t = threading.Thread(target=chrome)
+        t.start()
+        out = seg.esperar(["resumen"], timeout=5)
+        t.join()
+
+    assert [a.nombre for a in out] == ["RCV_RESUMEN_COMPRA_1-9_202401.csv"]
+    assert out[0].clase == "resumen"
+    assert out[0].bytes == len("a;b\n1;2\n")
@@ -0,0 +1,28 @@
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+from conciliacion.escritores import crear_escritor, escribir_dataframe
+
+@pytest.mark.parametrize("backend", ["openpyxl", "xlsxwriter"])
+def test_xlsx_parte_en_hojas(tmp_path, backend):
+    if backend == "xlsxwriter":
+        pytest.importorskip("xlsxwriter")
+    df = pd.DataFrame({"Folio": range(7), "Monto Neto": [1.5, None, 3, 4, 5, 6, 7]})
+    path = tmp_path / "x.xlsx"
+    esc = crear_escritor(path, list(df.columns), backend, max_filas=4)  # 3 datos + encabezado
+    esc.escribir(df.iloc[:2])
+    esc.escribir(df.iloc[2:])
+    esc.cerrar()
+
+    wb = load_workbook(path)
+    assert wb.sheetnames == ["Sheet1", "Sheet2", "Sheet3"]
+    filas = [list(r) for ws in wb.worksheets for r in ws.iter_rows(values_only=True)]
+    assert filas[0] == ["Folio", "Monto Neto"]
+    assert [f[0] for f in filas if f[0] != "Folio"] == list(range(7))
+    assert filas[2] == [1, None]
+
+def test_csv_por_extension(tmp_path):
+    df = pd.DataFrame({"a": [1, 2], "b": ["x", None]})
+    path = escribir_dataframe(df, tmp_path / "r.csv")
+    assert pd.read_csv(path).shape == (2, 2)
@@ -0,0 +1,60 @@
+import pytest
+from selenium.common.exceptions import JavascriptException, TimeoutException
+from selenium.webdriver.common.by import By
+
+from conciliacion.sii.extraccion import esperas
+from conciliacion.sii.extraccion.esperas import Memoria, carrera
+
+
+class Driver:
+    current_url = "https://www4.sii.cl/consdcvinternetui/"
+
+    def __init__(self, *respuestas):
+        self.respuestas = list(respuestas)
+        self.llamadas = []
+
+    def execute_async_script(self, js, cands, cond, limite):
+        self.llamadas.append((cands, cond, limite))
+        r = self.respuestas.pop(0)
+        if isinstance(r, Exception):
+            raise r
+        return r
+
+
+def test_timeout_aprendido_con_piso_y_tope():
+    m = Memoria()
+    assert m.timeout("s|p", 14.0) == 14.0
+    for _ in range(10):
+        m.observar("s|p", 0.3)
+    assert m.timeout("s|p", 14.0) == esperas.PISO_S  # sitio rápido: se corta al piso
+    for _ in range(10):
+        m.observar("s|p", 20.0)
+    assert m.timeout("s|p", 14.0) == 28.0  # sitio lento: nunca más de 2x el defecto
+
+
+def test_carrera_prueba_primero_al_ganador_y_devuelve_indice_original():
+    locs = [(By.ID, "periodoMes"), (By.XPATH, "//select[@ng-model='periodoAnho']")]
+    m = Memoria()
+    d = Driver([1, "anho"], [0, "anho"])
+    assert carrera(d, "rcv", locs, mem=m) == (1, "anho")
+    assert d.llamadas[0][0][0] == ["css", '[id="periodoMes"]']
+    # la segunda vez el XPath va primero en el script, pero el índice sigue siendo el del llamador
+    assert carrera(d, "rcv", locs, mem=m) == (1, "anho")
+    assert d.llamadas[1][0][0] == ["xpath", "//select[@ng-model='periodoAnho']"]
+
+
+def test_carrera_sobrevive_a_la_navegacion_y_registra_el_timeout():
+    m = Memoria()
+    d = Driver(JavascriptException("document unloaded"), [-1, None])
+    assert carrera(d, "login", [(By.NAME, "rut")], condicion="ausente", mem=m) == (-1, None)
+    with pytest.raises(TimeoutException):
+        carrera(Driver(None), "x", [(By.CSS_SELECTOR, ".a")], defecto=1.0, mem=m)
+    assert m.pasos["www4.sii.cl|x"]["media"] == 1.0
+
+
+def test_memoria_persiste(tmp_path):
+    m = Memoria(tmp_path / "e.json")
+    m.observar("s|p", 1.5, "id=x")
+    m.guardar()
+    otra = Memoria(tmp_path / "e.json")
+    assert otra.pasos["s|p"]["media"] == 1.5 and otra.ganadores["s|p"] == {"id=x": 1}
@@ -0,0 +1,60 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from conciliacion.sii.extraccion.http_rcv import descargar_periodos_http
+
+requests = pytest.importorskip("requests")
+
+
+class _SIIFalso(BaseHTTPRequestHandler):
+    """Imita los servicios facadeService de RCV; 202402 responde error, 202403
+    un CSV en UTF-8 y 202404 una lista vacía."""
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        periodo = body["data"]["ptributario"]
+        if periodo == "202402":
+            self.send_response(500)
+            self.end_headers()
+            return
+        metodo = self.path.rsplit("/", 1)[-1]
+        lineas = ["Tipo Doc;Monto Neto", f"33;{periodo}"] if "Detalle" in metodo else ["Tipo Doc;Total", "33;1"]
+        ctype = "application/json"
+        if periodo == "202403":
+            out, ctype = "Razón Social;Glosa\nÑandú;€ 10\n".encode(), "text/csv; charset=utf-8"
+        else:
+            out = json.dumps({"data": [] if periodo == "202404" else lineas, "respEstado": {"codRespuesta": 0}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_descarga_http_con_fallback(tmp_path):
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _SIIFalso)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    try:
+        with requests.Session() as s:
+            ok, fallidos = descargar_periodos_http(
+                s, base_url=f"http://127.0.0.1:{srv.server_port}/", rut="1-9", tipo_up="COMPRA",
+                periodos=[(2024, 1), (2024, 2), (2024, 3), (2024, 4)], out_dir=tmp_path, workers=2,
+            )
+    finally:
+        srv.shutdown()
+
+    assert list(fallidos) == [(2024, 2)]
+    assert sorted(a.nombre for a in ok[(2024, 1)]) == [
+        "RCV_COMPRA_REGISTRO_1-9_202401.csv",
+        "RCV_RESUMEN_COMPRA_1-9_202401.csv",
+    ]
+    assert (tmp_path / "RCV_COMPRA_REGISTRO_1-9_202401.csv").read_text(encoding="latin-1") == "Tipo Doc;Monto Neto\n33;202401\n"
+    # CSV del servicio: bytes tal cual (el € no cabe en latin-1)
+    assert (tmp_path / "RCV_COMPRA_REGISTRO_1-9_202403.csv").read_bytes() == "Razón Social;Glosa\nÑandú;€ 10\n".encode()
+    # lista vacía: período sin archivos, no un CSV sin encabezado
+    assert ok[(2024, 4)] == [] and not list(tmp_path.glob("*202404*"))
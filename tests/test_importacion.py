@@ -0,0 +1,35 @@
+import gzip
+
+import pandas as pd
+import pytest
+
+from conciliacion.importacion import cargar
+from conciliacion.normalizacion import DEFAULT_MAPPING
+
+CSV = "Fecha,Monto,Glosa,Saldo,Sucursal\n2025-08-01,1000,abono,5000,1\n2025-08-02,-200,cargo,4800,1\n2025-08-03,50,abono,4850,2\n"
+
+def test_csv_gz_por_partes_solo_columnas_mapeadas(tmp_path):
+    p = tmp_path / "movs.csv.gz"
+    with gzip.open(p, "wt", encoding="utf-8") as f:
+        f.write(CSV)
+    lotes = list(cargar(p, chunksize=2, mapping=DEFAULT_MAPPING))
+    assert [len(x) for x in lotes] == [2, 1]
+    assert list(lotes[0].columns) == ["Fecha", "Monto", "Glosa"]
+    assert lotes[0]["Glosa"].dtype == "string"
+
+def test_xlsx_streaming_y_parquet(tmp_path):
+    df = pd.read_csv(pd.io.common.StringIO(CSV))
+    df.to_excel(tmp_path / "movs.xlsx", index=False)
+    out = cargar(tmp_path / "movs.xlsx", mapping=DEFAULT_MAPPING)
+    assert list(out.columns) == ["Fecha", "Monto", "Glosa"] and out["Monto"].sum() == 850
+    assert [len(x) for x in cargar(tmp_path / "movs.xlsx", chunksize=2)] == [2, 1]
+
+    df.head(0).to_excel(tmp_path / "vacio.xlsx", index=False)  # solo encabezado
+    vacio = cargar(tmp_path / "vacio.xlsx", mapping=DEFAULT_MAPPING)
+    assert vacio.empty and list(vacio.columns) == ["Fecha", "Monto", "Glosa"]
+    assert [len(x) for x in cargar(tmp_path / "vacio.xlsx", chunksize=2)] == [0]
+
+    pytest.importorskip("pyarrow")
+    df.to_parquet(tmp_path / "movs.parquet")
+    lotes = list(cargar(tmp_path / "movs.parquet", chunksize=2, mapping=DEFAULT_MAPPING))
+    assert sum(len(x) for x in lotes) == 3 and list(lotes[0].columns) == ["Fecha", "Monto", "Glosa"]
@@ -0,0 +1,53 @@
+import json
+
+import pytest
+
+from conciliacion import instrumentacion as ins
+
+
+def test_medir_emite_jsonl_y_resumen(tmp_path):
+    destino = tmp_path / "m.jsonl"
+    ins.configurar(destino)
+    with ins.contexto(rut="76.123.456-7", tipo="COMPRA"):
+        for i in range(20):
+            ins.registrar("descarga", float(i + 1), periodo=f"2024-{i % 12 + 1:02d}", bytes=100)
+        with ins.medir("consolidacion") as sp:
+            sp.filas = 42
+        with pytest.raises(ValueError):
+            with ins.medir("calculo"):
+                raise ValueError("x")
+    ins.registro().cerrar()
+
+    eventos = [json.loads(linea) for linea in destino.read_text(encoding="utf-8").splitlines()]
+    assert len(eventos) == 22
+    assert eventos[0]["rut"] == "76.123.456-7" and eventos[0]["tipo"] == "COMPRA"
+    assert eventos[20]["etapa"] == "consolidacion" and eventos[20]["filas"] == 42
+    assert eventos[21]["ok"] is False and "ValueError" in eventos[21]["error"]
+
+    assert ins._percentil([float(i + 1) for i in range(20)], 50) == 10.0
+    assert ins._percentil([float(i + 1) for i in range(20)], 95) == 19.0
+    texto = ins.resumen(eventos)
+    assert "1 con error" in texto and "descarga" in texto and "2024-" in texto
+    ins.configurar()
+
+
+def test_comandos_webdriver_por_periodo():
+    from conciliacion.sii.extraccion.common_rcv import _comandos_periodo, _contar_comandos
+
+    class Driver:
+        def execute(self, comando, params=None):
+            return {"value": None}
+
+    d = Driver()
+    _contar_comandos(d)
+    ins.configurar()
+    with _comandos_periodo(d, rut="1-9", tipo="VENTA", periodo="2024-01"):
+        for _ in range(3):
+            d.execute("executeScript", {})
+        ins.registrar("descarga", 2.0, rut="1-9", tipo="VENTA", periodo="2024-01")
+    ev = ins.registro().eventos
+    assert ev[-1]["etapa"] == "comandos_webdriver" and ev[-1]["comandos"] == 3
+    texto = ins.resumen()
+    assert "Comandos WebDriver por período: p50 3" in texto
+    assert "2024-01: 2.0s" in texto  # el envoltorio no duplica el tiempo del período
+    ins.configurar()
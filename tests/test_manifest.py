@@ -0,0 +1,67 @@
+from datetime import date
+
+from conciliacion.sii.extraccion import common_rcv, manifest
+from conciliacion.sii.extraccion.descargas import ArchivoDescargado
+from conciliacion.sii.extraccion.manifest import PoliticaIncremental
+
+
+def _registrar(tmp_path, anho, mes):
+    nombre = f"RCV_RESUMEN_COMPRA_1-9_{anho}{mes:02d}.csv"
+    (tmp_path / nombre).write_text("a;b\n1;2\n3;4\n")
+    arch = ArchivoDescargado(nombre, "resumen", (tmp_path / nombre).stat().st_size, 0.1)
+    manifest.registrar_periodo(tmp_path, rut="1-9", tipo_up="COMPRA", anho=anho, mes=mes, archivos=[arch])
+    return tmp_path / nombre
+
+
+def test_politica_omite_cerrados_intactos(tmp_path):
+    _registrar(tmp_path, 2024, 1)
+    entrada = manifest.cargar(tmp_path)["periodos"]["2024-01"]
+    assert entrada["archivos"][0]["filas"] == 2
+
+    pol = PoliticaIncremental(hoy=date(2024, 6, 15))
+    assert not pol.debe_descargar(tmp_path, 2024, 1)   # cerrado e intacto
+    assert pol.debe_descargar(tmp_path, 2024, 2)       # sin manifiesto
+    assert pol.debe_descargar(tmp_path, 2024, 5)       # mes abierto
+    assert PoliticaIncremental(hoy=date(2024, 6, 15), forzar=True).debe_descargar(tmp_path, 2024, 1)
+    assert PoliticaIncremental(hoy=date(2024, 6, 15), refrescar_desde=(2024, 1)).debe_descargar(tmp_path, 2024, 1)
+
+
+def test_politica_redescarga_si_cambia_archivo(tmp_path):
+    p = _registrar(tmp_path, 2024, 1)
+    p.write_text("a;b\n1;9\n3;4\n")  # mismo tamaño, distinto contenido
+    assert PoliticaIncremental(hoy=date(2024, 6, 1)).debe_descargar(tmp_path, 2024, 1)
+
+
+def test_mes_abierto_redescargado_deja_un_solo_juego_de_archivos(tmp_path, monkeypatch):
+    for nombre in ("activate_tab", "_cerrar_alertas"):
+        monkeypatch.setattr(common_rcv, nombre, lambda *a, **k: None)
+    monkeypatch.setattr(common_rcv, "_panel_visible", lambda *a: True)
+
+    def descargar(driver, wait, seguidor):
+        # como Chrome: si el nombre ya existe, la copia nueva es "... (1).csv"
+        for base in ("RCV_RESUMEN_COMPRA_1-9_202406", "RCV_COMPRA_REGISTRO_1-9_202406"):
+            n = 0
+            while (tmp_path / (base + (f" ({n})" if n else "") + ".csv")).exists():
+                n += 1
+            (tmp_path / (base + (f" ({n})" if n else "") + ".csv")).write_text(f"a;b\n{n};2\n")
+        return seguidor.esperar(["resumen", "detalle"], timeout=2)
+
+    monkeypatch.setattr(common_rcv, "download_resumen_y_detalle", descargar)
+    pol = PoliticaIncremental(hoy=date(2024, 6, 15))
+    for _ in range(2):
+        assert pol.debe_descargar(tmp_path, 2024, 6)  # mes abierto: se refresca siempre
+        assert common_rcv._descargar_tipo(None, None, rut="1-9", tipo_up="COMPRA", anho=2024, mes=6, out_dir=tmp_path)
+
+    assert sorted(p.name for p in tmp_path.glob("*.csv")) == [
+        "RCV_COMPRA_REGISTRO_1-9_202406.csv", "RCV_RESUMEN_COMPRA_1-9_202406.csv"]
+    assert (tmp_path / "RCV_COMPRA_REGISTRO_1-9_202406.csv").read_text() == "a;b\n1;2\n"  # la copia nueva
+    assert manifest.periodo_intacto(tmp_path, manifest.cargar(tmp_path)["periodos"]["2024-06"])
+
+
+def test_registrar_borra_archivos_que_la_entrada_anterior_listaba(tmp_path):
+    viejo = tmp_path / "RCV_RESUMEN_COMPRA_1-9_202401 (1).csv"
+    viejo.write_text("a;b\n1;2\n")
+    manifest.registrar_periodo(tmp_path, rut="1-9", tipo_up="COMPRA", anho=2024, mes=1,
+                               archivos=[ArchivoDescargado(viejo.name, "resumen", viejo.stat().st_size, 0.1)])
+    nuevo = _registrar(tmp_path, 2024, 1)
+    assert not viejo.exists() and nuevo.exists()
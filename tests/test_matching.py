@@ -0,0 +1,99 @@
+import pandas as pd
+from conciliacion.matching import conciliar
+
+def _df(fechas, montos, refs=None):
+    return pd.DataFrame({
+        "fecha": pd.to_datetime(fechas),
+        "monto": montos,
+        "glosa": ["x"] * len(montos),
+        "referencia": refs or [""] * len(montos),
+    })
+
+def test_duplicados_uno_a_uno():
+    banco = _df(["2024-01-01"] * 2, [100, 100])
+    libro = _df(["2024-01-01"] * 3, [100, 100, 100])
+    out = conciliar(banco, libro)
+    assert len(out) == 3 and out["match"].sum() == 2
+
+def test_tolerancia_y_ventana_de_dias():
+    banco = _df(["2024-01-05", "2024-01-10"], [250.0, 999.0])
+    libro = _df(["2024-01-06", "2024-02-01"], [250.4, 999.0])
+    assert conciliar(banco, libro)["match"].sum() == 0
+    out = conciliar(banco, libro, tol_abs=0.5, dias=2)
+    assert out["match"].sum() == 1
+    assert out.loc[out["match"], "monto_libro"].tolist() == [250.4]
+
+def test_fuzzy_desempata_por_referencia():
+    banco = _df(["2024-01-01"] * 2, [100, 100], ["A1", "B2"])
+    libro = _df(["2024-01-01"] * 2, [100, 100], ["B2", "A1"])
+    out = conciliar(banco, libro, fuzzy=True)
+    pares = out[out["match"]]
+    assert (pares["referencia_banco"] == pares["referencia_libro"]).all()
+
+def test_grupos_deposito_paga_varias_facturas():
+    banco = _df(["2024-01-10", "2024-01-20"], [300, 70])
+    libro = _df(["2024-01-08", "2024-01-09", "2024-01-09", "2024-01-18", "2024-01-19"], [100, 150, 50, 40, 30])
+    assert conciliar(banco, libro)["match"].sum() == 0
+    out = conciliar(banco, libro, grupos=True, dias_grupo=5, max_grupo=3)
+    pares = out[out["match"]]
+    assert len(pares) == 5 and pares["grupo"].nunique() == 2
+    sumas = pares.groupby("grupo").agg(banco=("monto_banco", "first"), libro=("monto_libro", "sum"))
+    assert (sumas["banco"] == sumas["libro"]).all()
+
+def test_grupos_factura_en_cuotas_por_contraparte():
+    banco = _df(["2024-03-01", "2024-04-01", "2024-04-01"], [500, 500, 500])
+    banco["rut"] = ["1-9", "1-9", "2-7"]
+    libro = _df(["2024-03-15"], [1000])
+    libro["rut"] = ["1-9"]
+    out = conciliar(banco, libro, grupos=True, dias_grupo=31, col_contraparte="rut")
+    pares = out[out["match"]]
+    assert pares["rut_banco"].tolist() == ["1-9", "1-9"] and pares["grupo"].nunique() == 1
+
+def test_particionado_igual_que_en_un_proceso(monkeypatch):
+    import numpy as np
+    from conciliacion import matching
+    monkeypatch.setattr(matching, "_FILAS_POR_TAREA", 100)  # varias tareas
+    rng = np.random.default_rng(0)
+    n = 400
+    banco = _df(pd.Timestamp("2024-01-25") + pd.to_timedelta(rng.integers(0, 20, n), unit="D"),
+                rng.integers(1, 50, n) * 100.0)
+    libro = banco.sample(frac=1, random_state=1).reset_index(drop=True)
+    libro["fecha"] = libro["fecha"] + pd.to_timedelta(rng.integers(0, 3, n), unit="D")  # cruza fin de mes
+    uno = conciliar(banco, libro, dias=2)
+    varios = conciliar(banco, libro, dias=2, workers=2)
+    assert varios["match"].sum() == uno["match"].sum() > 0.8 * n
+
+    # sin empates los pares deben ser exactamente los mismos, también los que
+    # cruzan fin de mes o tramo de monto (10.000 banco contra 9.980 libro)
+    banco = _df(pd.Timestamp("2024-01-28") + pd.to_timedelta(rng.integers(0, 8, n), unit="D"),
+                rng.permutation(n) * 100.0 + 9000)
+    banco["id"] = range(n)
+    libro = banco.sample(frac=1, random_state=2).reset_index(drop=True)
+    libro["fecha"] = libro["fecha"] + pd.to_timedelta(rng.integers(0, 3, n), unit="D")
+    libro["monto"] = libro["monto"] + rng.integers(-20, 21, n)
+    uno = conciliar(banco, libro, 30, dias=2)
+    varios = conciliar(banco, libro, 30, dias=2, workers=2)
+
+    def pares(out):
+        return out.loc[out["match"], ["id_banco", "id_libro"]].reset_index(drop=True)
+
+    pd.testing.assert_frame_equal(pares(varios), pares(uno))
+    assert (pares(uno)["id_banco"] == pares(uno)["id_libro"]).all() and len(pares(uno)) == n
+
+def test_particionado_con_un_lado_vacio():
+    fila = _df(["2024-01-01"], [100])
+    for banco, libro in ((fila.head(0), fila.head(0)), (fila, fila.head(0)), (fila.head(0), fila)):
+        out = conciliar(banco, libro, workers=2, grupos=True)
+        assert len(out) == len(banco) + len(libro) and not out["match"].any()
+
+def test_grupos_respeta_el_presupuesto_en_un_bloque_grande():
+    import time
+    import numpy as np
+    rng = np.random.default_rng(0)
+    n = 20000
+    f = pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 365, n), unit="D")
+    banco = _df(f, rng.integers(1, 100, n) + 0.01)  # abonos chicos: nada cuadra 1:1
+    libro = _df(f[::-1], rng.integers(1000, 10**6, n) + 0.02)
+    t0 = time.monotonic()
+    out = conciliar(banco, libro, grupos=True, dias_grupo=3, presupuesto_s=0.2)
+    assert time.monotonic() - t0 < 3 and not out["match"].any()
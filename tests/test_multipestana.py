@@ -0,0 +1,161 @@
+import importlib.util
+import re
+import sys
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from unittest.mock import Mock
+
+from conciliacion import instrumentacion as ins
+from conciliacion.sii.extraccion import common_rcv, esperas, manifest
+from conciliacion.sii.extraccion import multipestana as mp
+from conciliacion.sii.extraccion.http_rcv import nombre_archivo
+from selenium.common.exceptions import NoSuchElementException
+
+_RUTA = Path(__file__).resolve().parents[1] / "benchmarks" / "sii_simulado.py"
+_spec = importlib.util.spec_from_file_location("sii_simulado", _RUTA)
+sii_simulado = sys.modules.setdefault("sii_simulado", importlib.util.module_from_spec(_spec))
+_spec.loader.exec_module(sii_simulado)
+
+PAGINA_RCV = ET.fromstring(sii_simulado.pagina_app("1-9", 2024).replace("<!DOCTYPE html>", ""))
+
+
+def _hay(raiz, selectores):
+    """querySelector mínimo para '#id' y '[attr="valor"]' separados por coma."""
+    for sel in (s.strip() for s in selectores.split(",")):
+        if sel.startswith("#"):
+            attr, valor = "id", sel[1:]
+        else:
+            attr, valor = re.fullmatch(r'\[(\w+)="([^"]*)"\]', sel).groups()
+        if any(el.get(attr) == valor for el in raiz.iter()):
+            return True
+    return False
+
+
+class Navegador:
+    """Chrome falso: cada pestaña muestra la página RCV del SII simulado y hay UNA
+    carpeta de descarga para todo el navegador."""
+
+    current_url = "https://www4.sii.cl/consdcvinternetui/"
+    recursos_bloqueados = []
+
+    def __init__(self):
+        self.tabs = {"t0": {}}
+        self.actual = "t0"
+        self.descargas = None
+        self.switch_to = self
+
+    @property
+    def current_window_handle(self):
+        return self.actual
+
+    def window(self, h):
+        self.actual = h
+
+    def new_window(self, tipo):
+        self.actual = f"t{len(self.tabs)}"
+        self.tabs[self.actual] = {}
+
+    def close(self):
+        del self.tabs[self.actual]
+
+    def execute_cdp_cmd(self, cmd, params):
+        if cmd == "Page.setDownloadBehavior":
+            self.descargas = Path(params["downloadPath"])
+
+    def execute_script(self, js, *args):
+        t = self.tabs[self.actual]
+        if js is mp._JS_ESTADO:
+            t["sondeos"] = t.get("sondeos", 0) + 1
+            listo = "periodo" in t and t["sondeos"] >= 2  # la consulta tarda un sondeo
+            return {
+                "login": bool(re.search(common_rcv.URL_LOGIN, self.current_url)) or _hay(PAGINA_RCV, common_rcv.CAMPOS_LOGIN),
+                "formulario": _hay(PAGINA_RCV, "#periodoMes"),
+                "pestanas": listo, "xhr": listo, "cargando": False,
+            }
+        if js is mp._JS_ACTIVAR:
+            t["panel"] = True
+            return True
+        if js is common_rcv._JS_PANEL:
+            return {"panel": t.get("panel", False)}
+        if js is common_rcv._JS_ALERTAS:
+            return {"clics": 0}
+        if js is mp._JS_DESCARGAR:
+            anho, mes = t["periodo"]
+            (self.descargas / nombre_archivo("1-9", "COMPRA", "resumen", anho, mes)).write_text("a;b\n1;2\n")
+            (self.descargas / f"RCV_COMPRA_REGISTRO_1-9_{anho}{mes:02d} (1).csv").write_text("a;b\n1;2\n3;4\n")
+            return ["resumen", "detalle"]
+        return None
+
+
+def test_login_no_confunde_el_select_rut_de_la_pagina_rcv():
+    assert _hay(PAGINA_RCV, '[name="rut"]')  # <select name="rut"> de formContribuyente
+    assert not _hay(PAGINA_RCV, common_rcv.CAMPOS_LOGIN)
+    login = ET.fromstring(sii_simulado._LOGIN_HTML.format(accion="x").replace("<!DOCTYPE html>", ""))
+    assert _hay(login, common_rcv.CAMPOS_LOGIN)
+
+
+class Pagina:
+    """Driver sobre el HTML del SII simulado: sonda de login, carrera y campos por id."""
+
+    def __init__(self, html, url):
+        self.raiz = ET.fromstring(html.replace("<!DOCTYPE html>", ""))
+        self.current_url = url
+        self.escrito, self.clics = {}, []
+
+    def execute_script(self, js, *args):
+        if js is common_rcv._JS_LOGIN:
+            return bool(re.search(common_rcv.URL_LOGIN, self.current_url)) or _hay(self.raiz, common_rcv.CAMPOS_LOGIN)
+        self.clics.append(args[0].id)  # arguments[0].click(): el login lleva a la página RCV
+        self.raiz, self.current_url = PAGINA_RCV, "https://www4.sii.cl/consdcvinternetui/"
+
+    def execute_async_script(self, js, cands, condicion, limite):
+        hay = [_hay(self.raiz, sel) for _, sel in cands]
+        if condicion == "ausente":
+            return None if any(hay) else [-1, None]
+        return [hay.index(True), self.find_element("id", re.search(r'"(\w+)"', cands[hay.index(True)][1])[1])]
+
+    def find_element(self, by, sel):
+        campo = sel if by == "id" else re.search(r"@id='(\w+)'", sel)[1]
+        if not _hay(self.raiz, "#" + campo):
+            raise NoSuchElementException(sel)
+        el = Mock(id=campo)
+        el.send_keys.side_effect = lambda v: self.escrito.__setitem__(campo, v)
+        return el
+
+
+def test_sesion_de_una_pestana_no_reloguea_en_la_pagina_rcv(monkeypatch):
+    monkeypatch.setattr(esperas, "_MEMORIA", esperas.Memoria())
+    rcv = Pagina(sii_simulado.pagina_app("1-9", 2024), "https://www4.sii.cl/consdcvinternetui/")
+    assert not common_rcv._esta_en_login(rcv)
+    common_rcv._asegurar_sesion(rcv, None, "1-9", "x")
+    assert rcv.escrito == {} and rcv.clics == []  # el <select name="rut"> no se toca
+
+    login = Pagina(sii_simulado._LOGIN_HTML.format(accion="x"), "https://zeusr.sii.cl" + sii_simulado.LOGIN)
+    assert common_rcv._esta_en_login(login)
+    common_rcv._asegurar_sesion(login, None, "1-9", "x")
+    assert login.escrito == {"rutcntr": "1-9", "clave": "x"} and login.clics == ["bt_ingresar"]
+    assert not common_rcv._esta_en_login(login)
+
+
+def test_periodos_repartidos_en_pestanas_con_nombres_canonicos(tmp_path, monkeypatch):
+    monkeypatch.setattr(esperas, "_MEMORIA", esperas.Memoria())
+
+    def consultar(d, *, anho, mes):
+        d.tabs[d.actual].update(periodo=(anho, mes), sondeos=0, panel=False)
+
+    monkeypatch.setattr(mp, "_enviar_consulta", consultar)
+    out = tmp_path / "SII_1-9" / "RCV_Compra"
+    periodos = [(2024, m) for m in range(1, 6)]
+    reg = ins.configurar()
+    d = Navegador()
+    mp.extraer_en_pestanas(d, None, rut="1-9", clave="x", trabajo={p: ["COMPRA"] for p in periodos},
+                           out_dirs={"COMPRA": out}, carpeta_base=tmp_path, pestanas=3)
+
+    esperado = {nombre_archivo("1-9", "COMPRA", c, a, m) for a, m in periodos for c in ("resumen", "detalle")}
+    assert {p.name for p in out.glob("*.csv")} == esperado
+    assert set(manifest.cargar(out)["periodos"]) == {f"2024-{m:02d}" for _, m in periodos}
+    assert not list((tmp_path / "SII_1-9").glob(".pestana_*"))  # staging limpio
+    assert list(d.tabs) == ["t0"]  # las pestañas extra se cierran
+    usadas = {ev["pestana"] for ev in reg.eventos if ev["etapa"] == "descarga"}
+    assert usadas == {0, 1, 2}
+    ins.configurar()
@@ -0,0 +1,100 @@
+from pathlib import Path
+
+from selenium.webdriver.chrome.options import Options
+
+from conciliacion.sii.extraccion import navegador
+from conciliacion.sii.extraccion.common_rcv import _cdp
+
+
+def test_clonar_perfil_copia_la_plantilla_sin_la_marca(tmp_path):
+    plantilla = tmp_path / "plantilla"
+    (plantilla / "Default").mkdir(parents=True)
+    (plantilla / "Local State").write_text("{}")
+    (plantilla / "Default" / "Preferences").write_text('{"x": 1}')
+    (plantilla / navegador.LISTA).write_text("ok")
+    clon = Path(navegador.clonar_perfil(plantilla))
+    try:
+        assert (clon / "Default" / "Preferences").read_text() == '{"x": 1}'
+        assert not (clon / navegador.LISTA).exists()
+        (clon / "Default" / "Preferences").write_text("cambiado")
+        assert (plantilla / "Default" / "Preferences").read_text() == '{"x": 1}'  # no comparten archivos
+    finally:
+        import shutil
+        shutil.rmtree(clon)
+
+
+def test_limpiar_perfil_quita_caches_y_locks(tmp_path):
+    (tmp_path / "Default" / "Cache").mkdir(parents=True)
+    (tmp_path / "Default" / "Cache" / "data_0").write_bytes(b"x")
+    (tmp_path / "SingletonLock").symlink_to("host-123")
+    (tmp_path / "Default" / "Preferences").write_text("{}")
+    navegador._limpiar_perfil(tmp_path)
+    assert not (tmp_path / "Default" / "Cache").exists()
+    assert not (tmp_path / "SingletonLock").is_symlink()
+    assert (tmp_path / "Default" / "Preferences").exists()
+
+
+def test_plantilla_fallida_no_queda_a_medias_ni_se_reintenta(tmp_path, monkeypatch):
+    monkeypatch.setenv("BEKILLY_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(navegador, "_sin_plantilla", set())
+    intentos = []
+
+    def sin_chromedriver(*a):
+        intentos.append(a)
+        raise RuntimeError("sin chromedriver")
+
+    monkeypatch.setattr(navegador, "servicio", sin_chromedriver)
+    assert navegador.plantilla_perfil("/x/chrome", None) is None
+    assert navegador.plantilla_perfil("/x/chrome", None) is None
+    assert len(intentos) == 1
+    assert list(tmp_path.iterdir()) == []
+
+    # una plantilla ya publicada se usa sin arrancar Chrome
+    lista = navegador._ruta_plantilla("/y/chrome")
+    lista.mkdir()
+    (lista / navegador.LISTA).write_text("ok")
+    assert navegador.plantilla_perfil("/y/chrome", None) == lista
+    assert len(intentos) == 1
+
+
+def test_livianas_y_cdp_por_remote():
+    opts = Options()
+    navegador.livianas(opts)
+    assert "--blink-settings=imagesEnabled=false" in opts.arguments
+
+    class Remoto:
+        def execute(self, comando, params):
+            self.llamada = (comando, params)
+            return {"value": {"ok": True}}
+
+    d = Remoto()
+    assert _cdp(d, "Page.enable", {}) == {"ok": True}
+    assert d.llamada == ("executeCdpCommand", {"cmd": "Page.enable", "params": {}})
+
+
+def test_slots_de_cache_exclusivos_y_liberables(tmp_path):
+    from conciliacion.sii.extraccion import recursos
+    a = recursos.reservar_cache(tmp_path)
+    b = recursos.reservar_cache(tmp_path)
+    assert (a.name, b.name) == ("cache_0", "cache_1")
+    recursos.asociar(a, "/tmp/perfil_a")
+    recursos.liberar("/tmp/perfil_a")
+    assert recursos.reservar_cache(tmp_path) == a  # el slot liberado se reutiliza
+    recursos.liberar(str(a))
+    recursos.liberar(str(b))
+
+
+def test_bloquear_envia_patrones_por_cdp():
+    from conciliacion.sii.extraccion import recursos
+
+    class Remoto:
+        llamadas = []
+
+        def execute(self, comando, params):
+            self.llamadas.append(params["cmd"])
+            return {"value": {}}
+
+    d = Remoto()
+    assert recursos.bloquear(d, recursos.patrones(imagenes=False))
+    assert d.llamadas == ["Network.enable", "Network.setBlockedURLs"]
+    assert "*.woff2" in recursos.patrones() and "*.png" not in recursos.patrones(imagenes=False)
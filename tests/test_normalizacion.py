@@ -7,3 +7,12 @@ def test_normalizar_mapea():
     out = normalizar_dataframe(df)
     assert str(out.loc[0,"fecha"])[:10] == "2025-08-01"
     assert out.loc[0,"monto"] == 1000
+
+def test_normalizador_reutiliza_formato_por_lote():
+    from conciliacion.normalizacion import Normalizador
+    norm = Normalizador()
+    a = norm(pd.DataFrame({"FECHA": ["01/02/2025", "13/02/2025"], "Importe": ["10", "x"]}))
+    b = norm(pd.DataFrame({"FECHA": ["05/03/2025"], "Importe": [5]}))
+    assert norm.formato_fecha == "%d/%m/%Y"
+    assert str(a.loc[0, "fecha"])[:10] == "2025-02-01" and str(b.loc[0, "fecha"])[:10] == "2025-03-05"
+    assert pd.isna(a.loc[1, "monto"]) and a["glosa"].isna().all()
@@ -0,0 +1,27 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conciliacion import numeros
+
+VALORES = [" 1.234.567 ", "-1.234,5", "+12", "(3.500)", "0,19", "12.5", "", None, "76156793-4"]
+ESPERADO = [1234567, -1234.5, 12, -3500, 0.19, np.nan, np.nan, np.nan, np.nan]
+
+@pytest.mark.parametrize("motor", ["arrow", "pandas"])
+def test_parsea_formato_chileno(motor):
+    if motor == "arrow" and numeros.pa is None:
+        pytest.skip("sin pyarrow")
+    fn = numeros._parsear_arrow if motor == "arrow" else numeros._parsear_pandas
+    valores, fallas, vacios = fn(pd.Series(VALORES, dtype=object))
+    np.testing.assert_allclose(valores, ESPERADO)
+    assert fallas.sum() == 2 and vacios == 2   # "12.5" y el RUT; "" y None
+
+def test_convertir_columnas_deja_texto_y_cuenta_fallas():
+    df = pd.DataFrame({
+        "Monto Neto": ["1.000"] * 199 + ["s/i"],
+        "RUT Proveedor": ["76156793-4", "1-9"] * 100,
+    })
+    fallas = numeros.convertir_columnas(df, df.columns)
+    assert df["Monto Neto"].dtype == "float64" and df["Monto Neto"].iloc[0] == 1000
+    assert df["RUT Proveedor"].dtype == object
+    assert fallas == {"Monto Neto": 1}
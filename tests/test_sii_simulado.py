@@ -0,0 +1,63 @@
+import importlib.util
+import sys
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+import pytest
+from conciliacion.sii.extraccion.http_rcv import descargar_periodos_http
+
+requests = pytest.importorskip("requests")
+
+_RUTA = Path(__file__).resolve().parents[1] / "benchmarks" / "sii_simulado.py"
+_spec = importlib.util.spec_from_file_location("sii_simulado", _RUTA)
+sii_simulado = sys.modules.setdefault("sii_simulado", importlib.util.module_from_spec(_spec))
+_spec.loader.exec_module(sii_simulado)
+
+# XPaths absolutos que usa common_rcv (sin el prefijo /html)
+XPATHS = (
+    "body/div[1]/div[2]/div[1]/div[1]/div/div[1]/div/div[3]/div/form/div[3]/button",
+    "body/div[1]/div[2]/div[1]/div[1]/div/div[2]/ul/li[1]/a/strong",
+    "body/div[1]/div[2]/div[1]/div[1]/div/div[2]/ul/li[2]/a/strong",
+    "body/div[1]/div[2]/div[1]/div[2]/div/div/div/div/div[4]/div[1]/div[1]/button",
+    "body/div[1]/div[2]/div[1]/div[2]/div/div/div/div/div[4]/div[1]/div[2]/button",
+)
+
+
+def test_dom_respeta_xpaths_absolutos():
+    raiz = ET.fromstring(sii_simulado.pagina_app("1-9", 2024).replace("<!DOCTYPE html>", ""))
+    textos = [[el.text for el in raiz.findall(xp)] for xp in XPATHS]
+    assert textos == [["Consultar"], ["COMPRA"], ["VENTA"], ["Descargar Resumenes"], ["Descargar Detalles"]]
+    assert raiz.find(".//select[@id='periodoMes']/option[@value='03']") is not None
+    assert raiz.find(".//select[@ng-model='periodoAnho']/option[@value='2024']") is not None
+
+
+def test_login_descarga_y_fallas(tmp_path):
+    srv = sii_simulado.iniciar(sii_simulado.Escenario(latencia_ms=0, jitter_ms=0, filas=5))
+    try:
+        with requests.Session() as s:
+            r = s.get(srv.url)
+            assert "IngresoRutClave" in r.url and 'id="bt_ingresar"' in r.text
+            r = s.post(r.url.split("?")[0].replace("IngresoRutClave.html", "CAutInicio.cgi"),
+                       data={"rutcntr": "1-9", "clave": "x"})
+            assert r.url == srv.url and 'ng-model="periodoAnho"' in r.text
+            assert s.get(srv.url + "api/consulta?periodo=202401").json()["ok"]
+            r = s.get(srv.url + "api/descarga?tipo=COMPRA&clase=detalle&periodo=202401")
+            assert 'filename="RCV_COMPRA_REGISTRO_1-9_202401.csv"' in r.headers["Content-Disposition"]
+            assert len(r.content.decode("latin-1").splitlines()) == 6
+
+            srv.escenario.fallo_descarga = 1.0
+            ok, fallidos = descargar_periodos_http(
+                s, base_url=srv.url, rut="1-9", tipo_up="VENTA", periodos=[(2024, 1)], out_dir=tmp_path, workers=1,
+            )
+            assert not ok and list(fallidos) == [(2024, 1)]
+            srv.escenario.fallo_descarga = 0.0
+            ok, _ = descargar_periodos_http(
+                s, base_url=srv.url, rut="1-9", tipo_up="VENTA", periodos=[(2024, 1)], out_dir=tmp_path, workers=1,
+            )
+            assert (tmp_path / "RCV_VENTA_REGISTRO_1-9_202401.csv").read_text(encoding="latin-1").startswith("Nro;Tipo Doc;Tipo Venta")
+
+            srv.escenario.expira_sesion = 1.0
+            assert s.get(srv.url + "api/consulta?periodo=202402").status_code == 401
+            assert "IngresoRutClave" in s.get(srv.url).url
+    finally:
+        srv.shutdown()